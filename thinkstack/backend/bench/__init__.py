@@ -0,0 +1 @@
+# Benchmark suite for the API - see bench/__main__.py for usage.
@@ -0,0 +1,177 @@
+# bench/__main__.py
+#
+# Load-test / regression benchmark for the API. Run from backend/:
+#
+#   python -m bench --users 100000 --challenges 20000 --solutions 1000000 \
+#       --concurrency 8 --requests 2000 --out bench-results.json
+#   python -m bench --reuse --compare bench-results.json
+#
+# The data lives in its own SQLite file (--db) and is generated once; --reuse
+# runs against an existing file. Results are written as JSON so two runs can
+# be compared with --compare. --processes N runs every scenario in N worker
+# processes, each with its own app and --concurrency threads, the way N
+# gunicorn workers would share the database.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+
+def parse_args(argv=None):
+    from bench.datagen import DEFAULT_SCALE
+    parser = argparse.ArgumentParser(prog='python -m bench', description='ThinkStack API benchmarks')
+    parser.add_argument('--db', default=os.path.join(os.getcwd(), 'instance', 'bench.db'),
+                        help='SQLite file to generate into / run against')
+    parser.add_argument('--reuse', action='store_true', help='use the existing --db instead of regenerating it')
+    parser.add_argument('--users', type=int, default=DEFAULT_SCALE['users'])
+    parser.add_argument('--challenges', type=int, default=DEFAULT_SCALE['challenges'])
+    parser.add_argument('--solutions', type=int, default=DEFAULT_SCALE['solutions'])
+    parser.add_argument('--concurrency', type=int, default=4, help='worker threads per process')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='worker processes, each with its own app and --concurrency threads')
+    parser.add_argument('--requests', type=int, default=1000, help='requests per scenario')
+    parser.add_argument('--slow-requests', type=int, default=100,
+                        help='requests for scenarios dominated by password hashing or writes')
+    parser.add_argument('--scenarios', default='all', help='comma separated; see bench/scenarios.py')
+    parser.add_argument('--no-cache', action='store_true', help='disable the response cache to measure the DB path')
+    parser.add_argument('--hash-inline', action='store_true',
+                        help='hash passwords on the request thread instead of the hashing pool')
+    parser.add_argument('--rate-limit', action='store_true',
+                        help='keep the rate limiter on (every worker shares one IP, so logins will see 429s)')
+    parser.add_argument('--sqlite-defaults', action='store_true',
+                        help='skip the WAL/pragma tuning and the write serializer (sqlite_tuning.py)')
+    parser.add_argument('--out', help='write the JSON report here')
+    parser.add_argument('--compare', help='print deltas against an earlier JSON report')
+    return parser.parse_args(argv)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(report, baseline):
+    print(f"\n{'scenario':<24}{'rps':>22}{'p50 ms':>22}{'p95 ms':>22}")
+    for name, result in report['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(name)
+        if not old:
+            continue
+        cells = []
+        for new_value, old_value in [
+            (result['throughput_rps'], old['throughput_rps']),
+            (result['latency_ms']['p50'], old['latency_ms']['p50']),
+            (result['latency_ms']['p95'], old['latency_ms']['p95']),
+        ]:
+            change = (new_value - old_value) / old_value * 100 if old_value else 0
+            cells.append(f'{old_value:>9} -> {new_value:<9} {change:+.0f}%')
+        print(f'{name:<24}' + ''.join(f'{c:>22}' for c in cells))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    db_path = os.path.abspath(args.db)
+    if not args.reuse and os.path.exists(db_path):
+        os.remove(db_path)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+    if args.sqlite_defaults:
+        os.environ['SQLITE_TUNING'] = '0'
+
+    # Build the app only after DATABASE_URL points at the bench database
+    from db import db, User, Challenge, Solution
+    from search import ensure_search_index
+    from bench import datagen
+    from bench.driver import SQLCounter, build_app, run_load, run_processes, summarize
+    from bench.scenarios import SCENARIOS
+
+    app = build_app(args)
+
+    scale = {'users': args.users, 'challenges': args.challenges, 'solutions': args.solutions}
+    with app.app_context():
+        if args.sqlite_defaults:
+            # WAL sticks to the file, so a --reuse'd database may still be in it
+            db.session.execute(db.text('PRAGMA journal_mode=DELETE'))
+        if not args.reuse:
+            print(f'Generating {scale} into {db_path} ...')
+            db.create_all()
+            ensure_search_index()
+            datagen.generate(**scale)
+        else:
+            scale = {
+                'users': User.query.filter(User.email.like('user%@bench.local')).count(),
+                'challenges': db.session.query(db.func.count(Challenge.id)).scalar(),
+                'solutions': db.session.query(db.func.count(Solution.id)).scalar(),
+            }
+        sql_counter = SQLCounter(db.engine)
+
+    issued = []
+
+    def submitters():
+        # A fresh batch per writing scenario, so one scenario's submissions
+        # never trip the 409 duplicate check in the next
+        with app.app_context():
+            start_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+            issued.append(datagen.create_plain_users(args.concurrency * args.processes, start_id))
+        return issued[-1]
+
+    ctx = {
+        'app': app,
+        'scale': scale,
+        'concurrency': args.concurrency,
+        'slow_requests': min(args.slow_requests, args.requests),
+        'submitters': submitters,
+    }
+    names = list(SCENARIOS) if args.scenarios == 'all' else args.scenarios.split(',')
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'git_revision': git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'scale': scale,
+            'concurrency': args.concurrency,
+            'processes': args.processes,
+            'response_cache': not args.no_cache,
+            'hash_inline': args.hash_inline,
+            'rate_limit': args.rate_limit,
+            'sqlite_tuning': not args.sqlite_defaults,
+        },
+        'scenarios': {},
+    }
+    for name in names:
+        del issued[:]
+        scenario = SCENARIOS[name](ctx)
+        requests = scenario.requests or args.requests
+        if args.processes > 1:
+            shared = {k: ctx[k] for k in ('scale', 'concurrency', 'slow_requests')}
+            samples, duration = run_processes(args, name, shared, issued[-1] if issued else [], requests)
+        else:
+            samples, duration = run_load(app, scenario, requests, args.concurrency, sql_counter)
+        result = summarize(samples, duration)
+        report['scenarios'][name] = result
+        print(f"{name:<24} {result['throughput_rps']:>9} req/s  "
+              f"p50 {result['latency_ms']['p50']:>8} ms  p95 {result['latency_ms']['p95']:>8} ms  "
+              f"p99 {result['latency_ms']['p99']:>8} ms  sql/req {result['sql_per_request']['mean']:>6}  "
+              f"{result['status_codes']}")
+        for label, part in result.get('by_label', {}).items():
+            print(f"  {label:<22} {part['throughput_rps']:>9} req/s  "
+                  f"p50 {part['latency_ms']['p50']:>8} ms  p95 {part['latency_ms']['p95']:>8} ms")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nWrote {args.out}')
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+    return report
+
+
+if __name__ == '__main__':
+    main()
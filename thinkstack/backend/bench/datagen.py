@@ -0,0 +1,122 @@
+# bench/datagen.py
+#
+# Synthetic data for the benchmarks. Rows go in through Core executemany in
+# chunks, not the ORM, so a million solutions take seconds rather than hours.
+# Every generated user shares the password BENCH_PASSWORD (hashed once).
+
+import random
+from datetime import datetime, timedelta
+from werkzeug.security import generate_password_hash
+from db import db, User, Challenge, Solution, LeaderboardEntry, CategoryScore
+
+BENCH_PASSWORD = 'benchpass'
+CATEGORIES = ['UI/UX Design', 'Machine Learning', 'IoT', 'Software Development', 'Data Science', 'General']
+CHUNK = 10000
+
+DEFAULT_SCALE = {'users': 2000, 'challenges': 500, 'solutions': 20000}
+
+
+def _insert(table, rows):
+    for i in range(0, len(rows), CHUNK):
+        db.session.execute(table.insert(), rows[i:i + CHUNK])
+
+
+def bench_email(i):
+    return f'user{i}@bench.local'
+
+
+def generate(users=2000, challenges=500, solutions=20000, seed=42):
+    """
+    Fill an empty database: users (10% challengers), challenges (80%
+    approved, created over the past year), solutions spread so no user
+    submits twice to one challenge, and a leaderboard entry per user.
+    Must run inside an app context.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+
+    # --- users ---
+    _insert(User.__table__, [{
+        'id': i + 1,
+        'name': f'Bench User {i}',
+        'email': bench_email(i),
+        'password_hash': password_hash,
+        'role': 'CHALLENGER' if i % 10 == 0 else 'SOLVER',
+        'is_verified': True,
+        'is_suspended': False,
+        'created_at': now - timedelta(days=rng.randint(0, 365))
+    } for i in range(users)])
+
+    # --- challenges ---
+    creators = list(range(1, users + 1, 10)) or [1]
+    _insert(Challenge.__table__, [{
+        'id': i + 1,
+        'title': f'Challenge {i}: {rng.choice(["build", "design", "predict", "optimize"])} '
+                 f'{rng.choice(["a sensor grid", "a recommender", "an app", "a dashboard"])}',
+        'description': ' '.join(rng.choice(['data', 'model', 'users', 'network', 'solar', 'school',
+                                            'mobile', 'payments', 'health', 'farm']) for _ in range(80)),
+        'category': rng.choice(CATEGORIES),
+        'participation_type': rng.choice(['INDIVIDUAL', 'TEAM']),
+        'cash_prize_cents': rng.randint(1, 5000) * 100,
+        'min_team_size': 1,
+        'max_team_size': None,
+        'additional_requirements': 'Include a README and a short demo video.',
+        'deadline': now + timedelta(days=rng.randint(1, 120)),
+        'status': 'APPROVED' if rng.random() < 0.8 else rng.choice(['PENDING', 'REJECTED']),
+        'created_by_id': rng.choice(creators),
+        'created_at': now - timedelta(seconds=rng.randint(0, 365 * 86400))
+    } for i in range(challenges)])
+
+    # --- solutions: user u gets challenges (u + k) % C for k = 0, 1, 2... ---
+    solutions = min(solutions, users * challenges)
+    rows = []
+    for i in range(solutions):
+        user = i % users
+        challenge = (i // users + user) % challenges
+        rows.append({
+            'challenge_id': challenge + 1,
+            'submitted_by_user_id': user + 1,
+            'content': 'See repository.',
+            'attachments': f'https://github.com/bench/solution-{i}',
+            'score': 0,
+            'status': 'SUBMITTED',
+            'created_at': now - timedelta(seconds=rng.randint(0, 365 * 86400))
+        })
+        if len(rows) == CHUNK:
+            _insert(Solution.__table__, rows)
+            rows = []
+    _insert(Solution.__table__, rows)
+
+    # --- leaderboard ---
+    _insert(LeaderboardEntry.__table__, [{
+        'user_id': i + 1,
+        'score': rng.randint(0, 5000) if rng.random() < 0.7 else 0,
+        'challenges_completed': rng.randint(0, 50)
+    } for i in range(users)])
+    _insert(CategoryScore.__table__, [{
+        'user_id': i + 1,
+        'category': rng.choice(CATEGORIES),
+        'score': rng.randint(1, 2000),
+        'challenges_completed': rng.randint(1, 20)
+    } for i in range(0, users, 3)])
+
+    db.session.commit()
+
+
+def create_plain_users(count, start_id):
+    """Extra users with no solutions, e.g. for the submission scenario."""
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    _insert(User.__table__, [{
+        'id': start_id + i,
+        'name': f'Bench Submitter {i}',
+        'email': f'submitter{start_id + i}@bench.local',
+        'password_hash': password_hash,
+        'role': 'SOLVER',
+        'is_verified': True,
+        'is_suspended': False,
+        'created_at': datetime.utcnow()
+    } for i in range(count)])
+    db.session.commit()
+    return [f'submitter{start_id + i}@bench.local' for i in range(count)]
+
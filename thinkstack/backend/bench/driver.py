@@ -0,0 +1,217 @@
+# bench/driver.py
+#
+# Closed-loop load driver: N worker threads, each with its own Flask test
+# client, issue requests back to back until the shared budget is used up.
+# Every request is timed and tagged with the number of SQL statements it
+# issued (counted on the engine, per thread). With --processes the same
+# driver runs in several processes at once (see bench/__main__.py), which is
+# what several gunicorn workers on one database look like.
+
+import multiprocessing
+import queue
+import threading
+import time
+from collections import Counter
+from sqlalchemy import event
+
+
+class SQLCounter:
+    """Counts statements executed on an engine by the current thread."""
+
+    def __init__(self, engine):
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(samples, duration):
+    """samples: list of (latency_seconds, status_code, sql_count, label)."""
+    latencies = sorted(s[0] * 1000.0 for s in samples)
+    sql = [s[2] for s in samples]
+    statuses = Counter(str(s[1]) for s in samples)
+    errors = sum(n for code, n in statuses.items() if code.startswith('5') or code == 'error')
+    result = {
+        'requests': len(samples),
+        'errors': errors,
+        'duration_s': round(duration, 4),
+        'throughput_rps': round(len(samples) / duration, 2) if duration else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'p50': round(percentile(latencies, 50), 3) if latencies else None,
+            'p95': round(percentile(latencies, 95), 3) if latencies else None,
+            'p99': round(percentile(latencies, 99), 3) if latencies else None,
+            'max': round(latencies[-1], 3) if latencies else None,
+        },
+        'sql_per_request': {
+            'mean': round(sum(sql) / len(sql), 2) if sql else None,
+            'max': max(sql) if sql else None,
+        },
+        'status_codes': dict(statuses),
+    }
+    labels = sorted({s[3] for s in samples if s[3] is not None})
+    if labels:
+        # Mixed scenarios: break the numbers down per request kind as well
+        result['by_label'] = {label: summarize([s[:3] + (None,) for s in samples if s[3] == label], duration)
+                              for label in labels}
+    return result
+
+
+def run_load(app, scenario, requests, concurrency, sql_counter=None, ready=None):
+    """
+    Drive `requests` calls of scenario.request(client, state, i) across
+    `concurrency` threads. scenario.setup(client, worker) runs once per
+    thread (e.g. to log in) and returns that worker's state. ready(), if
+    given, is called once every thread is set up and before the clock
+    starts, e.g. to line up with other processes.
+    Returns the samples and the wall-clock duration.
+    """
+    samples = []
+    samples_lock = threading.Lock()
+    remaining = [requests]
+    start_barrier = threading.Barrier(concurrency + 1)
+    go = threading.Event()
+
+    def next_index():
+        with samples_lock:
+            if remaining[0] <= 0:
+                return None
+            remaining[0] -= 1
+            return requests - remaining[0] - 1
+
+    def worker(worker_id):
+        client = app.test_client()
+        try:
+            state = scenario.setup(client, worker_id) if scenario.setup else None
+        except Exception:
+            start_barrier.abort()
+            raise
+        local = []
+        start_barrier.wait()
+        go.wait()
+        while True:
+            i = next_index()
+            if i is None:
+                break
+            if sql_counter:
+                sql_counter.reset()
+            started = time.perf_counter()
+            try:
+                status = scenario.request(client, state, i).status_code
+            except Exception:
+                status = 'error'
+            elapsed = time.perf_counter() - started
+            label = scenario.label(i) if scenario.label else None
+            local.append((elapsed, status, sql_counter.count if sql_counter else 0, label))
+        with samples_lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(concurrency)]
+    for t in threads:
+        t.start()
+    try:
+        start_barrier.wait()
+        if ready:
+            ready()
+    finally:
+        started = time.perf_counter()
+        go.set()
+    for t in threads:
+        t.join()
+    return samples, time.perf_counter() - started
+
+
+def build_app(args):
+    """The app under test, configured from the command line options."""
+    from app import create_app
+    app = create_app({
+        'SESSION_COOKIE_SECURE': False,  # the test client talks plain http
+        # Throwaway keys: the bench signs and checks its own tokens, in every worker process
+        'SECRET_KEY': 'bench-secret',
+        'JWT_SECRET_KEY': 'bench-jwt-secret',
+    })
+    if args.no_cache:
+        app.extensions['response_cache'].enabled = False
+    if not args.rate_limit:
+        app.extensions['rate_limiter'].enabled = False
+    if args.hash_inline:
+        app.extensions['password_hasher'].inline = True
+    return app
+
+
+def _process_load(args, name, ctx, emails, requests, barrier, results):
+    # Runs in a spawned worker process: a fresh app on the same database file
+    from db import db
+    from bench.scenarios import SCENARIOS
+
+    app = build_app(args)
+    with app.app_context():
+        sql_counter = SQLCounter(db.engine)
+    scenario = SCENARIOS[name](dict(ctx, app=app, submitters=lambda: emails))
+    try:
+        results.put(run_load(app, scenario, requests, args.concurrency, sql_counter,
+                             ready=lambda: barrier.wait(timeout=600)))
+    finally:
+        # A child process joins its own children on exit, hashing pool included
+        app.extensions['password_hasher'].shutdown(wait=True)
+
+
+def run_processes(args, name, ctx, emails, requests):
+    """Split `requests` across args.processes processes started together."""
+    spawn = multiprocessing.get_context('spawn')
+    barrier = spawn.Barrier(args.processes)
+    results = spawn.Queue()
+    shares = [requests // args.processes + (1 if p < requests % args.processes else 0)
+              for p in range(args.processes)]
+    workers = [spawn.Process(target=_process_load, args=(
+        args, name, ctx, emails[p * args.concurrency:(p + 1) * args.concurrency], shares[p], barrier, results))
+        for p in range(args.processes)]
+    for w in workers:
+        w.start()
+    samples, duration = [], 0.0
+    try:
+        for _ in workers:
+            while True:
+                try:
+                    part, part_duration = results.get(timeout=1)
+                    break
+                except queue.Empty:
+                    if any(w.exitcode not in (None, 0) for w in workers):
+                        raise RuntimeError(f'a bench worker process failed during {name}')
+            samples.extend(part)
+            # The processes start together, so the run lasts as long as the slowest
+            duration = max(duration, part_duration)
+    except BaseException:
+        for w in workers:
+            w.terminate()
+        raise
+    finally:
+        for w in workers:
+            w.join()
+    return samples, duration
+
+
+class Scenario:
+    def __init__(self, name, request, setup=None, requests=None, label=None):
+        self.name = name
+        self.request = request
+        self.setup = setup
+        self.requests = requests  # overrides the global --requests if set
+        self.label = label  # label(i) -> str, to report a mixed scenario per request kind
@@ -0,0 +1,280 @@
+# bench/micro.py
+#
+# Microbenchmarks for pieces that sit on every request of a route and must
+# stay cheap, and for how long a fresh worker takes to come up. Run from
+# backend/:
+#
+#   python -m bench.micro              # everything
+#   python -m bench.micro ratelimit
+#   python -m bench.micro metrics
+#   python -m bench.micro logging
+#   python -m bench.micro startup
+#   python -m bench.micro serialize
+#
+# Each case prints the mean cost per call (the median run for startup); no
+# database is involved beyond an in-memory SQLite one.
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+
+def timed(fn, calls, threads=0):
+    """
+    Mean microseconds per call of fn() over `calls` calls, made on the calling
+    thread (threads=0, e.g. inside a request context) or split across threads.
+    """
+    if not threads:
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        return (time.perf_counter() - started) / calls * 1e6
+    per_thread = calls // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        barrier.wait()
+        for _ in range(per_thread):
+            fn()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in workers:
+        t.join()
+    return (time.perf_counter() - started) / (per_thread * threads) * 1e6
+
+
+def ratelimit(calls=200000):
+    from ratelimit import InProcessStore, RedisStore, LocalRedis, RateLimiter, parse_limit
+    from flask import Flask
+
+    capacity, rate = parse_limit('1000000/second')  # never runs dry, so we time the allowed path
+    for name, store in [('in-process store', InProcessStore()), ('shared store (LocalRedis)', RedisStore(LocalRedis()))]:
+        for threads in (1, 4):
+            us = timed(lambda: store.take('bench:ip:127.0.0.1', capacity, rate), calls, threads)
+            print(f'ratelimit  {name:<28} {threads} thread(s)  {us:8.3f} us/call')
+
+    # The whole decorator inside a request context (per-IP key), against an undecorated view
+    app = Flask(__name__)
+    limiter = RateLimiter()
+    limiter.init_app(app)
+    view = lambda: 'ok'
+    limited = limiter.limit('1000000/second', per='ip')(view)
+    with app.test_request_context('/api/login', method='POST'):
+        base = timed(view, calls)
+        us = timed(limited, calls)
+    print(f'ratelimit  {"@limiter.limit overhead":<28} 1 thread(s)  {us - base:8.3f} us/request')
+
+
+def metrics(calls=200000):
+    from metrics import Metrics
+    from flask import Flask
+
+    # What the hooks add to one request that runs one statement (nothing at all when disabled)
+    app = Flask(__name__)
+    app.config['METRICS_ENABLED'] = True
+    instrumented = Metrics()
+    instrumented.init_app(app)
+    app.add_url_rule('/api/challenges', 'challenges', lambda: 'ok')
+    response = app.response_class('ok')
+    conn = type('Connection', (), {'info': {}})()
+
+    def request_cycle():
+        instrumented._before_request()
+        instrumented._before_cursor_execute(conn, None, 'SELECT 1', (), None, False)
+        instrumented._after_cursor_execute(conn, None, 'SELECT 1', (), None, False)
+        instrumented._after_request(response)
+
+    with app.test_request_context('/api/challenges'):
+        app.preprocess_request()
+        us = timed(request_cycle, calls)
+    print(f'metrics    {"request + 1 statement":<28} 1 thread(s)  {us:8.3f} us/request')
+
+
+class SlowStream:
+    """A log destination that takes `delay` seconds per write, like a full pipe or a busy disk."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+
+    def flush(self):
+        pass
+
+
+def logging_(calls=5000):
+    import logging
+    from flask import Flask
+    import logs
+
+    # What one log call costs the request thread when the destination is slow
+    stream = SlowStream(0.0002)
+    logger = logging.getLogger('bench.inline')
+    inline = logging.StreamHandler(stream)
+    inline.setFormatter(logs.JsonFormatter())
+    logger.handlers = [inline]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    us = timed(lambda: logger.info("Listed challenges", extra={'count': 20}), calls)
+    print(f'logging    {"JSON, written inline":<28} 1 thread(s)  {us:8.3f} us/call')
+
+    app = Flask(__name__)
+    app.config['LOG_STREAM'] = stream
+    app.config['LOG_QUEUE_SIZE'] = calls
+    handler = logs.init_logging(app)
+    logger = logging.getLogger('thinkstack.bench')
+    us = timed(lambda: logger.info("Listed challenges", extra={'count': 20}), calls)
+    print(f'logging    {"JSON, via the queue":<28} 1 thread(s)  {us:8.3f} us/call  ({handler.dropped} dropped)')
+
+    # Sampled debug events: nine in ten are discarded before reaching the queue
+    app.config['LOG_LEVEL'] = 'DEBUG'
+    app.config['LOG_DEBUG_SAMPLE_RATE'] = 0.1
+    logs.init_logging(app)
+    us = timed(lambda: logger.debug("Listed challenges", extra={'count': 20}), calls)
+    print(f'logging    {"debug, 10% sampled":<28} 1 thread(s)  {us:8.3f} us/call')
+    logs.stop_logging(app)
+
+
+# Runs in a fresh interpreter, like a newly forked or spawned worker
+STARTUP_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'LOG_LEVEL': 'WARNING', 'TESTING': True})
+created = time.perf_counter()
+app.test_client().get('/api/me')
+served = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': created - imported,
+                  'first_request': served - created, 'modules': len(sys.modules)}))
+'''
+
+
+def startup(runs=15, apps=50):
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', STARTUP_PROBE], cwd=backend, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    for step in ('import', 'create_app', 'first_request'):
+        ms = statistics.median(s[step] for s in samples) * 1000
+        print(f'startup    {"cold " + step:<28} {runs} run(s)    {ms:8.1f} ms')
+    print(f'startup    {"modules loaded":<28} {runs} run(s)    {samples[-1]["modules"]:8d}')
+
+    # What one more isolated app costs a process that already has one (a test suite)
+    from app import create_app
+    config = {'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'LOG_LEVEL': 'WARNING', 'TESTING': True}
+    create_app(config)
+    started = time.perf_counter()
+    for _ in range(apps):
+        create_app(config)
+    ms = (time.perf_counter() - started) / apps * 1000
+    print(f'startup    {"warm create_app()":<28} {apps} app(s)    {ms:8.1f} ms/app')
+    import logs
+    logs._stop_listeners()
+
+
+# The per-model to_dict() bodies as they were before db.py declared Serializers
+def _legacy_challenge(c, solution_count):
+    return {
+        'id': c.id, 'title': c.title, 'description': c.description, 'category': c.category,
+        'participationType': c.participation_type, 'cashPrize': c.cash_prize_cents / 100.0,
+        'minTeamSize': c.min_team_size, 'maxTeamSize': c.max_team_size,
+        'additionalRequirements': c.additional_requirements, 'maxUploadBytes': c.max_upload_bytes,
+        'deadline': c.deadline.isoformat(), 'status': c.status,
+        'createdBy': c.created_by.name if c.created_by else None,
+        'createdAt': c.created_at.isoformat(), 'solutionCount': solution_count,
+    }
+
+
+def _legacy_solution(s):
+    return {
+        'id': s.id, 'challenge_id': s.challenge_id, 'content': s.content,
+        'file': s.upload.to_dict() if s.upload_id else None, 'score': s.score, 'status': s.status,
+        'submitted_by': s.submitted_by_user.name if s.submitted_by_user else None,
+        'submitted_by_team': s.submitted_by_team.name if s.submitted_by_team else None,
+        'created_at': s.created_at.isoformat(),
+    }
+
+
+def _legacy_leaderboard_entry(e):
+    return {'user_id': e.user_id, 'user_name': e.user.name, 'score': e.score,
+            'challenges_completed': e.challenges_completed}
+
+
+def serialize(rows=10000):
+    import json
+    from datetime import datetime, timedelta
+    from flask import Flask
+    from db import User, Challenge, Solution, LeaderboardEntry
+    import serialization
+
+    # Transient rows with their relationships already set, so no database is involved
+    now = datetime(2026, 10, 18, 9, 30, 15, 123456)
+    users = [User(id=i, name=f'Solver {i}', email=f'user{i}@bench.local', role='SOLVER',
+                  is_verified=True, created_at=now) for i in range(1, 1001)]
+    models = {
+        'Challenge': ([Challenge(
+            id=i, title=f'Challenge {i}: build a faster leaderboard', description='Lorem ipsum dolor sit amet. ' * 20,
+            category='Data Science', participation_type='INDIVIDUAL', cash_prize_cents=150000, min_team_size=1,
+            max_team_size=4, additional_requirements='Python 3.11, tests included. ' * 5, deadline=now + timedelta(days=30),
+            status='APPROVED', created_by=users[i % len(users)], created_at=now) for i in range(rows)],
+            lambda c: _legacy_challenge(c, 3), lambda c: c.to_dict(solution_count=3)),
+        'Solution': ([Solution(
+            id=i, challenge_id=i % 500, content='See the repository for details. ' * 4, score=87.5, status='SCORED',
+            submitted_by_user=users[i % len(users)], created_at=now) for i in range(rows)],
+            _legacy_solution, Solution.serializer),
+        'LeaderboardEntry': ([LeaderboardEntry(
+            id=i, user_id=i, score=1000 - i % 1000, challenges_completed=i % 40,
+            user=users[i % len(users)]) for i in range(rows)],
+            _legacy_leaderboard_entry, LeaderboardEntry.serializer),
+    }
+
+    flask_default = Flask(__name__).json  # what jsonify() used before init_json
+    stdlib = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=serialization._default)
+    encoders = [('stdlib json', lambda obj: stdlib.encode(obj).encode('utf-8'))]
+    if serialization.orjson is not None:
+        encoders.append(('orjson', serialization.dumps))
+
+    def per_row(fn):
+        best = min(timed(fn, 1) for _ in range(5))  # one call serializes all rows
+        return best / rows
+
+    for model, (objs, legacy, serializer) in models.items():
+        build = per_row(lambda: [legacy(o) for o in objs])
+        data = [legacy(o) for o in objs]
+        encode = per_row(lambda: flask_default.dumps(data).encode('utf-8'))
+        print(f'serialize  {model:<17} {"hand-written dict, Flask json":<30} '
+              f'build {build:6.2f} + encode {encode:6.2f} = {build + encode:6.2f} us/row')
+        build = per_row(lambda: [serializer(o) for o in objs])
+        data = [serializer(o) for o in objs]
+        for name, dumps in encoders:
+            encode = per_row(lambda: dumps(data))
+            print(f'serialize  {model:<17} {"Serializer, " + name:<30} '
+                  f'build {build:6.2f} + encode {encode:6.2f} = {build + encode:6.2f} us/row')
+
+
+BENCHMARKS = {
+    'ratelimit': ratelimit,
+    'metrics': metrics,
+    'logging': logging_,
+    'startup': startup,
+    'serialize': serialize,
+}
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        BENCHMARKS[name]()
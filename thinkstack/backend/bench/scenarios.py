@@ -0,0 +1,153 @@
+# bench/scenarios.py
+#
+# Request mixes the driver can run. Each factory gets the bench context
+# (app, scale, concurrency, ...) and returns a driver.Scenario.
+
+import random
+import time
+from bench.datagen import BENCH_PASSWORD, bench_email
+from bench.driver import Scenario
+
+
+def log_in(client, email):
+    """Log a worker in for its setup; a worker left anonymous would only measure 401s."""
+    for _ in range(30):
+        response = client.post('/api/login', json={'email': email, 'password': BENCH_PASSWORD})
+        if response.status_code != 503:  # the hashing pool is busy, e.g. every worker logging in at once
+            break
+        time.sleep(float(response.headers.get('Retry-After', 1)))
+    if response.status_code != 200:
+        raise RuntimeError(f'bench login as {email} failed with {response.status_code}')
+
+
+def challenges(ctx):
+    return Scenario('challenges', lambda client, state, i: client.get('/api/challenges'))
+
+
+def challenges_filtered(ctx):
+    return Scenario('challenges_filtered', lambda client, state, i: client.get(
+        '/api/challenges', query_string={'category': 'IoT', 'min_prize': 100, 'limit': 20}))
+
+
+def challenges_deep_page(ctx):
+    # Walk five pages once per worker, then keep fetching page six: with keyset
+    # paging it should cost the same as page one
+    def setup(client, worker):
+        cursor = None
+        for _ in range(5):
+            body = client.get('/api/challenges', query_string={'limit': 20, **({'cursor': cursor} if cursor else {})}).get_json()
+            cursor = body.get('next_cursor') or cursor
+        return {'cursor': cursor}
+
+    return Scenario('challenges_deep_page', lambda client, state, i: client.get(
+        '/api/challenges', query_string={'limit': 20, **({'cursor': state['cursor']} if state['cursor'] else {})}), setup)
+
+
+def challenge_search(ctx):
+    terms = ['solar', 'school network', 'health data', 'farm', 'payments mobile']
+    return Scenario('challenge_search', lambda client, state, i: client.get(
+        '/api/challenges/search', query_string={'q': terms[i % len(terms)]}))
+
+
+def leaderboard(ctx):
+    return Scenario('leaderboard', lambda client, state, i: client.get('/api/leaderboard'))
+
+
+def leaderboard_rank(ctx):
+    users = ctx['scale']['users']
+    return Scenario('leaderboard_rank', lambda client, state, i: client.get(
+        f'/api/leaderboard/around/{random.randint(1, users)}'))
+
+
+def login(ctx):
+    # Password hashing dominates, so this runs a smaller budget by default
+    users = ctx['scale']['users']
+    return Scenario('login', lambda client, state, i: client.post('/api/login', json={
+        'email': bench_email(i % users), 'password': BENCH_PASSWORD
+    }), requests=ctx['slow_requests'])
+
+
+def login_mixed(ctx):
+    # One request in four is a login, the rest are cheap reads. With hashing
+    # on the request thread the logins drag the reads down with them; with
+    # the hashing pool the reads should stay close to their solo numbers.
+    users = ctx['scale']['users']
+
+    def label(i):
+        return 'login' if i % 4 == 0 else ('challenges' if i % 2 else 'leaderboard_rank')
+
+    def request(client, state, i):
+        kind = label(i)
+        if kind == 'login':
+            return client.post('/api/login', json={'email': bench_email(i % users), 'password': BENCH_PASSWORD})
+        if kind == 'challenges':
+            return client.get('/api/challenges')
+        return client.get(f'/api/leaderboard/around/{random.randint(1, users)}')
+
+    return Scenario('login_mixed', request, requests=ctx['slow_requests'] * 4, label=label)
+
+
+def solutions(ctx):
+    # Each worker logs in as its own fresh submitter and submits to
+    # challenges 1, 2, 3... so nothing collides with the 409 duplicate check
+    emails = ctx['submitters']()
+
+    def setup(client, worker):
+        log_in(client, emails[worker])
+        return {'next': 0}
+
+    def request(client, state, i):
+        state['next'] += 1
+        return client.post('/api/solutions', json={
+            'challenge_id': state['next'],
+            'attachments': f'https://github.com/bench/submission-{i}',
+            'content': 'bench'
+        })
+
+    return Scenario('solutions', request, setup, requests=ctx['slow_requests'])
+
+
+def read_write(ctx):
+    # One request in four submits a solution, the rest read challenge pages and
+    # search. Every submission invalidates the cached listing, so reads go to
+    # the database while writes are committing. Compare a run with
+    # --sqlite-defaults (rollback journal, no write serializer) against one
+    # without to see what WAL and the serializer do for readers. The
+    # submitters are its own, not the ones the solutions scenario used.
+    emails = ctx['submitters']()
+    terms = ['solar', 'school network', 'health data', 'farm', 'payments mobile']
+
+    def label(i):
+        return 'write' if i % 4 == 0 else 'read'
+
+    def setup(client, worker):
+        log_in(client, emails[worker])
+        return {'next': 0}
+
+    def request(client, state, i):
+        if label(i) == 'write':
+            state['next'] += 1
+            return client.post('/api/solutions', json={
+                'challenge_id': state['next'],
+                'attachments': f'https://github.com/bench/read-write-{i}',
+                'content': 'bench'
+            })
+        if i % 2:
+            return client.get('/api/challenges', query_string={'limit': 20})
+        return client.get('/api/challenges/search', query_string={'q': terms[i % len(terms)]})
+
+    return Scenario('read_write', request, setup, requests=ctx['slow_requests'] * 4, label=label)
+
+
+SCENARIOS = {
+    'challenges': challenges,
+    'challenges_filtered': challenges_filtered,
+    'challenges_deep_page': challenges_deep_page,
+    'challenge_search': challenge_search,
+    'leaderboard': leaderboard,
+    'leaderboard_rank': leaderboard_rank,
+    'login': login,
+    'login_mixed': login_mixed,
+    'solutions': solutions,
+    'read_write': read_write,
+}
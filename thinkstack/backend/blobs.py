@@ -0,0 +1,208 @@
+# blobs.py
+#
+# Content-addressed store for uploaded attachments. A completed upload is
+# filed under its SHA-256 in a sharded tree,
+#
+#   UPLOAD_FOLDER/blobs/ab/cd/abcd1234...
+#
+# so the hundredth copy of the same starter kit costs no disk and no write:
+# the upload is hashed while it streams in (uploads.py), and if a blob with
+# that hash exists the partial file is simply dropped.
+#
+# Blob.ref_count tracks how many Solution rows use a blob. It is maintained by
+# mapper events below, so every code path that inserts or deletes solutions
+# through the ORM keeps it right, and attaching a blob that was collected in
+# the meantime fails the flush with BlobGone; `flask gc-blobs --recount` rebuilds it from
+# the solutions table if anything ever bypasses them. gc-blobs deletes blobs
+# nobody references once their grace period is over, expires abandoned
+# partial uploads and removes stray files.
+#
+# Downloads go through send_from_directory: with USE_X_SENDFILE (Apache,
+# lighttpd) or BLOB_X_ACCEL_PREFIX (nginx internal location mapped to the
+# blobs directory) the web server streams the file and the worker only sends
+# headers. Content never changes under a hash, so responses carry the hash
+# as ETag and a year-long immutable Cache-Control.
+
+import os
+from datetime import datetime, timedelta
+from flask import current_app, send_from_directory
+from sqlalchemy import event, update, select, func
+from sqlalchemy.exc import IntegrityError
+from db import db, Blob, Solution, UploadSession
+
+BLOB_MAX_AGE = 365 * 86400
+
+
+def blob_root():
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], 'blobs')
+
+
+def blob_relpath(sha256):
+    return os.path.join(sha256[:2], sha256[2:4], sha256)
+
+
+def blob_path(sha256):
+    return os.path.join(blob_root(), blob_relpath(sha256))
+
+
+def store(source_path, sha256, size):
+    """
+    File source_path (already hashed) under sha256. The source is moved into
+    place, or deleted if that content is stored already. Returns the Blob;
+    the caller commits.
+    """
+    path = blob_path(sha256)
+    if os.path.exists(path):
+        os.remove(source_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(source_path, path)
+
+    blob = db.session.get(Blob, sha256)
+    if blob is None:
+        try:
+            with db.session.begin_nested():
+                blob = Blob(sha256=sha256, size=size, ref_count=0)
+                db.session.add(blob)
+        except IntegrityError:
+            # Another request stored the same content a moment ago
+            blob = db.session.get(Blob, sha256)
+    blob.last_used_at = datetime.utcnow()
+    return blob
+
+
+def send_blob(sha256, download_name):
+    """Stream a blob as an attachment with immutable cache headers."""
+    relpath = blob_relpath(sha256)
+    response = send_from_directory(blob_root(), relpath, as_attachment=True, download_name=download_name,
+                                   etag=sha256, max_age=BLOB_MAX_AGE, conditional=True)
+    accel_prefix = current_app.config.get('BLOB_X_ACCEL_PREFIX')
+    if accel_prefix and response.status_code == 200:
+        # nginx serves the bytes from its internal location; send only headers
+        response.close()
+        response.direct_passthrough = False
+        response.set_data(b'')
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + relpath.replace(os.sep, '/')
+    # Per-user authorization happened in the view, so shared caches must not keep it
+    response.headers['Cache-Control'] = f'private, max-age={BLOB_MAX_AGE}, immutable'
+    return response
+
+
+# --- reference counting ---
+
+class BlobGone(Exception):
+    """The upload's blob was garbage collected before a solution could attach it."""
+
+
+def _adjust_ref_count(connection, upload_id, delta):
+    if not upload_id:
+        return
+    sha256 = select(UploadSession.sha256).where(UploadSession.id == upload_id).scalar_subquery()
+    result = connection.execute(
+        update(Blob.__table__)
+        .where(Blob.__table__.c.sha256 == sha256)
+        .values(ref_count=Blob.__table__.c.ref_count + delta)
+    )
+    # The UPDATE is also the re-check: gc-blobs may have deleted the blob
+    # after the view found the upload COMPLETE. Once this row is updated,
+    # the gc's own re-checking DELETE waits for us and then leaves it alone.
+    if delta > 0 and result.rowcount == 0:
+        raise BlobGone(upload_id)
+
+
+@event.listens_for(Solution, 'after_insert')
+def _solution_inserted(mapper, connection, target):
+    _adjust_ref_count(connection, target.upload_id, 1)
+
+
+@event.listens_for(Solution, 'after_delete')
+def _solution_deleted(mapper, connection, target):
+    _adjust_ref_count(connection, target.upload_id, -1)
+
+
+@event.listens_for(Solution, 'after_update')
+def _solution_updated(mapper, connection, target):
+    history = db.inspect(target).attrs.upload_id.history
+    if history.has_changes():
+        for old in history.deleted:
+            _adjust_ref_count(connection, old, -1)
+        for new in history.added:
+            _adjust_ref_count(connection, new, 1)
+
+
+def recount_references():
+    """Rebuild every Blob.ref_count from the solutions table. Returns the number corrected."""
+    actual = dict(
+        db.session.query(UploadSession.sha256, func.count(Solution.id))
+        .join(Solution, Solution.upload_id == UploadSession.id)
+        .group_by(UploadSession.sha256)
+        .all()
+    )
+    corrected = 0
+    for blob in Blob.query.all():
+        count = actual.get(blob.sha256, 0)
+        if blob.ref_count != count:
+            blob.ref_count = count
+            corrected += 1
+    db.session.commit()
+    return corrected
+
+
+# --- garbage collection ---
+
+def collect_garbage(grace=timedelta(hours=24), dry_run=False):
+    """
+    Delete unreferenced blobs idle for longer than `grace`, expire uploads
+    abandoned for that long, and remove files the database does not know.
+    Returns a dict of counts.
+    """
+    from uploads import forget, partial_path
+    cutoff = datetime.utcnow() - grace
+    stats = {'blobs': 0, 'bytes': 0, 'stale_uploads': 0, 'stray_files': 0}
+
+    orphaned = [Blob.ref_count <= 0, Blob.last_used_at < cutoff]
+    for sha256, size in db.session.query(Blob.sha256, Blob.size).filter(*orphaned).all():
+        if not dry_run:
+            # Re-check in the DELETE: a solution may have attached it meanwhile
+            if not Blob.query.filter(Blob.sha256 == sha256, *orphaned).delete(synchronize_session=False):
+                continue
+            # Unattached uploads of this content can no longer be submitted
+            UploadSession.query.filter(UploadSession.sha256 == sha256, UploadSession.status == 'COMPLETE')\
+                .update({'status': 'EXPIRED'}, synchronize_session=False)
+            db.session.commit()
+            try:
+                os.remove(blob_path(sha256))
+            except FileNotFoundError:
+                pass
+        stats['blobs'] += 1
+        stats['bytes'] += size
+
+    stale = UploadSession.query.filter(UploadSession.status == 'UPLOADING', UploadSession.updated_at < cutoff).all()
+    for upload in stale:
+        stats['stale_uploads'] += 1
+        if dry_run:
+            continue
+        upload.status = 'EXPIRED'
+        db.session.commit()
+        forget(upload)
+        try:
+            os.remove(partial_path(upload))
+        except FileNotFoundError:
+            pass
+
+    # Files moved into place by a request that then failed to commit
+    known = None
+    root = blob_root()
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if datetime.utcfromtimestamp(os.path.getmtime(path)) >= cutoff:
+                continue
+            if known is None:
+                known = {sha for (sha,) in db.session.query(Blob.sha256)}
+            if name not in known:
+                stats['stray_files'] += 1
+                stats['bytes'] += os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+    return stats
@@ -0,0 +1,275 @@
+# cache.py
+#
+# Response cache for the public, anonymous read endpoints.
+#
+# Entries are keyed by path + query string + the current version of each tag
+# the route depends on ('challenges', 'leaderboard'). Writes call
+# cache.invalidate(tag), which bumps the tag's version: every key built from
+# the old version simply stops being looked up and ages out of the LRU, so
+# there is no need to track which keys belong to which tag.
+#
+# `cache` is shared by every app in the process (the decorators are applied at
+# import time); each app's backend and on/off switch live in its
+# app.extensions['response_cache'] and are looked up through current_app, so
+# two apps - two tests, say - never see each other's entries.
+#
+# The default backend is an in-process LRU, which is exact for a single
+# worker; with several workers a write only invalidates the worker that did
+# it, and the others catch up within CACHE_DEFAULT_TTL. Set CACHE_REDIS_URL
+# (or pass any object with the RedisBackend client API as CACHE_BACKEND) to
+# share entries and tag versions between workers.
+#
+# The same tag versions drive conditional GETs: cache.conditional(tag) gives a
+# route a strong ETag derived from the versions, and answers a matching
+# If-None-Match with 304 before the view (and its queries) runs at all.
+#
+# Both are keyed on versions a write has just bumped, so what they store must
+# be at least as new as that write: with a read replica (dbrouting.py), a
+# response that read from the replica is served but neither stored nor given
+# an ETag.
+
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, has_app_context, request, make_response
+from dbrouting import replica_used
+
+
+class LRUCache:
+    """Thread-safe LRU with a per-entry TTL and a bound on the number of entries."""
+
+    def __init__(self, max_entries=1024, default_ttl=30):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class InProcessBackend:
+    def __init__(self, max_entries=1024, default_ttl=30):
+        self.entries = LRUCache(max_entries, default_ttl)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._process_id = uuid.uuid4().hex
+
+    @property
+    def epoch(self):
+        # Versions restart at 0 in every process and don't see other workers'
+        # writes, so ETags carry the process id (no collisions between workers
+        # or after a restart) and roll over every TTL, the same staleness
+        # bound the cached entries have.
+        return f'{self._process_id}:{int(time.monotonic() // self.entries.default_ttl)}'
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.entries.set(key, value, ttl)
+
+    def versions(self, tags):
+        return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        self.entries.clear()
+
+
+class RedisBackend:
+    """
+    Shared backend. Only uses get/set(ex=)/mget/incr, so a redis.Redis client
+    works, and so does any small stand-in exposing those four methods.
+    """
+
+    def __init__(self, client, prefix='thinkstack:cache:', default_ttl=30):
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.epoch = ''  # versions are shared, so ETags are valid across workers
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl or self.default_ttl)
+
+    def versions(self, tags):
+        raw = self.client.mget([self.prefix + 'tag:' + tag for tag in tags])
+        return [int(v) if v is not None else 0 for v in raw]
+
+    def bump(self, tags):
+        for tag in tags:
+            self.client.incr(self.prefix + 'tag:' + tag)
+
+    def clear(self):
+        # Bumping every tag would be enough, but shared entries also expire on their own
+        pass
+
+
+class CacheState:
+    """One app's cache: where entries go and whether caching is on."""
+
+    def __init__(self, backend, enabled=True):
+        self.backend = backend
+        self.enabled = enabled
+
+
+class ResponseCache:
+    @staticmethod
+    def _state():
+        if not has_app_context():
+            return None
+        return current_app.extensions.get('response_cache')
+
+    @property
+    def backend(self):
+        state = self._state()
+        return state.backend if state else None
+
+    @property
+    def enabled(self):
+        state = self._state()
+        return state.enabled if state else False
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_ENABLED', True)
+        app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('CACHE_DEFAULT_TTL', 30)
+        app.config.setdefault('CACHE_REDIS_URL', None)
+        app.config.setdefault('CACHE_BACKEND', None)
+
+        ttl = app.config['CACHE_DEFAULT_TTL']
+        if app.config['CACHE_BACKEND'] is not None:
+            backend = app.config['CACHE_BACKEND']
+        elif app.config['CACHE_REDIS_URL']:
+            import redis  # optional dependency, only needed for the shared backend
+            backend = RedisBackend(redis.Redis.from_url(app.config['CACHE_REDIS_URL']), default_ttl=ttl)
+        else:
+            backend = InProcessBackend(app.config['CACHE_MAX_ENTRIES'], ttl)
+        app.extensions['response_cache'] = CacheState(backend, app.config['CACHE_ENABLED'])
+
+    def versions(self, *tags):
+        return self.backend.versions(tags) if self.backend else [0] * len(tags)
+
+    def _key(self, tags):
+        args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        versions = ','.join(str(v) for v in self.versions(*tags))
+        return f'{request.path}?{args}#{versions}'
+
+    def cached(self, *tags, ttl=None):
+        """
+        Cache successful responses of a GET view. The view must not depend on
+        who is asking - only on the URL and the data behind the given tags.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                backend = self.backend
+                if not self.enabled or backend is None or request.method != 'GET':
+                    return f(*args, **kwargs)
+
+                key = self._key(tags)
+                hit = backend.get(key)
+                if hit is not None:
+                    response = make_response(hit['body'], hit['status'])
+                    response.mimetype = hit['mimetype']
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200 and not response.direct_passthrough and not replica_used():
+                    backend.set(key, {
+                        'body': response.get_data(as_text=True),
+                        'status': response.status_code,
+                        'mimetype': response.mimetype
+                    }, ttl)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return decorated_function
+        return decorator
+
+    def etag(self, *tags):
+        """Strong ETag for the current URL given the current versions of tags."""
+        args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        versions = ','.join(str(v) for v in self.versions(*tags))
+        epoch = getattr(self.backend, 'epoch', '')
+        return hashlib.sha1(f'{request.path}?{args}#{versions}#{epoch}'.encode()).hexdigest()
+
+    def conditional(self, *tags):
+        """
+        ETag / If-None-Match support for a GET view whose body changes only
+        when one of the tags is invalidated. A matching request gets an empty
+        304 without calling the view.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if request.method != 'GET':
+                    return f(*args, **kwargs)
+
+                etag = self.etag(*tags)
+                if request.if_none_match.contains(etag):
+                    response = make_response('', 304)
+                    response.set_etag(etag)
+                    response.headers['Cache-Control'] = 'no-cache'
+                    return response
+
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200 and not replica_used():
+                    response.set_etag(etag)
+                    # Let browsers keep the body but revalidate on every use
+                    response.headers.setdefault('Cache-Control', 'no-cache')
+                return response
+            return decorated_function
+        return decorator
+
+    def invalidate(self, *tags):
+        """Call after the write has been committed."""
+        if self.backend is not None:
+            self.backend.bump(tags)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+
+cache = ResponseCache()
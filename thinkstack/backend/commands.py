@@ -0,0 +1,127 @@
+# commands.py
+#
+# `flask <command>` maintenance commands, registered on the app by
+# create_app(). `flask db ...` comes from Flask-Migrate, which create_app
+# only loads when running under the flask CLI.
+
+import click
+from datetime import datetime, timedelta
+from flask.cli import with_appcontext
+from db import db, Badge
+from search import ensure_search_index
+from mailer import outbox
+from dbrouting import replica_engine, sync_sqlite_replica
+import blobs
+
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    """Initialize the database."""
+    try:
+        db.create_all()
+        ensure_search_index()
+        if not Badge.query.first():
+            badges = [
+                Badge(name='First Solution', description='Submitted your first solution', icon='star'),
+                Badge(name='Team Player', description='Joined your first team', icon='users'),
+                Badge(name='Challenge Creator', description='Created your first challenge', icon='plus-circle'),
+                Badge(name='Top Scorer', description='Reached top 10 in leaderboard', icon='trophy'),
+                Badge(name='Consistent Solver', description='Solved 5 challenges', icon='check-circle')
+            ]
+            for badge in badges:
+                db.session.add(badge)
+            db.session.commit()
+        print("Database initialized successfully.")
+    except Exception as e:
+        print(f"Error initializing database: {str(e)}")
+        db.session.rollback()
+
+
+@click.command("check-query-plans")
+@with_appcontext
+def check_query_plans_command():
+    """Fail if any hot query falls back to a full table scan."""
+    from query_plans import check_query_plans
+    failed = False
+    for name, plan, ok in check_query_plans():
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+        for step in plan:
+            print(f"       {step}")
+        failed = failed or not ok
+    if failed:
+        raise click.ClickException("Full table scan in a hot query - check the indexes in db.py")
+
+
+@click.command("replay-score-ledger")
+@click.option("--dry-run", is_flag=True, help="Only report totals that disagree with the ledger.")
+@with_appcontext
+def replay_score_ledger_command(dry_run):
+    """Rebuild the leaderboard tables from the score_event ledger."""
+    from helper import replay_score_ledger
+    mismatches = replay_score_ledger(dry_run=dry_run)
+    for user_id, category, expected, actual in mismatches:
+        print(f"user {user_id} [{category or 'global'}]: ledger {expected} != stored {actual}")
+    print(f"{len(mismatches)} mismatched totals" + ("" if dry_run else ", leaderboard rebuilt"))
+
+
+@click.command("send-mail")
+@click.option("--once", is_flag=True, help="Deliver what is due now and exit.")
+@click.option("--retry-failed", is_flag=True, help="Queue FAILED messages for another round first.")
+@with_appcontext
+def send_mail_command(once, retry_failed):
+    """Run the outbox sender in the foreground (use with MAIL_OUTBOX_AUTOSTART=False)."""
+    from db import OutboxMessage
+    if retry_failed:
+        count = OutboxMessage.query.filter_by(status='FAILED')\
+            .update({'status': 'PENDING', 'attempts': 0, 'next_attempt_at': datetime.utcnow()})
+        db.session.commit()
+        print(f"Re-queued {count} failed messages")
+    try:
+        outbox.run(once=once)
+    finally:
+        outbox.shutdown()
+    pending = OutboxMessage.query.filter(OutboxMessage.status.in_(['PENDING', 'SENDING'])).count()
+    print(f"Outbox: {pending} messages still pending")
+
+
+@click.command("gc-blobs")
+@click.option("--grace-hours", default=24, show_default=True, help="Keep unreferenced blobs and idle uploads this long.")
+@click.option("--recount", is_flag=True, help="Rebuild reference counts from the solutions table first.")
+@click.option("--dry-run", is_flag=True, help="Only report what would be removed.")
+@with_appcontext
+def gc_blobs_command(grace_hours, recount, dry_run):
+    """Delete unreferenced attachment blobs and abandoned uploads."""
+    if recount:
+        print(f"Corrected {blobs.recount_references()} reference counts")
+    stats = blobs.collect_garbage(timedelta(hours=grace_hours), dry_run=dry_run)
+    print(f"{'Would remove' if dry_run else 'Removed'} {stats['blobs']} blobs, {stats['stray_files']} stray files "
+          f"({stats['bytes']} bytes); expired {stats['stale_uploads']} abandoned uploads")
+
+
+@click.command("sync-replica")
+@with_appcontext
+def sync_replica_command():
+    """Copy the SQLite primary into the SQLite stand-in replica."""
+    replica = replica_engine()
+    if replica is None:
+        raise click.ClickException("DATABASE_REPLICA_URL is not set")
+    if db.engine.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        raise click.ClickException("sync-replica only copies SQLite files; use the database's own replication")
+    sync_sqlite_replica(db.engine, replica)
+    print(f"Replica {replica.url.database} is up to date")
+
+
+COMMANDS = (
+    init_db_command,
+    check_query_plans_command,
+    replay_score_ledger_command,
+    send_mail_command,
+    gc_blobs_command,
+    sync_replica_command,
+)
+
+
+def register_commands(app):
+    for command in COMMANDS:
+        app.cli.add_command(command)
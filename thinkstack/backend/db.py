@@ -1,10 +1,18 @@
 # db.py (Revamped)
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from hashing import hasher, HashingBusy
+from dbrouting import RoutingSession
+from serialization import Serializer, as_dict
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def dollars(cents):
+    return cents / 100.0
 
-db = SQLAlchemy()
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -16,21 +24,38 @@ class User(db.Model):
     is_suspended = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Both run in the hashing pool (see hashing.py) and may raise HashingBusy
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return hasher.verify(self.password_hash, password)
+
+    def rehash_password_if_needed(self, password):
+        """Upgrade an outdated hash after a successful login. Returns True if changed."""
+        if not hasher.needs_rehash(self.password_hash):
+            return False
+        try:
+            self.set_password(password)
+        except HashingBusy:
+            return False  # not worth failing a login over; try again next time
+        return True
     
+    @property
+    def is_admin(self):
+        return self.role == 'ADMIN'
+
+    serializer = Serializer({
+        'id': 'id',
+        'name': 'name',
+        'email': 'email',
+        'role': 'role',
+        'is_verified': 'is_verified',
+        'created_at': 'created_at',
+    })
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'email': self.email,
-            'role': self.role,
-            'is_verified': self.is_verified,
-            'created_at': self.created_at.isoformat()
-        }
+        return self.serializer(self)
 
 class Team(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -40,14 +65,16 @@ class Team(db.Model):
     created_by = db.relationship('User', backref='created_teams')
     members = db.relationship('TeamMember', backref='team', cascade='all, delete-orphan')
     
+    serializer = Serializer({
+        'id': 'id',
+        'name': 'name',
+        'created_by': 'created_by.name',
+        'created_at': 'created_at',
+        'member_count': ('members', len),
+    })
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'created_by': self.created_by.name if self.created_by else None,
-            'created_at': self.created_at.isoformat(),
-            'member_count': len(self.members)
-        }
+        return self.serializer(self)
 
 class TeamMember(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -57,6 +84,11 @@ class TeamMember(db.Model):
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
     user = db.relationship('User', backref='team_memberships')
 
+    __table_args__ = (
+        db.Index('ix_team_member_team_id_user_id', 'team_id', 'user_id'),
+        db.Index('ix_team_member_user_id', 'user_id'),
+    )
+
 # backend/db.py
 
 class Challenge(db.Model):
@@ -77,29 +109,77 @@ class Challenge(db.Model):
     # NEW FIELD to match the form
     additional_requirements = db.Column(db.Text, nullable=True)
 
+    # Largest attachment a solution may upload; NULL means UPLOAD_MAX_BYTES
+    max_upload_bytes = db.Column(db.BigInteger, nullable=True)
+
     deadline = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.String(20), default='PENDING')
     created_by_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.relationship('User', backref='challenges')
+
+    # Listings filter on status and page newest-first on (created_at, id)
+    __table_args__ = (
+        db.Index('ix_challenge_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_challenge_created_at', 'created_at', 'id'),
+        db.Index('ix_challenge_created_by_id', 'created_by_id', 'created_at'),
+    )
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'description': self.description,
-            'category': self.category,
-            'participationType': self.participation_type, # Use camelCase for JSON consistency
-            'cashPrize': self.cash_prize_cents / 100.0, # Convert back to dollars for frontend
-            'minTeamSize': self.min_team_size,
-            'maxTeamSize': self.max_team_size,
-            'additionalRequirements': self.additional_requirements,
-            'deadline': self.deadline.isoformat(),
-            'status': self.status,
-            'createdBy': self.created_by.name if self.created_by else None,
-            'createdAt': self.created_at.isoformat(),
-            'solutionCount': len(self.solutions) if self.solutions else 0
-        }
+    @staticmethod
+    def solution_counts(challenge_ids):
+        """
+        Map challenge id -> number of solutions with one grouped COUNT query,
+        so listings don't have to load every Solution row just to count them.
+        """
+        if not challenge_ids:
+            return {}
+        return dict(Challenge.solution_counts_query(challenge_ids).all())
+
+    @staticmethod
+    def solution_counts_query(challenge_ids):
+        return db.session.query(Solution.challenge_id, func.count(Solution.id))\
+            .filter(Solution.challenge_id.in_(challenge_ids))\
+            .group_by(Solution.challenge_id)
+
+    serializer = Serializer({
+        'id': 'id',
+        'title': 'title',
+        'description': 'description',
+        'category': 'category',
+        'participationType': 'participation_type', # Use camelCase for JSON consistency
+        'cashPrize': ('cash_prize_cents', dollars), # Convert back to dollars for frontend
+        'minTeamSize': 'min_team_size',
+        'maxTeamSize': 'max_team_size',
+        'additionalRequirements': 'additional_requirements',
+        'maxUploadBytes': 'max_upload_bytes',
+        'deadline': 'deadline',
+        'status': 'status',
+        'createdBy': 'created_by.name',
+        'createdAt': 'created_at',
+    })
+    # GET /api/challenges/<id> also answers to the names older clients used
+    detail_serializer = serializer.extend({
+        'prize': ('cash_prize_cents', dollars),
+        'type': 'participation_type',
+        'created_by': 'created_by.name',
+    })
+
+    def to_detail_dict(self):
+        # GET /api/challenges/<id>, in the shape the detail page has always read
+        data = self.detail_serializer(self)
+        data['createdBy'] = data['created_by'] = data['createdBy'] or 'Unknown'
+        # There is no participant limit column yet; ChallengeDetail.js skips the line while it's null
+        data['maxParticipants'] = None
+        data['currentParticipants'] = 0
+        return data
+
+    def to_dict(self, solution_count=None):
+        # Listings pass solution_count in (see solution_counts) to skip the lazy load
+        if solution_count is None:
+            solution_count = len(self.solutions) if self.solutions else 0
+        data = self.serializer(self)
+        data['solutionCount'] = solution_count
+        return data
 
 class Solution(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -111,37 +191,222 @@ class Solution(db.Model):
     submitted_by_team = db.relationship('Team', backref='solutions')
     content = db.Column(db.Text, nullable=False)
     attachments = db.Column(db.String(255))
+    # Uploaded file (see UploadSession), alongside or instead of a link in attachments
+    upload_id = db.Column(db.String(32), db.ForeignKey('upload_session.id'), nullable=True)
+    upload = db.relationship('UploadSession')
     score = db.Column(db.Float, default=0)
     status = db.Column(db.String(20), default='SUBMITTED')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_solution_challenge_id_user_id', 'challenge_id', 'submitted_by_user_id'),
+        db.Index('ix_solution_submitted_by_user_id', 'submitted_by_user_id'),
+    )
     
+    serializer = Serializer({
+        'id': 'id',
+        'challenge_id': 'challenge_id',
+        'content': 'content',
+        'file': ('upload', as_dict),
+        'score': 'score',
+        'status': 'status',
+        'submitted_by': 'submitted_by_user.name',
+        'submitted_by_team': 'submitted_by_team.name',
+        'created_at': 'created_at',
+    })
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'challenge_id': self.challenge_id,
-            'content': self.content,
-            'score': self.score,
-            'status': self.status,
-            'submitted_by': self.submitted_by_user.name if self.submitted_by_user else None,
-            'submitted_by_team': self.submitted_by_team.name if self.submitted_by_team else None,
-            'created_at': self.created_at.isoformat()
-        }
+        return self.serializer(self)
 
 class LeaderboardEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     score = db.Column(db.Integer, default=0)
     challenges_completed = db.Column(db.Integer, default=0)
-    category_scores = db.Column(db.Text) # Storing as JSON string
     user = db.relationship('User', backref='leaderboard', uselist=False)
+
+    __table_args__ = (
+        db.Index('ix_leaderboard_entry_score', 'score', 'challenges_completed'),
+        # Unique so points can be applied with an INSERT ... ON CONFLICT upsert
+        db.Index('ix_leaderboard_entry_user_id', 'user_id', unique=True),
+    )
     
+    serializer = Serializer({
+        'user_id': 'user_id',                                              # <-- ADDED for potential profile linking
+        'user_name': 'user.name',
+        'score': 'score',
+        'challenges_completed': 'challenges_completed',
+    })
+
+    def to_dict(self):
+        return self.serializer(self)
+
+class CategoryScore(db.Model):
+    """
+    A solver's running total within one challenge category. Kept next to
+    LeaderboardEntry by update_leaderboard; the (category, score) index lets a
+    category leaderboard be read straight off the index like the global one.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    score = db.Column(db.Integer, nullable=False, default=0)
+    challenges_completed = db.Column(db.Integer, nullable=False, default=0)
+    user = db.relationship('User', backref='category_scores')
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'category', name='uq_category_score_user_id_category'),
+        db.Index('ix_category_score_ranking', 'category', 'score', 'challenges_completed'),
+    )
+
+    serializer = Serializer({
+        'user_id': 'user_id',
+        'user_name': 'user.name',
+        'category': 'category',
+        'score': 'score',
+        'challenges_completed': 'challenges_completed',
+    })
+
     def to_dict(self):
-        return {
-            'user_id': self.user_id,                                           # <-- ADDED for potential profile linking
-            'user_name': self.user.name,
-            'score': self.score,
-            'challenges_completed': self.challenges_completed
-        }
+        return self.serializer(self)
+
+class ScoreEvent(db.Model):
+    """
+    Append-only ledger of point awards. LeaderboardEntry and CategoryScore are
+    running totals over these rows and can be rebuilt from them at any time
+    (see helper.replay_score_ledger). Never update or delete events.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    points = db.Column(db.Integer, nullable=False)
+    # How many challenges this award counts as completed (1 for a scored solution)
+    completed = db.Column(db.Integer, nullable=False, default=1)
+    category = db.Column(db.String(50), nullable=True)
+    solution_id = db.Column(db.Integer, db.ForeignKey('solution.id'), nullable=True)
+    reason = db.Column(db.String(50), nullable=False, default='award')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_score_event_user_id', 'user_id'),
+    )
+
+    serializer = Serializer({
+        'id': 'id',
+        'user_id': 'user_id',
+        'points': 'points',
+        'completed': 'completed',
+        'category': 'category',
+        'solution_id': 'solution_id',
+        'reason': 'reason',
+        'created_at': 'created_at',
+    })
+
+    def to_dict(self):
+        return self.serializer(self)
+
+class UploadSession(db.Model):
+    """
+    A resumable, chunked file upload (see uploads.py). Bytes go to a partial
+    file on disk as they arrive; `received` is the offset the next chunk must
+    start at. Once complete the content lives in the blob store under
+    sha256 (see Blob) and the upload can be attached to a Solution.
+    """
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('challenge.id'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)  # declared up front
+    received = db.Column(db.BigInteger, nullable=False, default=0)
+    expected_sha256 = db.Column(db.String(64), nullable=True)  # optional, from the client
+    sha256 = db.Column(db.String(64), nullable=True)  # set on completion
+    status = db.Column(db.String(20), nullable=False, default='UPLOADING')  # UPLOADING, COMPLETE, EXPIRED
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_upload_session_user_id', 'user_id'),
+        # Blob reference counting and garbage collection look uploads up by content
+        db.Index('ix_upload_session_sha256', 'sha256'),
+        db.Index('ix_upload_session_status_updated_at', 'status', 'updated_at'),
+    )
+
+    serializer = Serializer({
+        'id': 'id',
+        'challenge_id': 'challenge_id',
+        'filename': 'filename',
+        'size': 'size',
+        'received': 'received',
+        'sha256': 'sha256',
+        'status': 'status',
+        'created_at': 'created_at',
+    })
+
+    def to_dict(self):
+        return self.serializer(self)
+
+class Blob(db.Model):
+    """
+    Content-addressed file in the blob store (see blobs.py), shared by every
+    completed upload with the same SHA-256. ref_count is the number of
+    Solution rows attached to it; blobs left at zero are garbage collected.
+    """
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Last time an upload completed with this content; unattached blobs get a grace period from here
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_blob_ref_count_last_used_at', 'ref_count', 'last_used_at'),
+    )
+
+class TokenRevocation(db.Model):
+    """
+    Revoked token ids and per-user cut-offs (see tokens.py), shared by every
+    worker. Rows are dead once expires_at passes and are pruned after that.
+    """
+    key = db.Column(db.String(100), primary_key=True)  # 'thinkstack:revoked:<jti>' or '...:user:<id>'
+    value = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class OutboxMessage(db.Model):
+    """
+    Outgoing email, written in the same transaction as whatever triggered it
+    and delivered later by the background sender in mailer.py.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    recipients = db.Column(db.Text, nullable=False)  # comma separated
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=True)
+    html = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='PENDING')  # PENDING, SENDING, SENT, FAILED
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # The sender's "what is due" scan
+        db.Index('ix_outbox_message_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    serializer = Serializer({
+        'id': 'id',
+        'recipients': ('recipients', lambda recipients: recipients.split(',')),
+        'subject': 'subject',
+        'status': 'status',
+        'attempts': 'attempts',
+        'next_attempt_at': 'next_attempt_at',
+        'last_error': 'last_error',
+        'created_at': 'created_at',
+        'sent_at': 'sent_at',
+    })
+
+    def to_dict(self):
+        return self.serializer(self)
 
 class Badge(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -169,14 +434,16 @@ class TeamInvitation(db.Model):
     invited_by = db.relationship('User', foreign_keys=[invited_by_id])
     invited_user = db.relationship('User', foreign_keys=[invited_user_id])
     
+    serializer = Serializer({
+        'id': 'id',
+        'team_name': 'team.name',
+        'invited_by': 'invited_by.name',
+        'status': 'status',
+        'sent_at': 'sent_at',
+    })
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'team_name': self.team.name,
-            'invited_by': self.invited_by.name,
-            'status': self.status,
-            'sent_at': self.sent_at.isoformat()
-        }
+        return self.serializer(self)
 
 # ### Summary of Changes
 
@@ -0,0 +1,142 @@
+# dbrouting.py
+#
+# Engine configuration and read-replica routing.
+#
+# The primary database comes from DATABASE_URL: SQLite for development, or
+# any client/server URL (postgresql://, mysql://...) in production. For a
+# client/server database the engine is pooled with DB_POOL_SIZE connections
+# plus DB_MAX_OVERFLOW extra under load, waits DB_POOL_TIMEOUT seconds for a
+# free one, recycles connections after DB_POOL_RECYCLE seconds and checks
+# them with a cheap ping before use (DB_POOL_PRE_PING) so a restarted
+# database server does not surface as errors on the first requests.
+#
+# With DATABASE_REPLICA_URL set, routes marked @read_only send their SELECTs
+# to the replica; everything else - and any write or flush, even inside a
+# read-only route, plus every read after it in the same request - goes to the
+# primary. Without a replica @read_only does nothing. A replica can lag, so
+# only mark routes where a few seconds of staleness is fine. Responses that
+# outlive the request are the exception: a response that did read from the
+# replica is flagged (replica_used()) so the response cache neither stores it
+# nor gives it an ETag - either would otherwise file a lagging page under the
+# tag version a write just bumped, and keep serving it after the replica
+# caught up.
+#
+# Two SQLite files work as a stand-in pair for development and tests:
+#
+#   DATABASE_URL=sqlite:///primary.db DATABASE_REPLICA_URL=sqlite:///replica.db
+#   flask sync-replica        # copy the primary into the replica
+#
+# and the replica then lags until the next sync, like a real one would.
+
+import os
+from contextlib import contextmanager
+from functools import wraps
+import sqlalchemy as sa
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+
+
+def pool_options(url, config):
+    """SQLALCHEMY_ENGINE_OPTIONS for `url`; SQLite keeps SQLAlchemy's defaults."""
+    if sa.engine.make_url(url).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+
+def configure_engines(app):
+    """Call before db.init_app: sets the pool options and creates the replica engine."""
+    app.config.setdefault('DB_POOL_SIZE', 10)
+    app.config.setdefault('DB_MAX_OVERFLOW', 20)
+    app.config.setdefault('DB_POOL_TIMEOUT', 30)
+    app.config.setdefault('DB_POOL_RECYCLE', 1800)
+    app.config.setdefault('DB_POOL_PRE_PING', True)
+    app.config.setdefault('SQLALCHEMY_REPLICA_URI', None)
+
+    options = pool_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**options, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+
+    replica_url = app.config['SQLALCHEMY_REPLICA_URI']
+    if replica_url:
+        if replica_url.startswith('sqlite:///') and not replica_url.startswith('sqlite:////'):
+            # Relative SQLite paths live in the instance folder, like Flask-SQLAlchemy's
+            replica_url = 'sqlite:///' + os.path.join(app.instance_path, replica_url[len('sqlite:///'):])
+        app.extensions['db_replica'] = sa.create_engine(replica_url, **pool_options(replica_url, app.config))
+
+
+def app_engines(app):
+    """Every engine `app` talks to: Flask-SQLAlchemy's and the replica's."""
+    engines = []
+    db = app.extensions.get('sqlalchemy')
+    if db is not None:
+        with app.app_context():
+            engines.extend(db.engines.values())
+    if app.extensions.get('db_replica') is not None:
+        engines.append(app.extensions['db_replica'])
+    return engines
+
+
+def replica_engine():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('db_replica')
+
+
+def _is_read(clause):
+    return isinstance(clause, (sa.sql.Select, sa.sql.CompoundSelect)) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """Sends the SELECTs of @read_only routes to the replica engine."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if self._flushing and has_app_context():
+            # Read your own writes: the rest of the request stays on the primary
+            g.primary_reads = True
+        if bind is None and not self._flushing and has_app_context() and g.get('use_replica') \
+                and not g.get('primary_reads') and _is_read(clause):
+            engine = replica_engine()
+            if engine is not None:
+                g.replica_used = True
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(f):
+    """The route only reads, so its queries may be served by the replica."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        previous = g.get('use_replica', False)
+        g.use_replica = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.use_replica = previous
+    return decorated_function
+
+
+@contextmanager
+def primary_reads():
+    """Send every query in the block to the primary, @read_only or not."""
+    previous = g.get('primary_reads', False)
+    g.primary_reads = True
+    try:
+        yield
+    finally:
+        g.primary_reads = previous
+
+
+def replica_used():
+    """Whether this request has read anything from the replica."""
+    return g.get('replica_used', False)
+
+
+def sync_sqlite_replica(primary, replica):
+    """Copy a SQLite primary into a SQLite replica with the online backup API."""
+    with primary.connect() as source, replica.connect() as target:
+        source.connection.driver_connection.backup(target.connection.driver_connection)
@@ -0,0 +1,130 @@
+# hashing.py
+#
+# Password hashing off the request thread. Werkzeug's KDF is slow on purpose
+# (hundreds of ms per call), so registration or login spikes would otherwise
+# pin every request worker and starve cheap endpoints. Hashes are computed in
+# a small process pool instead, behind a bounded queue: when it is full we
+# fail fast with HashingBusy (the routes turn that into a 503 + Retry-After)
+# rather than letting requests pile up behind it.
+#
+# Each app has its own hasher, pool and settings (app.extensions
+# ['password_hasher'], see init_hasher); `hasher` resolves to the current
+# app's, or outside an app context (scripts, migrations) to one that hashes
+# on the calling thread.
+
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from flask import current_app, has_app_context
+from werkzeug.local import LocalProxy
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(Exception):
+    """The hashing pool is at its queue-depth limit; retry shortly."""
+
+
+def _hash(password, method):
+    # Runs in the worker process
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.method = 'pbkdf2:sha256:600000'
+        self.workers = 2
+        self.queue_depth = 8
+        self.timeout = 10
+        # Until init_app runs (CLI scripts, migrations) hash on the calling thread
+        self.inline = True
+        self._prefix = None
+        self._executor = None
+        self._slots = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+        app.config.setdefault('PASSWORD_HASH_QUEUE_DEPTH', 8)
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10)
+        app.config.setdefault('PASSWORD_HASH_INLINE', False)
+
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.queue_depth = max(app.config['PASSWORD_HASH_QUEUE_DEPTH'], self.workers)
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+        self.inline = app.config['PASSWORD_HASH_INLINE']
+        self._prefix = None
+        self._slots = threading.BoundedSemaphore(self.queue_depth)
+        app.extensions['password_hasher'] = self
+
+    @property
+    def in_flight(self):
+        """Hashing jobs queued or running right now."""
+        return self._in_flight
+
+    def _get_executor(self):
+        # Started on first use so importing the app stays cheap
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _run(self, fn, *args):
+        if self.inline or self._slots is None:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy('Too many password operations in progress')
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingBusy('Password hashing timed out')
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(_verify, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        True when password_hash was made with different parameters than the
+        configured method (e.g. fewer pbkdf2 iterations), so it should be
+        upgraded the next time we see the plaintext.
+        """
+        if self._prefix is None:
+            # Let Werkzeug spell out the defaults ('pbkdf2' -> 'pbkdf2:sha256:600000')
+            self._prefix = generate_password_hash('', method=self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
+
+    def shutdown(self, wait=False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+def init_hasher(app):
+    PasswordHasher().init_app(app)
+
+
+_inline_hasher = PasswordHasher()
+hasher = LocalProxy(lambda: current_app.extensions['password_hasher'] if has_app_context() else _inline_hasher)
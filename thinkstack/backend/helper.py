@@ -1,26 +1,404 @@
-from flask import session, jsonify
-from db import db, User, LeaderboardEntry # Adjust the import path as needed
+from flask import session, jsonify, g, current_app, has_app_context
+from db import db, User, Solution, LeaderboardEntry, CategoryScore, ScoreEvent # Adjust the import path as needed
+from leaderboard import leaderboard, ranking_rows_query
+from cache import cache, LRUCache
+from tokens import revocations
+from flask_jwt_extended import verify_jwt_in_request
+from sqlalchemy import func, event, inspect, or_, select, literal
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from sqlalchemy.orm.util import identity_key
+from collections import defaultdict, namedtuple
+from types import SimpleNamespace
+from datetime import datetime
+import base64
+import json
+
+# Identity cache: column values of recently seen users, keyed by id, so an
+# authenticated request can rebuild its User without touching the users table.
+# Entries are dropped as soon as an update or delete of a User row through
+# the ORM (suspension, role or password change...) commits; bulk
+# Query.update() bypasses the mapper events, so USER_CACHE_TTL (seconds)
+# bounds how stale that, or a change made by another worker, can get.
+# Each app has its own (app.extensions['user_cache'], see init_user_cache).
+USER_CACHE_TTL = 30
+_USER_COLUMNS = [column.key for column in User.__table__.columns]
+
+
+class UserCache(LRUCache):
+    def __init__(self, max_entries=10000, default_ttl=USER_CACHE_TTL):
+        super().__init__(max_entries, default_ttl)
+        # Bumped on every eviction: load_user only caches a row it read while
+        # this stayed the same, so a read racing a commit can't put the old row back
+        self.evictions = 0
+
+
+def init_user_cache(app):
+    app.extensions['user_cache'] = UserCache()
+
+
+def _user_cache():
+    # None outside an app context, e.g. a session opened by a migration
+    return current_app.extensions.get('user_cache') if has_app_context() else None
+
+# Changes that must also end any bearer tokens already handed out
+_TOKEN_REVOKING_COLUMNS = ('role', 'is_suspended', 'password_hash')
+
+# Flush only notes which users changed (on session.info); they are evicted,
+# and their tokens revoked, once the transaction commits, never for a
+# rollback.
+@event.listens_for(User, 'after_update')
+def _note_updated_user(mapper, connection, target):
+    state = inspect(target)
+    revoke = any(state.attrs[key].history.has_changes() for key in _TOKEN_REVOKING_COLUMNS)
+    changed = object_session(target).info.setdefault('changed_users', {})
+    changed[target.id] = changed.get(target.id, False) or revoke
+
+@event.listens_for(User, 'after_delete')
+def _note_deleted_user(mapper, connection, target):
+    object_session(target).info.setdefault('changed_users', {})[target.id] = True
+
+@event.listens_for(Session, 'after_commit')
+def _forget_changed_users(session):
+    changed = session.info.pop('changed_users', {})
+    if not has_app_context():
+        return
+    for user_id, revoke in changed.items():
+        invalidate_user_cache(user_id)
+        if revoke:
+            revocations.revoke_user(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def _keep_unchanged_users(session):
+    session.info.pop('changed_users', None)
+
+def invalidate_user_cache(user_id=None):
+    """Drop one user (or everybody) from the identity cache."""
+    users = _user_cache()
+    if users is None:
+        return
+    users.evictions += 1
+    if user_id is None:
+        users.clear()
+    else:
+        users.delete(user_id)
+
+def load_user(user_id):
+    """User by id, served from the identity cache when possible."""
+    key = identity_key(User, user_id)
+    if key in db.session.identity_map:
+        return db.session.identity_map[key]
+    users = current_app.extensions['user_cache']
+    values = users.get(user_id)
+    if values is None:
+        evictions = users.evictions
+        user = db.session.get(User, user_id)
+        if user is not None:
+            ttl = current_app.config.get('USER_CACHE_TTL', USER_CACHE_TTL)
+            if ttl and evictions == users.evictions:
+                users.set(user_id, {k: getattr(user, k) for k in _USER_COLUMNS}, ttl)
+        return user
+    # Rebuild a clean, persistent instance and attach it without a SELECT;
+    # relationships still lazy load as usual
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+def token_claims():
+    """
+    Claims of a valid bearer token, or None if the request has none. The
+    signature and expiry are checked in memory; an invalid, expired or revoked
+    token is answered with 401 by the handlers in tokens.py.
+    """
+    if '_token_claims' not in g:
+        verified = verify_jwt_in_request(optional=True)
+        g._token_claims = verified[1] if verified else None
+    return g._token_claims
+
+def current_identity():
+    """(user_id, role) of the caller, or (None, None). Only touches the DB for cookie sessions."""
+    claims = token_claims()
+    if claims:
+        return int(claims['sub']), claims.get('role')
+    user = get_current_user()
+    return (user.id, user.role) if user else (None, None)
 
 def get_current_user():
-    if 'user_id' in session:
-        return User.query.get(session['user_id'])
-    return None
+    """The logged-in user (bearer token or session), resolved once per request."""
+    if 'current_user' not in g:
+        claims = token_claims()
+        user_id = int(claims['sub']) if claims else session.get('user_id')
+        g.current_user = load_user(user_id) if user_id else None
+    return g.current_user
 
 def login_required(f):
     from functools import wraps
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if not token_claims() and 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+def admin_required(f):
+    from functools import wraps
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        user_id, role = current_identity()
+        if not user_id:
             return jsonify({'error': 'Authentication required'}), 401
+        if role != 'ADMIN':
+            return jsonify({'error': 'Admin access required'}), 403
         return f(*args, **kwargs)
     return decorated_function
 
-def update_leaderboard(user_id, points=10):
-    entry = LeaderboardEntry.query.filter_by(user_id=user_id).first()
-    if not entry:
-        entry = LeaderboardEntry(user_id=user_id, score=points, challenges_completed=1)
-        db.session.add(entry)
+Award = namedtuple('Award', 'user_id points category solution_id reason completed')
+Award.__new__.__defaults__ = (None, None, 'award', 1)
+
+UPSERT_BATCH_SIZE = 500
+
+def _upsert(table, rows, key_columns, new_values):
+    """
+    INSERT rows, updating the existing row on a key_columns conflict instead.
+    new_values(existing, incoming) gives the update, where `incoming` stands
+    for the row that collided. PostgreSQL and SQLite spell it ON CONFLICT,
+    MySQL/MariaDB ON DUPLICATE KEY (which uses the unique index on
+    key_columns); other databases go row by row (_upsert_each).
+    """
+    stmt = _upsert_statement(table, rows, key_columns, new_values)
+    if stmt is None:
+        _upsert_each(table, rows, key_columns, new_values)
+    else:
+        db.session.execute(stmt)
+
+def _upsert_statement(table, rows, key_columns, new_values):
+    """The dialect's single-statement upsert, or None if it has none."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(rows)
+        return stmt.on_conflict_do_update(index_elements=key_columns, set_=new_values(table.c, stmt.excluded))
+    if dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(rows)
+        return stmt.on_duplicate_key_update(new_values(table.c, stmt.inserted))
+    return None
+
+def _upsert_each(table, rows, key_columns, new_values):
+    """
+    Portable upsert: lock the row with SELECT ... FOR UPDATE and update it,
+    or insert it in a savepoint. If a concurrent transaction inserts the same
+    key first, the savepoint's INSERT fails and the row is updated instead.
+    """
+    for row in rows:
+        match = [table.c[key] == row[key] for key in key_columns]
+        incoming = SimpleNamespace(**{name: literal(value, table.c[name].type) for name, value in row.items()})
+        found = db.session.execute(select(*(table.c[key] for key in key_columns)).where(*match).with_for_update())
+        if found.first() is None:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(table.insert().values(row))
+                continue
+            except IntegrityError:
+                pass
+        db.session.execute(table.update().where(*match).values(new_values(table.c, incoming)))
+
+def _upsert_totals(table, rows, key_columns, increment=True):
+    """
+    Upsert running totals. With increment=True existing rows get
+    score = score + :delta on the database side, so concurrent writers never
+    overwrite each other's points.
+    """
+    def new_values(existing, incoming):
+        if increment:
+            return {
+                'score': func.coalesce(existing.score, 0) + incoming.score,
+                'challenges_completed': func.coalesce(existing.challenges_completed, 0) + incoming.challenges_completed
+            }
+        return {
+            'score': incoming.score,
+            'challenges_completed': incoming.challenges_completed
+        }
+
+    for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+        _upsert(table, rows[i:i + UPSERT_BATCH_SIZE], key_columns, new_values)
+
+def _refresh_ranking(user_ids):
+    # Feed the in-memory ranking the totals the database just computed
+    for user_id, name, score, completed in ranking_rows_query(list(user_ids)):
+        leaderboard.update(user_id, score, completed, name)
+
+def award_points(awards):
+    """
+    Apply a batch of Awards in a single transaction: append them to the
+    ScoreEvent ledger, then fold them into LeaderboardEntry and CategoryScore
+    with one SQL-side increment per affected row. Commits the session, so any
+    pending changes the caller made (e.g. a solution's score) land atomically
+    with the points.
+    """
+    awards = [a if isinstance(a, Award) else Award(*a) for a in awards]
+    if not awards:
+        return
+
+    totals = defaultdict(lambda: [0, 0])
+    category_totals = defaultdict(lambda: [0, 0])
+    events = []
+    for award in awards:
+        events.append({
+            'user_id': award.user_id,
+            'points': award.points,
+            'completed': award.completed,
+            'category': award.category,
+            'solution_id': award.solution_id,
+            'reason': award.reason,
+            'created_at': datetime.utcnow()
+        })
+        totals[award.user_id][0] += award.points
+        totals[award.user_id][1] += award.completed
+        if award.category:
+            category_totals[(award.user_id, award.category)][0] += award.points
+            category_totals[(award.user_id, award.category)][1] += award.completed
+
+    try:
+        db.session.execute(ScoreEvent.__table__.insert(), events)
+        _upsert_totals(LeaderboardEntry.__table__, [
+            {'user_id': user_id, 'score': score, 'challenges_completed': completed}
+            for user_id, (score, completed) in totals.items()
+        ], ['user_id'])
+        if category_totals:
+            _upsert_totals(CategoryScore.__table__, [
+                {'user_id': user_id, 'category': category, 'score': score, 'challenges_completed': completed}
+                for (user_id, category), (score, completed) in category_totals.items()
+            ], ['user_id', 'category'])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    _refresh_ranking(totals.keys())
+    cache.invalidate('leaderboard')
+
+def update_leaderboard(user_id, points=10, category=None):
+    award_points([Award(user_id, points, category)])
+
+def replay_score_ledger(dry_run=False):
+    """
+    Rebuild LeaderboardEntry and CategoryScore from the ScoreEvent ledger.
+    Returns the rows that disagreed with the ledger beforehand as
+    (user_id, category, ledger_total, stored_total) tuples; category is None
+    for the global board. With dry_run=True only the audit is done.
+    """
+    ledger = {
+        (user_id, None): (score or 0, completed or 0)
+        for user_id, score, completed in db.session.query(
+            ScoreEvent.user_id, func.sum(ScoreEvent.points), func.sum(ScoreEvent.completed)
+        ).group_by(ScoreEvent.user_id)
+    }
+    ledger.update({
+        (user_id, category): (score or 0, completed or 0)
+        for user_id, category, score, completed in db.session.query(
+            ScoreEvent.user_id, ScoreEvent.category, func.sum(ScoreEvent.points), func.sum(ScoreEvent.completed)
+        ).filter(ScoreEvent.category.isnot(None)).group_by(ScoreEvent.user_id, ScoreEvent.category)
+    })
+    stored = {
+        (user_id, None): (score or 0, completed or 0)
+        for user_id, score, completed in db.session.query(
+            LeaderboardEntry.user_id, LeaderboardEntry.score, LeaderboardEntry.challenges_completed)
+    }
+    stored.update({
+        (user_id, category): (score or 0, completed or 0)
+        for user_id, category, score, completed in db.session.query(
+            CategoryScore.user_id, CategoryScore.category, CategoryScore.score, CategoryScore.challenges_completed)
+    })
+
+    mismatches = [
+        (user_id, category, ledger.get((user_id, category), (0, 0)), stored.get((user_id, category), (0, 0)))
+        for user_id, category in sorted(set(ledger) | set(stored), key=lambda k: (k[0], k[1] or ''))
+        if ledger.get((user_id, category), (0, 0)) != stored.get((user_id, category), (0, 0))
+    ]
+    if dry_run:
+        return mismatches
+
+    try:
+        LeaderboardEntry.query.update({'score': 0, 'challenges_completed': 0}, synchronize_session=False)
+        CategoryScore.query.delete(synchronize_session=False)
+        global_rows = [
+            {'user_id': user_id, 'score': score, 'challenges_completed': completed}
+            for (user_id, category), (score, completed) in ledger.items() if category is None
+        ]
+        category_rows = [
+            {'user_id': user_id, 'category': category, 'score': score, 'challenges_completed': completed}
+            for (user_id, category), (score, completed) in ledger.items() if category is not None
+        ]
+        if global_rows:
+            _upsert_totals(LeaderboardEntry.__table__, global_rows, ['user_id'], increment=False)
+        if category_rows:
+            _upsert_totals(CategoryScore.__table__, category_rows, ['user_id', 'category'], increment=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    leaderboard.reload()
+    cache.invalidate('leaderboard')
+    return mismatches
+
+
+def score_solution(solution, points):
+    """
+    Record the judged score on a solution and credit its submitter, in one
+    transaction. The solution is claimed with a conditional UPDATE, so when
+    two judges race only one of them awards points; the other gets False.
+    """
+    claimed = db.session.execute(
+        Solution.__table__.update()
+        .where(Solution.id == solution.id, or_(Solution.status.is_(None), Solution.status != 'SCORED'))
+        .values(score=points, status='SCORED')
+    ).rowcount
+    if claimed != 1:
+        db.session.rollback()
+        return False
+    if solution.submitted_by_user_id:
+        award_points([Award(solution.submitted_by_user_id, int(points), solution.challenge.category,
+                            solution.id, 'solution_scored')])
     else:
-        entry.score += points
-        entry.challenges_completed += 1
-    db.session.commit()
\ No newline at end of file
+        db.session.commit()
+    return True
+
+
+def encode_cursor(*values):
+    """
+    Pack the sort key of the last row on a page into an opaque, URL-safe
+    token. Datetimes are stored as ISO strings; decode_cursor hands back the
+    raw values and the caller converts them.
+    """
+    raw = [v.isoformat() if hasattr(v, 'isoformat') else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, size):
+    """Reverse of encode_cursor. Raises ValueError on anything malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
+def parse_fields(value, allowed, default):
+    """
+    The ?fields= sparse fieldset: comma-separated JSON field names, checked
+    against `allowed`. 'id' is always included; no value gives `default`.
+    Raises ValueError naming any unknown field.
+    """
+    names = [name.strip() for name in (value or '').split(',') if name.strip()]
+    if not names:
+        return list(default)
+    unknown = sorted(set(names) - set(allowed))
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return ['id'] + [name for name in dict.fromkeys(names) if name != 'id']
@@ -0,0 +1,289 @@
+# leaderboard.py
+#
+# In-memory ranked leaderboard. The DB (LeaderboardEntry) stays the source of
+# truth; this is an in-process index over it so top-N, "what is my rank?" and
+# "who is around me?" don't have to sort the whole table on every request.
+#
+# Each app keeps its own copy (app.extensions['leaderboard'], which
+# `leaderboard` resolves through current_app): it is loaded from the DB on
+# first use and kept current by helper.update_leaderboard. Before answering,
+# it also catches up with points awarded by other workers: one query
+# compares the newest score_event and leaderboard_entry ids with the ones it
+# last saw, and when they moved only the solvers touched since are re-read.
+# Since the reads run on response-cache misses only, and writers commit
+# before they invalidate, a page rendered after a write always includes it.
+# A full reload every FULL_RELOAD_INTERVAL seconds picks up anything the ids
+# can't show (ids committed out of order, renamed or deleted users).
+
+import random
+import threading
+import time
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        self.width = [1] * level
+
+
+class IndexableSkipList:
+    """
+    Sorted container with O(log n) insert, remove, rank-of-key and
+    lookup-by-position. Every forward link stores how many level-0 nodes it
+    skips, which is what makes positional lookups logarithmic.
+    Keys must be unique and totally ordered.
+    """
+
+    MAX_LEVEL = 32
+
+    def __init__(self):
+        self.head = _Node(None, self.MAX_LEVEL)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _random_level(self):
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def _find(self, key):
+        # For each level, the last node before key and its position (1-based, head = 0)
+        chain = [None] * self.MAX_LEVEL
+        positions = [0] * self.MAX_LEVEL
+        node, pos = self.head, 0
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                pos += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+            positions[level] = pos
+        return chain, positions
+
+    def insert(self, key):
+        chain, positions = self._find(key)
+        level = self._random_level()
+        new = _Node(key, level)
+        pos = positions[0] + 1  # position the new node will occupy
+        for i in range(self.MAX_LEVEL):
+            prev = chain[i]
+            if i < level:
+                new.next[i] = prev.next[i]
+                prev.next[i] = new
+                new.width[i] = prev.width[i] - (pos - positions[i]) + 1
+                prev.width[i] = pos - positions[i]
+            else:
+                prev.width[i] += 1
+        self.size += 1
+
+    def remove(self, key):
+        chain, _ = self._find(key)
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        for i in range(self.MAX_LEVEL):
+            prev = chain[i]
+            if prev.next[i] is target:
+                prev.width[i] += target.width[i] - 1
+                prev.next[i] = target.next[i]
+            else:
+                prev.width[i] -= 1
+        self.size -= 1
+
+    def index(self, key):
+        """0-based position of key. Raises KeyError if it isn't present."""
+        chain, positions = self._find(key)
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        return positions[0]
+
+    def _node_at(self, index):
+        node, remaining = self.head, index + 1
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node
+
+    def slice(self, start, stop):
+        """Keys at positions [start, stop), walked from one O(log n) seek."""
+        start, stop = max(start, 0), min(stop, self.size)
+        if start >= stop:
+            return []
+        node = self._node_at(start)
+        keys = []
+        while node is not None and len(keys) < stop - start:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class LeaderboardEngine:
+    """
+    Ranks solvers by (score, challenges_completed), both descending, with
+    user id as the tie-breaker so every solver has a distinct rank.
+    """
+
+    FULL_RELOAD_INTERVAL = 300
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ranking = IndexableSkipList()
+        self._keys = {}   # user_id -> key currently in the skip list
+        self._names = {}  # user_id -> display name
+        self._loaded = False
+        self._seen = (0, 0)  # newest (score_event.id, leaderboard_entry.id) applied
+        self._loaded_at = 0.0
+
+    @staticmethod
+    def _key(user_id, score, challenges_completed):
+        return (-(score or 0), -(challenges_completed or 0), user_id)
+
+    _high_water_query = None
+
+    @classmethod
+    def _high_water(cls):
+        from db import db, LeaderboardEntry, ScoreEvent
+        if cls._high_water_query is None:
+            # Built once: two primary-key max() lookups
+            cls._high_water_query = db.select(
+                db.select(db.func.max(ScoreEvent.id)).scalar_subquery(),
+                db.select(db.func.max(LeaderboardEntry.id)).scalar_subquery()
+            )
+        events, entries = db.session.execute(cls._high_water_query).one()
+        return events or 0, entries or 0
+
+    def reload(self):
+        """Rebuild the ranking from LeaderboardEntry. Needs an app context."""
+        seen = self._high_water()
+        rows = ranking_rows_query().all()
+
+        ranking, keys, names = IndexableSkipList(), {}, {}
+        for user_id, name, score, completed in rows:
+            if user_id in keys:
+                continue
+            key = self._key(user_id, score, completed)
+            ranking.insert(key)
+            keys[user_id] = key
+            names[user_id] = name
+        with self._lock:
+            self._ranking, self._keys, self._names = ranking, keys, names
+            self._seen = seen
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+
+    def sync(self):
+        """Apply whatever other workers changed since the last sync or reload. Needs an app context."""
+        seen = self._high_water()
+        last_events, last_entries = self._seen
+        if seen == (last_events, last_entries):
+            return
+        rows = ranking_rows_query(changed_since(last_events, last_entries)).all()
+        with self._lock:
+            for user_id, name, score, completed in rows:
+                self.update(user_id, score, completed, name)
+            self._seen = tuple(map(max, self._seen, seen))
+
+    def ensure_loaded(self):
+        """Load on first use, then keep up with the database (see sync)."""
+        if not self._loaded or time.monotonic() - self._loaded_at > self.FULL_RELOAD_INTERVAL:
+            with self._lock:
+                if not self._loaded or time.monotonic() - self._loaded_at > self.FULL_RELOAD_INTERVAL:
+                    self.reload()
+                    return
+        self.sync()
+
+    def update(self, user_id, score, challenges_completed, user_name=None):
+        """Move a solver to their new position. No-op until the engine is loaded."""
+        with self._lock:
+            if not self._loaded:
+                return
+            old = self._keys.get(user_id)
+            if old is not None:
+                self._ranking.remove(old)
+            key = self._key(user_id, score, challenges_completed)
+            self._ranking.insert(key)
+            self._keys[user_id] = key
+            if user_name is not None:
+                self._names[user_id] = user_name
+
+    def has_name(self, user_id):
+        return user_id in self._names
+
+    def _entry(self, rank, key):
+        score, completed, user_id = -key[0], -key[1], key[2]
+        return {
+            'rank': rank,
+            'user_id': user_id,
+            'user_name': self._names.get(user_id),
+            'score': score,
+            'challenges_completed': completed
+        }
+
+    def top(self, n, min_score=1):
+        """The best n solvers, skipping anyone below min_score."""
+        self.ensure_loaded()
+        with self._lock:
+            keys = self._ranking.slice(0, n)
+            return [self._entry(i + 1, key) for i, key in enumerate(keys) if -key[0] >= min_score]
+
+    def rank(self, user_id):
+        """Entry for user_id with its 1-based rank, or None if they aren't ranked."""
+        self.ensure_loaded()
+        with self._lock:
+            key = self._keys.get(user_id)
+            if key is None:
+                return None
+            return self._entry(self._ranking.index(key) + 1, key)
+
+    def around(self, user_id, k):
+        """Entries ranked within k places of user_id, or None if they aren't ranked."""
+        self.ensure_loaded()
+        with self._lock:
+            key = self._keys.get(user_id)
+            if key is None:
+                return None
+            position = self._ranking.index(key)
+            start = max(position - k, 0)
+            keys = self._ranking.slice(start, position + k + 1)
+            return [self._entry(start + i + 1, key) for i, key in enumerate(keys)]
+
+    def __len__(self):
+        return len(self._ranking)
+
+
+def changed_since(last_events, last_entries):
+    """Users with score events or leaderboard rows newer than the given ids, as a subquery."""
+    from db import db, LeaderboardEntry, ScoreEvent
+    return db.select(ScoreEvent.user_id).where(ScoreEvent.id > last_events)\
+        .union(db.select(LeaderboardEntry.user_id).where(LeaderboardEntry.id > last_entries))
+
+
+def ranking_rows_query(user_ids=None):
+    """(user_id, name, score, challenges_completed) for everybody, or for user_ids (a list or a subquery)."""
+    from db import db, User, LeaderboardEntry
+    query = db.session.query(
+        LeaderboardEntry.user_id,
+        User.name,
+        LeaderboardEntry.score,
+        LeaderboardEntry.challenges_completed
+    ).join(User, User.id == LeaderboardEntry.user_id)
+    if user_ids is not None:
+        query = query.filter(LeaderboardEntry.user_id.in_(user_ids))
+    return query
+
+
+def init_leaderboard(app):
+    app.extensions['leaderboard'] = LeaderboardEngine()
+
+
+# The current app's engine
+leaderboard = LocalProxy(lambda: current_app.extensions['leaderboard'])
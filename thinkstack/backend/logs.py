@@ -0,0 +1,209 @@
+# logs.py
+#
+# Structured logging for the API. Every module logs through a child of the
+# 'thinkstack' logger (logging.getLogger('thinkstack.app'), 'thinkstack.sql',
+# ...), and each record is written as one JSON object per line:
+#
+#   {"ts": "2026-10-18T09:12:01.532Z", "level": "ERROR", "logger": "thinkstack.app",
+#    "msg": "Solution submission failed", "request_id": "9f1c...", "exc": "Traceback ..."}
+#
+# Fields passed with extra={...} are added to the object as they are.
+#
+# Request ids: each request takes its id from an incoming X-Request-ID (so a
+# proxy's id carries through) or gets a fresh one, every record logged while
+# handling it carries that id, and the response echoes it in X-Request-ID.
+#
+# The request thread never formats or writes: records go onto a bounded
+# in-memory queue (LOG_QUEUE_SIZE) and a QueueListener thread formats and
+# writes them. When the queue is full a record is dropped and counted rather
+# than blocking the request. DEBUG records can be sampled with
+# LOG_DEBUG_SAMPLE_RATE (0.01 keeps one in a hundred), and any single call
+# can set its own rate with extra={'sample_rate': 0.1}.
+#
+# Each app has its own queue, listener thread and settings (app.extensions
+# ['log_handler'] and ['log_listener']). Loggers are process-wide, so the
+# 'thinkstack' logger and app.logger carry one dispatching handler that passes
+# each record to the current app's queue, or to the most recently built
+# app's when there is no app context.
+
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import current_app, has_app_context, request
+from flask.logging import default_handler
+
+_request_id = ContextVar('request_id', default=None)
+_listeners = []  # every app's, stopped (and so drained) at exit
+
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'request_id', 'sample_rate'}
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds')
+                  .replace('+00:00', 'Z'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            entry['request_id'] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """Pass a fraction of DEBUG records, or of any record logged with a sample_rate."""
+
+    def __init__(self, debug_rate=1.0):
+        super().__init__()
+        self.debug_rate = debug_rate
+
+    def filter(self, record):
+        rate = getattr(record, 'sample_rate', None)
+        if rate is None:
+            if record.levelno > logging.DEBUG:
+                return True
+            rate = self.debug_rate
+        return rate >= 1 or random.random() < rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread; drops them when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._exc_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        # Only what has to happen on the calling thread: bind the request id,
+        # render the message and the traceback (the frames must not outlive it)
+        record.request_id = _request_id.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AppDispatchHandler(logging.Handler):
+    """Passes records on to the current app's queue handler."""
+
+    def __init__(self):
+        super().__init__()
+        self.fallback = None  # for records logged outside an app context
+
+    def handle(self, record):
+        target = current_app.extensions.get('log_handler') if has_app_context() else None
+        target = target or self.fallback
+        if target is not None and record.levelno >= target.level:
+            target.handle(record)
+        return record
+
+    def emit(self, record):
+        self.handle(record)
+
+
+_dispatch = AppDispatchHandler()
+
+
+def _assign_request_id():
+    incoming = request.headers.get('X-Request-ID', '')
+    _request_id.set(incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex)
+
+
+def _echo_request_id(response):
+    request_id = _request_id.get()
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+
+def _reset_request_id(exc):
+    _request_id.set(None)
+
+
+def stop_logging(app):
+    """Write out what is still queued for `app` and stop its listener thread."""
+    listener = app.extensions.pop('log_listener', None)
+    if listener is not None:
+        _listeners.remove(listener)
+        listener.stop()  # drains the queue first
+    if _dispatch.fallback is app.extensions.get('log_handler'):
+        _dispatch.fallback = None
+
+
+def _stop_listeners():
+    while _listeners:
+        _listeners.pop().stop()
+
+
+atexit.register(_stop_listeners)
+
+
+def init_logging(app):
+    app.config.setdefault('LOG_LEVEL', 'INFO')
+    app.config.setdefault('LOG_QUEUE_SIZE', 10000)
+    app.config.setdefault('LOG_DEBUG_SAMPLE_RATE', 1.0)
+    app.config.setdefault('LOG_STREAM', sys.stdout)
+
+    stop_logging(app)  # set up again, e.g. with other settings
+    level = app.config['LOG_LEVEL']
+    level = logging.getLevelName(level) if isinstance(level, str) else level
+    output = logging.StreamHandler(app.config['LOG_STREAM'])
+    output.setFormatter(JsonFormatter())
+    handler = NonBlockingQueueHandler(queue.Queue(app.config['LOG_QUEUE_SIZE']))
+    handler.setLevel(level)
+    handler.addFilter(SampleFilter(app.config['LOG_DEBUG_SAMPLE_RATE']))
+    listener = QueueListener(handler.queue, output)
+    listener.start()
+    _listeners.append(listener)
+    _dispatch.fallback = handler
+
+    # Flask reports unhandled exceptions on app.logger
+    app.logger.removeHandler(default_handler)
+    for logger in (logging.getLogger('thinkstack'), app.logger):
+        # The most verbose app decides what gets created; each handler filters for its app
+        first = _dispatch not in logger.handlers
+        logger.setLevel(level if first else min(logger.level, level))
+        logger.handlers = [_dispatch]
+        logger.propagate = False
+
+    app.before_request(_assign_request_id)
+    app.after_request(_echo_request_id)
+    app.teardown_request(_reset_request_id)
+    app.extensions['log_handler'] = handler
+    app.extensions['log_listener'] = listener
+    return handler
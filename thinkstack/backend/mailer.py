@@ -0,0 +1,295 @@
+# mailer.py
+#
+# Outbound mail without blocking request workers. Routes call
+# outbox.enqueue(...), which only adds an OutboxMessage row to the current
+# transaction - the mail goes out if and only if that transaction commits.
+# After the commit a background sender picks due rows up in batches and
+# delivers them from a small thread pool. Each pool thread keeps its SMTP
+# connection open across batches (reconnecting when the server dropped it
+# or it sat idle too long), so a burst of notifications costs one TLS
+# handshake per thread rather than one per message.
+#
+# Failed deliveries are retried with exponential backoff (MAIL_OUTBOX_BACKOFF
+# seconds, doubling per attempt, capped at MAIL_OUTBOX_BACKOFF_MAX) and marked
+# FAILED after MAIL_OUTBOX_MAX_ATTEMPTS. Rows are claimed with SELECT ... FOR
+# UPDATE SKIP LOCKED where the database has it and a status-guarded UPDATE
+# (no UPDATE ... RETURNING or LIMIT subqueries, so MySQL works too), so
+# several processes (web workers, `flask send-mail`) can share the table
+# without sending a message twice. Every app has its own sender
+# (app.extensions['outbox'], which `outbox` resolves through current_app).
+#
+# For local testing point MAIL_SERVER/MAIL_PORT at an SMTP sink, e.g.
+#   python -m aiosmtpd -n -l localhost:1025
+# and run with MAIL_USE_TLS=0.
+#
+# Flask-Mail (and with it smtplib and the email package) is imported by the
+# sender on its first delivery, so processes that never send start faster.
+
+import atexit
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+from werkzeug.local import LocalProxy
+from db import db, OutboxMessage
+
+log = logging.getLogger('thinkstack.mail')
+
+
+class Outbox:
+    def __init__(self):
+        self.app = None
+        self.workers = 2
+        self.batch_size = 50
+        self.poll_interval = 5
+        self.max_attempts = 8
+        self.backoff = 30
+        self.backoff_max = 3600
+        self.claim_timeout = 600
+        self.idle_timeout = 60
+        self.autostart = True
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pool = None
+        self._local = threading.local()
+        self._connections = set()
+        self._mail = None
+
+    def init_app(self, app):
+        app.config.setdefault('MAIL_OUTBOX_WORKERS', 2)
+        app.config.setdefault('MAIL_OUTBOX_BATCH_SIZE', 50)
+        app.config.setdefault('MAIL_OUTBOX_POLL_INTERVAL', 5)
+        app.config.setdefault('MAIL_OUTBOX_MAX_ATTEMPTS', 8)
+        app.config.setdefault('MAIL_OUTBOX_BACKOFF', 30)
+        app.config.setdefault('MAIL_OUTBOX_BACKOFF_MAX', 3600)
+        app.config.setdefault('MAIL_OUTBOX_IDLE_TIMEOUT', 60)
+        # Start the sender in this process on the first committed message;
+        # turn off when a separate `flask send-mail` process does the sending
+        app.config.setdefault('MAIL_OUTBOX_AUTOSTART', True)
+
+        self.app = app
+        self.workers = app.config['MAIL_OUTBOX_WORKERS']
+        self.batch_size = app.config['MAIL_OUTBOX_BATCH_SIZE']
+        self.poll_interval = app.config['MAIL_OUTBOX_POLL_INTERVAL']
+        self.max_attempts = app.config['MAIL_OUTBOX_MAX_ATTEMPTS']
+        self.backoff = app.config['MAIL_OUTBOX_BACKOFF']
+        self.backoff_max = app.config['MAIL_OUTBOX_BACKOFF_MAX']
+        self.idle_timeout = app.config['MAIL_OUTBOX_IDLE_TIMEOUT']
+        self.autostart = app.config['MAIL_OUTBOX_AUTOSTART']
+        self._mail = None
+        app.extensions['outbox'] = self
+
+    # --- producer side ---
+
+    def enqueue(self, recipients, subject, body=None, html=None):
+        """Queue a mail in the current transaction. Nothing is sent until it commits."""
+        if isinstance(recipients, str):
+            recipients = [recipients]
+        message = OutboxMessage(recipients=','.join(recipients), subject=subject, body=body, html=html)
+        db.session.add(message)
+        db.session.info['outbox_pending'] = True
+        return message
+
+    def wake(self):
+        if self.autostart:
+            self.start()
+        self._wake.set()
+
+    # --- sender side ---
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='outbox-sender')
+            self._thread = threading.Thread(target=self.run, name='outbox-dispatcher', daemon=True)
+            self._thread.start()
+        atexit.register(self.shutdown)
+
+    def run(self, once=False):
+        """Dispatch loop; `flask send-mail` runs it in the foreground."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='outbox-sender')
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    processed = self.process_due()
+            except Exception:
+                log.exception("Outbox dispatch failed")
+                processed = 0
+            if once and processed < self.batch_size:
+                return
+            if processed < self.batch_size:
+                # Caught up: sleep until the next commit wakes us, or the next poll
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def process_due(self):
+        """Claim one batch of due messages and deliver it across the pool. Returns the batch size."""
+        ids = self._claim()
+        if not ids:
+            return 0
+        chunks = [ids[i::self.workers] for i in range(self.workers)]
+        futures = [self._pool.submit(self._deliver, chunk) for chunk in chunks if chunk]
+        for future in futures:
+            future.result()
+        return len(ids)
+
+    def _claim(self):
+        now = datetime.utcnow()
+        # Whole seconds: claimed_at is read back as the claim's token below, and
+        # MySQL's DATETIME would drop the fraction
+        claimed_at = now.replace(microsecond=0)
+        # Claims left behind by a sender that died mid-batch become due again
+        db.session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.status == 'SENDING',
+                   OutboxMessage.claimed_at < now - timedelta(seconds=self.claim_timeout))
+            .values(status='PENDING')
+        )
+        # Where the database can, lock the due rows and skip any another sender
+        # has locked (SQLite has no row locks and ignores FOR UPDATE, but the
+        # UPDATE above already holds its single write lock). Then take them
+        # with a status-guarded UPDATE and read back which ones this claim got.
+        ids = [message_id for message_id, in due_messages_query(now, self.batch_size)
+               .with_for_update(skip_locked=True)]
+        if not ids:
+            db.session.commit()
+            return []
+        db.session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(ids), OutboxMessage.status == 'PENDING')
+            .values(status='SENDING', claimed_at=claimed_at)
+        )
+        claimed = db.session.query(OutboxMessage.id)\
+            .filter(OutboxMessage.id.in_(ids), OutboxMessage.status == 'SENDING',
+                    OutboxMessage.claimed_at == claimed_at)\
+            .order_by(OutboxMessage.id).all()
+        db.session.commit()
+        return [message_id for message_id, in claimed]
+
+    def _get_mail(self):
+        # Set up on the first delivery; reads the MAIL_* settings then
+        if self._mail is None:
+            with self._lock:
+                if self._mail is None:
+                    from flask_mail import Mail
+                    self._mail = Mail(self.app)
+        return self._mail
+
+    def _connection(self):
+        """This thread's SMTP connection, reopened when idle for too long."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and time.monotonic() - self._local.last_used > self.idle_timeout:
+            self._close(conn)
+            conn = None
+        if conn is None:
+            conn = self._get_mail().connect()
+            conn.__enter__()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.add(conn)
+        self._local.last_used = time.monotonic()
+        return conn
+
+    def _close(self, conn):
+        with self._lock:
+            self._connections.discard(conn)
+        if getattr(self._local, 'conn', None) is conn:
+            self._local.conn = None
+        try:
+            conn.__exit__(None, None, None)
+        except Exception:
+            pass  # the server may already have hung up
+
+    def _send(self, message):
+        import smtplib
+        try:
+            self._connection().send(message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # Reused connection went stale: reconnect once before counting a failure
+            if getattr(self._local, 'conn', None) is not None:
+                self._close(self._local.conn)
+            self._connection().send(message)
+
+    def _deliver(self, ids):
+        from flask_mail import Message
+        self._get_mail()  # Message() reads the sender defaults from it
+        with self.app.app_context():
+            messages = OutboxMessage.query.filter(OutboxMessage.id.in_(ids)).all()
+            for message in messages:
+                try:
+                    self._send(Message(
+                        subject=message.subject,
+                        recipients=message.recipients.split(','),
+                        body=message.body,
+                        html=message.html
+                    ))
+                    message.status = 'SENT'
+                    message.sent_at = datetime.utcnow()
+                    message.last_error = None
+                except Exception as e:
+                    if getattr(self._local, 'conn', None) is not None:
+                        self._close(self._local.conn)
+                    self._retry_later(message, e)
+                message.attempts += 1
+                message.claimed_at = None
+            db.session.commit()
+
+    def _retry_later(self, message, error):
+        message.last_error = f'{type(error).__name__}: {error}'[:1000]
+        if message.attempts + 1 >= self.max_attempts:
+            message.status = 'FAILED'
+            return
+        delay = min(self.backoff * 2 ** message.attempts, self.backoff_max)
+        # Jitter spreads retries out when the mail server comes back
+        message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+        message.status = 'PENDING'
+
+    def shutdown(self):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.__exit__(None, None, None)
+            except Exception:
+                pass
+
+
+def due_messages_query(now, limit):
+    """Ids of the next `limit` PENDING messages due by `now`, oldest first."""
+    return db.session.query(OutboxMessage.id)\
+        .filter(OutboxMessage.status == 'PENDING', OutboxMessage.next_attempt_at <= now)\
+        .order_by(OutboxMessage.next_attempt_at, OutboxMessage.id)\
+        .limit(limit)
+
+
+def init_outbox(app):
+    Outbox().init_app(app)
+
+
+# The current app's sender
+outbox = LocalProxy(lambda: current_app.extensions['outbox'])
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_after_commit(session):
+    if session.info.pop('outbox_pending', False):
+        outbox.wake()
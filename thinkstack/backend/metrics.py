@@ -0,0 +1,311 @@
+# metrics.py
+#
+# Prometheus-style instrumentation, exported at GET /metrics in the text
+# exposition format:
+#
+#   thinkstack_http_requests_total{method,route,status}
+#   thinkstack_http_request_duration_seconds{method,route}       histogram
+#   thinkstack_http_request_sql_statements{method,route}         histogram
+#   thinkstack_http_request_sql_duration_seconds{method,route}   histogram
+#   thinkstack_sql_statements_total / thinkstack_sql_duration_seconds_total
+#   gauges for the connection pool, the SQLite write lock, the password
+#   hasher, the mail outbox and dropped log records
+#
+# `route` is the URL rule ('/api/challenges/<int:challenge_id>'), not the
+# path, so the number of series stays bounded. SQL is counted with
+# before/after_cursor_execute on every engine; statements issued outside a
+# request (the outbox sender, CLI commands) only go to the *_total counters.
+#
+# Each app has its own numbers (app.extensions['metrics'], see init_metrics),
+# counted on its own engines only.
+#
+# Off unless METRICS_ENABLED: then init_app registers no request hooks, no
+# SQL events and no route, so a disabled build pays nothing per request.
+# Each worker process keeps its own numbers; scrape every worker (or run
+# one) and let Prometheus aggregate. Set METRICS_TOKEN to require
+# `Authorization: Bearer <token>` on scrapes.
+
+import bisect
+import hmac
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from flask import Response, current_app, request
+from sqlalchemy import event, func
+from werkzeug.local import LocalProxy
+from dbrouting import app_engines
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+log = logging.getLogger('thinkstack.metrics')
+_request_totals = ContextVar('metrics_request_totals', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield self.name + '_bucket', _format_labels(self.labelnames, labels, [('le', _format_value(bound))]), cumulative
+            yield self.name + '_sum', _format_labels(self.labelnames, labels), total
+            yield self.name + '_count', _format_labels(self.labelnames, labels), cumulative
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge:
+    """Read at scrape time from a callback returning a number or {labels tuple: number}."""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        value = self.callback()
+        if value is None:
+            return
+        if not isinstance(value, dict):
+            value = {(): value}
+        for labels, v in value.items():
+            yield self.name, _format_labels(self.labelnames, labels), v
+
+    def clear(self):
+        pass
+
+
+class Metrics:
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.token = None
+        self._metrics = []
+
+        labels = ('method', 'route')
+        self.requests = self.register(Counter(
+            'thinkstack_http_requests_total', 'HTTP requests by route and status code.', labels + ('status',)))
+        self.latency = self.register(Histogram(
+            'thinkstack_http_request_duration_seconds', 'Time spent handling a request.', labels))
+        self.request_sql_count = self.register(Histogram(
+            'thinkstack_http_request_sql_statements', 'SQL statements issued per request.', labels, SQL_COUNT_BUCKETS))
+        self.request_sql_time = self.register(Histogram(
+            'thinkstack_http_request_sql_duration_seconds', 'Time spent in SQL per request.', labels))
+        self.sql_statements = self.register(Counter(
+            'thinkstack_sql_statements_total', 'SQL statements executed, in and outside requests.'))
+        self.sql_time = self.register(Counter(
+            'thinkstack_sql_duration_seconds_total', 'Time spent executing SQL statements.'))
+        self.register(Gauge('thinkstack_db_pool_connections', 'Database connection pool state.',
+                            self._pool_stats, ('state',)))
+        self.register(Gauge('thinkstack_password_hash_in_flight', 'Password hashes queued or running.',
+                            lambda: self._hasher().in_flight))
+        self.register(Gauge('thinkstack_password_hash_queue_depth', 'Password hashes allowed in flight.',
+                            lambda: self._hasher().queue_depth))
+        self.register(Gauge('thinkstack_mail_outbox_messages', 'Outbox messages by status.',
+                            self._outbox_backlog, ('status',)))
+        self.register(Gauge('thinkstack_db_write_lock_waiting', 'Sessions waiting for the SQLite write lock.',
+                            self._write_lock_waiting))
+        self.register(Gauge('thinkstack_log_records_dropped', 'Log records dropped because the log queue was full.',
+                            self._log_records_dropped))
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', False)
+        app.config.setdefault('METRICS_TOKEN', None)
+
+        self.app = app
+        self.enabled = app.config['METRICS_ENABLED']
+        self.token = app.config['METRICS_TOKEN']
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        for engine in app_engines(app):
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.add_url_rule('/metrics', 'metrics', self.scrape, methods=['GET'])
+
+    # --- gauges, read at scrape time ---
+
+    def _hasher(self):
+        return self.app.extensions['password_hasher']
+
+    def _pool_stats(self):
+        from db import db
+        with self.app.app_context():
+            pool = db.engine.pool
+        stats = {}
+        for name in ('size', 'checkedout', 'overflow', 'checkedin'):
+            method = getattr(pool, name, None)
+            if method is not None:
+                stats[(name,)] = method()
+        return stats
+
+    def _outbox_backlog(self):
+        from db import db, OutboxMessage
+        # Grouped on the (status, next_attempt_at) index; once per scrape, not per request
+        with self.app.app_context():
+            rows = db.session.query(OutboxMessage.status, func.count(OutboxMessage.id))\
+                .group_by(OutboxMessage.status).all()
+        return {(status,): count for status, count in rows}
+
+    def _write_lock_waiting(self):
+        serializer = self.app.extensions.get('sqlite_write_serializer') if self.app else None
+        return serializer.waiting if serializer is not None else None
+
+    def _log_records_dropped(self):
+        handler = self.app.extensions.get('log_handler') if self.app else None
+        return handler.dropped if handler is not None else None
+
+    # --- request hooks ---
+
+    def _before_request(self):
+        # [started, sql statements, sql seconds]; a context variable rather
+        # than g, so the SQL events can update it without a proxy lookup
+        _request_totals.set([time.perf_counter(), 0, 0.0])
+
+    def _observe(self, status):
+        totals = _request_totals.get()
+        if totals is None:
+            return
+        _request_totals.set(None)
+        started, sql_count, sql_time = totals
+        elapsed = time.perf_counter() - started
+        req = request._get_current_object()
+        method, route = req.method, req.url_rule.rule if req.url_rule is not None else 'unmatched'
+        self.requests.inc(method, route, str(status))
+        self.latency.observe(elapsed, method, route)
+        self.request_sql_count.observe(sql_count, method, route)
+        self.request_sql_time.observe(sql_time, method, route)
+
+    def _after_request(self, response):
+        self._observe(response.status_code)
+        return response
+
+    def _teardown_request(self, exc):
+        # Only still pending when the view raised past the error handlers
+        if exc is not None:
+            self._observe(500)
+
+    # --- SQL events ---
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('metrics_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        self.sql_statements.inc()
+        self.sql_time.inc(amount=elapsed)
+        totals = _request_totals.get()
+        if totals is not None:
+            totals[1] += 1
+            totals[2] += elapsed
+
+    # --- export ---
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            try:
+                for name, labels, value in metric.samples():
+                    lines.append(f'{name}{labels} {_format_value(value)}')
+            except Exception:
+                log.exception("Metrics gauge failed", extra={'metric': metric.name})
+        return '\n'.join(lines) + '\n'
+
+    def scrape(self):
+        if self.token:
+            supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+            if not hmac.compare_digest(supplied.encode(), self.token.encode()):
+                return Response('Unauthorized\n', status=401, content_type='text/plain')
+        return Response(self.render(), content_type=CONTENT_TYPE)
+
+    def clear(self):
+        for metric in self._metrics:
+            metric.clear()
+
+
+def init_metrics(app):
+    Metrics().init_app(app)
+
+
+metrics = LocalProxy(lambda: current_app.extensions['metrics'])
@@ -0,0 +1,80 @@
+"""Add score_event ledger and make leaderboard_entry.user_id unique
+
+Revision ID: 5e2d7a90c4b1
+Revises: c81f0b6e2d95
+Create Date: 2026-10-18 12:20:51.661870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2d7a90c4b1'
+down_revision = 'c81f0b6e2d95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('score_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=True),
+    sa.Column('solution_id', sa.Integer(), nullable=True),
+    sa.Column('reason', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['solution_id'], ['solution.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('score_event', schema=None) as batch_op:
+        batch_op.create_index('ix_score_event_user_id', ['user_id'], unique=False)
+
+    # leaderboard_entry.user_id wasn't unique, so a solver can have several
+    # rows. Fold them into the oldest one (totals summed, nothing lost) before
+    # taking the opening balances and building the unique index.
+    bind = op.get_bind()
+    entries = sa.table('leaderboard_entry', sa.column('id'), sa.column('user_id'),
+                       sa.column('score'), sa.column('challenges_completed'))
+    duplicated = bind.execute(
+        sa.select(entries.c.user_id).where(entries.c.user_id.isnot(None))
+        .group_by(entries.c.user_id).having(sa.func.count() > 1)
+    ).scalars().all()
+    for user_id in duplicated:
+        rows = bind.execute(
+            sa.select(entries.c.id, entries.c.score, entries.c.challenges_completed)
+            .where(entries.c.user_id == user_id).order_by(entries.c.id)
+        ).all()
+        keep = rows[0].id
+        bind.execute(entries.update().where(entries.c.id == keep).values(
+            score=sum(row.score or 0 for row in rows),
+            challenges_completed=sum(row.challenges_completed or 0 for row in rows)
+        ))
+        bind.execute(entries.delete().where(entries.c.user_id == user_id, entries.c.id != keep))
+
+    # Points awarded before the ledger existed become one opening balance per
+    # solver, so replaying the ledger reproduces today's leaderboard
+    op.execute(
+        "INSERT INTO score_event (user_id, points, completed, reason, created_at) "
+        "SELECT user_id, COALESCE(score, 0), COALESCE(challenges_completed, 0), 'opening_balance', CURRENT_TIMESTAMP "
+        "FROM leaderboard_entry "
+        "WHERE user_id IS NOT NULL AND (COALESCE(score, 0) != 0 OR COALESCE(challenges_completed, 0) != 0)"
+    )
+
+    with op.batch_alter_table('leaderboard_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_leaderboard_entry_user_id')
+        batch_op.create_index('ix_leaderboard_entry_user_id', ['user_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('leaderboard_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_leaderboard_entry_user_id')
+        batch_op.create_index('ix_leaderboard_entry_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('score_event', schema=None) as batch_op:
+        batch_op.drop_index('ix_score_event_user_id')
+
+    op.drop_table('score_event')
@@ -0,0 +1,33 @@
+"""Add FTS5 full-text index over challenges
+
+Revision ID: 9b4f1c2e8a07
+Revises: 5e2d7a90c4b1
+Create Date: 2026-10-18 13:41:05.228940
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4f1c2e8a07'
+down_revision = '5e2d7a90c4b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The DDL lives in search.py so init-db and migrations create the same index
+    from search import SEARCH_DDL
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in SEARCH_DDL:
+        op.execute(statement)
+    op.execute("INSERT INTO challenge_fts(challenge_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    from search import DROP_DDL
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in DROP_DDL:
+        op.execute(statement)
@@ -0,0 +1,53 @@
+"""Add indexes for hot query predicates
+
+Revision ID: a3c9e5d17f42
+Revises: 16d76187b19d
+Create Date: 2026-10-18 10:12:40.418206
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9e5d17f42'
+down_revision = '16d76187b19d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('challenge', schema=None) as batch_op:
+        batch_op.create_index('ix_challenge_status_created_at', ['status', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_challenge_created_at', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_challenge_created_by_id', ['created_by_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('solution', schema=None) as batch_op:
+        batch_op.create_index('ix_solution_challenge_id_user_id', ['challenge_id', 'submitted_by_user_id'], unique=False)
+        batch_op.create_index('ix_solution_submitted_by_user_id', ['submitted_by_user_id'], unique=False)
+
+    with op.batch_alter_table('leaderboard_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_leaderboard_entry_score', ['score', 'challenges_completed'], unique=False)
+        batch_op.create_index('ix_leaderboard_entry_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('team_member', schema=None) as batch_op:
+        batch_op.create_index('ix_team_member_team_id_user_id', ['team_id', 'user_id'], unique=False)
+        batch_op.create_index('ix_team_member_user_id', ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('team_member', schema=None) as batch_op:
+        batch_op.drop_index('ix_team_member_user_id')
+        batch_op.drop_index('ix_team_member_team_id_user_id')
+
+    with op.batch_alter_table('leaderboard_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_leaderboard_entry_user_id')
+        batch_op.drop_index('ix_leaderboard_entry_score')
+
+    with op.batch_alter_table('solution', schema=None) as batch_op:
+        batch_op.drop_index('ix_solution_submitted_by_user_id')
+        batch_op.drop_index('ix_solution_challenge_id_user_id')
+
+    with op.batch_alter_table('challenge', schema=None) as batch_op:
+        batch_op.drop_index('ix_challenge_created_by_id')
+        batch_op.drop_index('ix_challenge_created_at')
+        batch_op.drop_index('ix_challenge_status_created_at')
@@ -0,0 +1,55 @@
+"""Add upload_session table, solution.upload_id and challenge.max_upload_bytes
+
+Revision ID: b6d18e4f3a20
+Revises: e4a7c3d9f215
+Create Date: 2026-10-18 16:40:12.503117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d18e4f3a20'
+down_revision = 'e4a7c3d9f215'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('upload_session',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('challenge_id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('received', sa.BigInteger(), nullable=False),
+    sa.Column('expected_sha256', sa.String(length=64), nullable=True),
+    sa.Column('sha256', sa.String(length=64), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['challenge_id'], ['challenge.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('upload_session', schema=None) as batch_op:
+        batch_op.create_index('ix_upload_session_user_id', ['user_id'], unique=False)
+
+    # Plain ADD COLUMN: a batch table rebuild would drop the challenge_fts triggers
+    op.add_column('challenge', sa.Column('max_upload_bytes', sa.BigInteger(), nullable=True))
+    with op.batch_alter_table('solution', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('upload_id', sa.String(length=32), nullable=True))
+        batch_op.create_foreign_key('fk_solution_upload_id_upload_session', 'upload_session', ['upload_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('solution', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_solution_upload_id_upload_session', type_='foreignkey')
+        batch_op.drop_column('upload_id')
+    op.drop_column('challenge', 'max_upload_bytes')
+
+    with op.batch_alter_table('upload_session', schema=None) as batch_op:
+        batch_op.drop_index('ix_upload_session_user_id')
+
+    op.drop_table('upload_session')
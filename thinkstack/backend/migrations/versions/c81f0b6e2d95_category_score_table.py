@@ -0,0 +1,45 @@
+"""Replace leaderboard_entry.category_scores with a category_score table
+
+Revision ID: c81f0b6e2d95
+Revises: a3c9e5d17f42
+Create Date: 2026-10-18 11:02:17.093514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f0b6e2d95'
+down_revision = 'a3c9e5d17f42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('category_score',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.Column('challenges_completed', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'category', name='uq_category_score_user_id_category')
+    )
+    with op.batch_alter_table('category_score', schema=None) as batch_op:
+        batch_op.create_index('ix_category_score_ranking', ['category', 'score', 'challenges_completed'], unique=False)
+
+    # The JSON column was never written, so there is nothing to carry over
+    with op.batch_alter_table('leaderboard_entry', schema=None) as batch_op:
+        batch_op.drop_column('category_scores')
+
+
+def downgrade():
+    with op.batch_alter_table('leaderboard_entry', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('category_scores', sa.TEXT(), nullable=True))
+
+    with op.batch_alter_table('category_score', schema=None) as batch_op:
+        batch_op.drop_index('ix_category_score_ranking')
+
+    op.drop_table('category_score')
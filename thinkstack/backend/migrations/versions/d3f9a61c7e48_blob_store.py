@@ -0,0 +1,44 @@
+"""Add content-addressed blob table
+
+Revision ID: d3f9a61c7e48
+Revises: b6d18e4f3a20
+Create Date: 2026-10-18 17:25:44.902381
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f9a61c7e48'
+down_revision = 'b6d18e4f3a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('blob',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    with op.batch_alter_table('blob', schema=None) as batch_op:
+        batch_op.create_index('ix_blob_ref_count_last_used_at', ['ref_count', 'last_used_at'], unique=False)
+
+    with op.batch_alter_table('upload_session', schema=None) as batch_op:
+        batch_op.create_index('ix_upload_session_sha256', ['sha256'], unique=False)
+        batch_op.create_index('ix_upload_session_status_updated_at', ['status', 'updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('upload_session', schema=None) as batch_op:
+        batch_op.drop_index('ix_upload_session_status_updated_at')
+        batch_op.drop_index('ix_upload_session_sha256')
+
+    with op.batch_alter_table('blob', schema=None) as batch_op:
+        batch_op.drop_index('ix_blob_ref_count_last_used_at')
+
+    op.drop_table('blob')
@@ -0,0 +1,34 @@
+"""Add shared token revocation table
+
+Revision ID: f2b7c4e91d36
+Revises: d3f9a61c7e48
+Create Date: 2026-10-18 21:12:05.317462
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b7c4e91d36'
+down_revision = 'd3f9a61c7e48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('token_revocation',
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    with op.batch_alter_table('token_revocation', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_token_revocation_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('token_revocation', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_token_revocation_expires_at'))
+
+    op.drop_table('token_revocation')
@@ -0,0 +1,65 @@
+# query_plans.py
+#
+# Guards the indexes added for the hot paths. Each entry below is a query the
+# API runs on every page load, built by the function the route itself uses;
+# check_query_plans() asks SQLite how it would execute them and reports any
+# that fall back to a full table scan (tests/test_query_plans.py fails then).
+
+from datetime import datetime
+from werkzeug.datastructures import MultiDict
+from db import db, Challenge
+from helper import encode_cursor
+from leaderboard import changed_since, ranking_rows_query
+from mailer import due_messages_query
+from routes.admin import ADMIN_CHALLENGE_FIELDS, admin_challenges_query
+from routes.challenges import CHALLENGE_LIST_DEFAULT_FIELDS, challenge_listing_query, user_challenges_query
+from routes.leaderboard import category_leaderboard_query
+from routes.solutions import existing_solution_query
+
+
+def _hot_queries():
+    # Built by the same functions the routes call, so they can't drift apart
+    now = datetime.utcnow()
+    listing = Challenge.serializer.only([name for name in CHALLENGE_LIST_DEFAULT_FIELDS if name != 'solutionCount'])
+    return {
+        'challenge listing': challenge_listing_query(MultiDict(), listing),
+        'challenge listing (next page)': challenge_listing_query(
+            MultiDict({'cursor': encode_cursor(now, 1000)}), listing),
+        'challenge listing (category)': challenge_listing_query(MultiDict({'category': 'IoT'}), listing),
+        'admin challenge listing': admin_challenges_query(Challenge.serializer.only(ADMIN_CHALLENGE_FIELDS)),
+        'challenges by creator': user_challenges_query(1),
+        'solution counts': Challenge.solution_counts_query([1, 2, 3]),
+        'existing solution check': existing_solution_query(1, 1),
+        'leaderboard sync': ranking_rows_query(changed_since(1, 1)),
+        'leaderboard refresh': ranking_rows_query([1, 2, 3]),
+        'category leaderboard': category_leaderboard_query('General'),
+        'outbox due messages': due_messages_query(now, 50),
+    }
+
+
+def explain(query):
+    """Return the EXPLAIN QUERY PLAN detail lines for an ORM query."""
+    compiled = query.statement.compile(dialect=db.engine.dialect,
+                                       compile_kwargs={'render_postcompile': True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def is_full_scan(detail):
+    # "SCAN challenge USING INDEX ..." walks an index in order; only a bare
+    # "SCAN <table>" reads every row.
+    return detail.startswith('SCAN ') and 'USING' not in detail
+
+
+def check_query_plans():
+    """
+    Explain every hot query. Returns a list of (name, plan, ok) tuples; ok is
+    False when any step of the plan is a full table scan.
+    """
+    results = []
+    for name, query in _hot_queries().items():
+        plan = explain(query)
+        results.append((name, plan, not any(is_full_scan(step) for step in plan)))
+    return results
@@ -0,0 +1,210 @@
+# ratelimit.py
+#
+# Token-bucket rate limiting for the expensive or abusable endpoints (login
+# and registration hash passwords, submissions write rows). Limits are
+# declared per route:
+#
+#   @app.route('/api/login', methods=['POST'])
+#   @limiter.limit('10/minute', per='ip')
+#   def login(): ...
+#
+# A '10/minute' bucket holds 10 tokens and refills at 10 per minute, so a
+# client may burst up to 10 requests and then gets one more every 6 seconds.
+# When a bucket is empty the request is answered with 429 and Retry-After,
+# before the view runs.
+#
+# `limiter` is shared by every app in the process; each app's store and
+# on/off switch live in its app.extensions['rate_limiter'].
+#
+# Buckets live in process by default (exact for one worker; each worker
+# enforces its own limit otherwise). Set RATELIMIT_REDIS_URL, or pass any
+# object with the RedisStore client API as RATELIMIT_STORE, to share them;
+# LocalRedis is an in-process stand-in for that API, used by tests and the
+# benchmark.
+
+import math
+import threading
+import time
+from functools import wraps
+from flask import current_app, has_app_context, request, session, jsonify
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(limit):
+    """'10/minute' -> (capacity 10, refill rate in tokens per second)."""
+    count, _, period = limit.partition('/')
+    count, seconds = int(count), PERIODS[period.strip().rstrip('s')]
+    return count, count / seconds
+
+
+def _take(state, now, capacity, rate, cost):
+    """
+    Refill a (tokens, updated_at) bucket and try to take `cost` tokens.
+    Returns (new_state, allowed, retry_after_seconds).
+    """
+    tokens, updated_at = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated_at) * rate)
+    if tokens >= cost:
+        return (tokens - cost, now), True, 0
+    return (tokens, now), False, (cost - tokens) / rate
+
+
+class InProcessStore:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> ((tokens, updated_at), time the bucket is full again)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._buckets.get(key)
+            state, allowed, retry_after = _take(entry[0] if entry else None, now, capacity, rate, cost)
+            self._buckets[key] = (state, now + (capacity - state[0]) / rate)
+            if len(self._buckets) > self.max_keys:
+                self._sweep(now)
+        return allowed, retry_after
+
+    def _sweep(self, now):
+        # A bucket that has refilled completely is the same as no bucket
+        self._buckets = {k: v for k, v in self._buckets.items() if v[1] > now}
+        while len(self._buckets) > self.max_keys:
+            self._buckets.pop(next(iter(self._buckets)))
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# Refill-and-take in one round trip, atomically on the Redis side
+TOKEN_BUCKET_LUA = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local capacity, rate, now, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local tokens, ts = tonumber(state[1]) or capacity, tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisStore:
+    """Shared buckets. Only uses client.eval, so redis.Redis or LocalRedis both work."""
+
+    def __init__(self, client, prefix='thinkstack:ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, key, capacity, rate, cost=1):
+        allowed, retry_after = self.client.eval(TOKEN_BUCKET_LUA, 1, self.prefix + key,
+                                                capacity, rate, time.time(), cost)
+        return bool(int(allowed)), float(retry_after)
+
+    def clear(self):
+        pass  # buckets expire on their own once full again
+
+
+class LocalRedis:
+    """In-process stand-in for the part of the redis client RedisStore uses."""
+
+    def __init__(self):
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def eval(self, script, numkeys, key, capacity, rate, now, cost):
+        assert script == TOKEN_BUCKET_LUA, 'LocalRedis only runs the token bucket script'
+        with self._lock:
+            state, allowed, retry_after = _take(self._hashes.get(key), float(now),
+                                                float(capacity), float(rate), float(cost))
+            self._hashes[key] = state
+        return [1 if allowed else 0, str(retry_after)]
+
+
+class LimiterState:
+    """One app's buckets and whether limits are enforced."""
+
+    def __init__(self, store, enabled=True):
+        self.store = store
+        self.enabled = enabled
+
+
+class RateLimiter:
+    @staticmethod
+    def _state():
+        if not has_app_context():
+            return None
+        return current_app.extensions.get('rate_limiter')
+
+    @property
+    def store(self):
+        state = self._state()
+        return state.store if state else None
+
+    @property
+    def enabled(self):
+        state = self._state()
+        return state.enabled if state else False
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        app.config.setdefault('RATELIMIT_REDIS_URL', None)
+        app.config.setdefault('RATELIMIT_STORE', None)
+
+        if app.config['RATELIMIT_STORE'] is not None:
+            store = app.config['RATELIMIT_STORE']
+        elif app.config['RATELIMIT_REDIS_URL']:
+            import redis  # optional dependency, only needed for the shared store
+            store = RedisStore(redis.Redis.from_url(app.config['RATELIMIT_REDIS_URL']))
+        else:
+            store = InProcessStore()
+        app.extensions['rate_limiter'] = LimiterState(store, app.config['RATELIMIT_ENABLED'])
+
+    @staticmethod
+    def _client_key(per):
+        if per == 'user':
+            # Token subject or session user; anonymous callers fall back to their IP
+            from helper import token_claims
+            claims = token_claims()
+            user_id = claims['sub'] if claims else session.get('user_id')
+            if user_id:
+                return f'user:{user_id}'
+        return f'ip:{request.remote_addr}'
+
+    def limit(self, limit, per='ip', scope=None):
+        """
+        Allow `limit` ('N/second|minute|hour|day') requests per client, where
+        the client is the remote IP (per='ip') or the logged-in user
+        (per='user'). Buckets are per view unless several views share a scope.
+        Decorators stack, e.g. a per-IP and a per-user limit on one route.
+        """
+        capacity, rate = parse_limit(limit)
+
+        def decorator(f):
+            name = scope or f.__name__
+
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                state = self._state()
+                if state is None or not state.enabled or state.store is None:
+                    return f(*args, **kwargs)
+                key = f'{name}:{per}:{self._client_key(per)}'
+                allowed, retry_after = state.store.take(key, capacity, rate)
+                if not allowed:
+                    response = jsonify({'error': 'Too many requests, please slow down.'})
+                    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                    return response, 429
+                return f(*args, **kwargs)
+            return decorated_function
+        return decorator
+
+
+limiter = RateLimiter()
@@ -0,0 +1,14 @@
+# routes/
+#
+# The API, one blueprint per area. Nothing here is imported until
+# create_app() (app.py) registers the blueprints, so importing the app
+# module itself (the CLI, a test collecting fixtures) stays cheap.
+
+from importlib import import_module
+
+BLUEPRINTS = ('auth', 'challenges', 'solutions', 'leaderboard', 'admin')
+
+
+def register_blueprints(app):
+    for name in BLUEPRINTS:
+        app.register_blueprint(import_module(f'routes.{name}').bp)
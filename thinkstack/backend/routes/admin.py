@@ -0,0 +1,61 @@
+# routes/admin.py
+#
+# Admin dashboard views. Admin sign-up and login live with the rest of
+# authentication in routes/auth.py.
+
+import logging
+from flask import Blueprint, request, jsonify
+from db import Challenge
+from cache import cache
+from helper import admin_required, parse_fields
+
+bp = Blueprint('admin', __name__)
+log = logging.getLogger('thinkstack.admin')
+
+# The dashboard table's columns, in the to_dict() names; ?fields= can ask
+# for any of the to_dict() fields (the description, say) instead
+ADMIN_CHALLENGE_FIELDS = (
+    'id', 'title', 'category', 'status', 'cashPrize',
+    'createdAt', 'deadline', 'createdBy', 'participationType',
+)
+
+
+def admin_challenges_query(serializer):
+    """The newest 100 challenges in any status, loading what `serializer` needs."""
+    return Challenge.query.options(*serializer.load_options(Challenge))\
+                          .order_by(Challenge.created_at.desc())\
+                          .limit(100)
+
+
+@bp.route('/api/admin/challenges', methods=['GET'])
+@admin_required
+@cache.conditional('challenges')
+def get_all_challenges_admin():
+    try:
+        fields = parse_fields(request.args.get('fields'), Challenge.serializer.fields, ADMIN_CHALLENGE_FIELDS)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    try:
+        serializer = Challenge.serializer.only(fields)
+        challenges = admin_challenges_query(serializer).all()
+        challenges_data = serializer.many(challenges)
+        for data in challenges_data:
+            if 'createdBy' in data and data['createdBy'] is None:
+                data['createdBy'] = 'Unknown'
+
+        return jsonify({
+            'success': True,
+            'challenges': challenges_data,
+            'total': len(challenges_data)
+        }), 200
+
+    except Exception as e:
+        log.exception("Admin challenge listing failed")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
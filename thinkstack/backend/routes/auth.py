@@ -0,0 +1,209 @@
+# routes/auth.py
+#
+# Registration, login (session and bearer tokens), token refresh/revocation
+# and the current-user probe the frontend calls on load.
+
+import os
+import logging
+from flask import Blueprint, request, jsonify, session
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity, decode_token, verify_jwt_in_request
+from db import db, User, LeaderboardEntry
+from leaderboard import leaderboard
+from hashing import HashingBusy
+from ratelimit import limiter
+from tokens import issue_tokens, create_access_token_for, revocations
+from helper import get_current_user, load_user
+
+bp = Blueprint('auth', __name__)
+log = logging.getLogger('thinkstack.auth')
+
+def hashing_busy_response():
+    # Password hashing pool is saturated: shed load instead of queueing
+    response = jsonify({'error': 'Server is busy, please try again shortly.'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@bp.route('/api/register', methods=['POST'])
+@limiter.limit('20/hour', per='ip')
+def register():
+    # YOUR REGISTER CODE IS PERFECT - NO CHANGES NEEDED
+    try:
+        data = request.get_json()
+        if not data: return jsonify({'error': 'No data provided'}), 400
+        name = data.get('name', '').strip()
+        email = data.get('email', '').strip().lower()
+        password = data.get('password', '')
+        role = data.get('role', 'SOLVER').upper()
+        if not all([name, email, password]): return jsonify({'error': 'Missing required fields'}), 400
+        if len(password) < 6: return jsonify({'error': 'Password must be at least 6 characters'}), 400
+        if role not in ['SOLVER', 'CHALLENGER', 'ADMIN']: return jsonify({'error': 'Invalid role'}), 400
+        if User.query.filter_by(email=email).first(): return jsonify({'error': 'Email already registered'}), 400
+        
+        user = User(name=name, email=email, role=role)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.flush()
+        
+        leaderboard_entry = LeaderboardEntry(user_id=user.id)
+        db.session.add(leaderboard_entry)
+        
+        db.session.commit()
+        leaderboard.update(user.id, 0, 0, user.name)
+        return jsonify({'message': 'Registration successful', 'user': user.to_dict()}), 201
+    except HashingBusy:
+        db.session.rollback()
+        return hashing_busy_response()
+    except Exception:
+        db.session.rollback()
+        log.exception("Registration failed")
+        return jsonify({'error': 'Registration failed. Please try again.'}), 500 
+
+
+
+@bp.route('/api/admin-register', methods=['POST'])
+@limiter.limit('5/hour', per='ip')
+def admin_register():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        name = data.get('name', '').strip()
+        email = data.get('email', '').strip().lower()
+        password = data.get('password', '')
+
+        # Optional: Secret key check
+        admin_secret = data.get('admin_secret')
+        if admin_secret != os.getenv('ADMIN_SECRET'):  # or hardcode for now
+            return jsonify({'error': 'Unauthorized admin registration'}), 403
+
+        # Basic validations
+        if not all([name, email, password]):
+            return jsonify({'error': 'Missing required fields'}), 400
+        if len(password) < 6:
+            return jsonify({'error': 'Password must be at least 6 characters'}), 400
+        if User.query.filter_by(email=email).first():
+            return jsonify({'error': 'Email already registered'}), 400
+
+        # Create admin user
+        user = User(name=name, email=email, role='ADMIN', is_verified=True)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.flush()
+
+        # Optional: Skip leaderboard entry for admins
+        db.session.commit()
+
+        return jsonify({'message': 'Admin registered successfully', 'user': user.to_dict()}), 201
+
+    except HashingBusy:
+        db.session.rollback()
+        return hashing_busy_response()
+    except Exception:
+        db.session.rollback()
+        log.exception("Admin registration failed")
+        return jsonify({'error': 'Admin registration failed'}), 500
+
+@bp.route('/api/admin/login', methods=['POST'])
+@limiter.limit('5/minute', per='ip')
+def admin_login():
+    try:
+        data = request.get_json()
+        email = data.get('email', '').strip().lower()
+        password = data.get('password', '')
+
+        user = User.query.filter_by(email=email, role='ADMIN').first()
+        if not user or not user.check_password(password) or user.is_suspended:
+            return jsonify({'error': 'Invalid email or password'}), 401
+
+        if user.rehash_password_if_needed(password):
+            db.session.commit()
+
+        return jsonify({
+            'message': 'Admin login successful',
+            'user': user.to_dict(),
+            **issue_tokens(user)
+        }), 200
+    except HashingBusy:
+        db.session.rollback()
+        return hashing_busy_response()
+    except Exception:
+        log.exception("Admin login failed")
+        return jsonify({'error': 'Login failed'}), 500
+
+
+
+@bp.route('/api/login', methods=['POST'])
+@limiter.limit('10/minute', per='ip')
+def login():
+    # YOUR LOGIN CODE IS PERFECT - NO CHANGES NEEDED
+    try:
+        data = request.get_json()
+        if not data: return jsonify({'error': 'No data provided'}), 400
+        email = data.get('email', '').strip().lower()
+        password = data.get('password', '')
+        if not email or not password: return jsonify({'error': 'Email and password are required'}), 400
+        
+        user = User.query.filter_by(email=email).first()
+        if user and user.check_password(password) and not user.is_suspended:
+            if user.rehash_password_if_needed(password):
+                db.session.commit()
+            session['user_id'] = user.id
+            return jsonify({'message': 'Login successful', 'user': user.to_dict(), **issue_tokens(user)}), 200
+        
+        return jsonify({'error': 'Invalid credentials or account suspended'}), 401
+    except HashingBusy:
+        db.session.rollback()
+        return hashing_busy_response()
+    except Exception:
+        log.exception("Login failed")
+        return jsonify({'error': 'Login failed. Please try again.'}), 500
+
+
+    
+
+@bp.route('/api/logout', methods=['POST'])
+def logout():
+    # Also revoke the bearer token, if the client logged out with one
+    try:
+        if verify_jwt_in_request(optional=True, verify_type=False):
+            revocations.revoke(get_jwt())
+    except Exception:
+        pass  # an expired or bad token is as good as logged out
+    session.clear()
+    return jsonify({'message': 'Logout successful'}), 200
+
+@bp.route('/api/token/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh_token():
+    # The only token path that reads the user, so suspension and role changes apply here
+    user = load_user(int(get_jwt_identity()))
+    if not user or user.is_suspended:
+        return jsonify({'error': 'Account unavailable'}), 401
+    return jsonify({'access_token': create_access_token_for(user)}), 200
+
+@bp.route('/api/token/revoke', methods=['POST'])
+@jwt_required(verify_type=False)
+def revoke_token():
+    """Revoke the presented token, and the refresh token in the body if one is given."""
+    revocations.revoke(get_jwt())
+    refresh = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh:
+        try:
+            payload = decode_token(refresh, allow_expired=True)
+        except Exception:
+            return jsonify({'error': 'Invalid refresh token'}), 400
+        if payload['sub'] != get_jwt_identity():
+            return jsonify({'error': 'Token belongs to another user'}), 403
+        revocations.revoke(payload)
+    return jsonify({'message': 'Token revoked'}), 200
+
+# REVAMPED: This route is crucial for the frontend to check for an active session
+@bp.route('/api/me', methods=['GET'])
+def get_current_user_info():
+    user = get_current_user()  # bearer token or session
+    if user:
+        return jsonify({'user': user.to_dict()}), 200
+    
+    # Not logged in, or the user no longer exists: an explicit 'no user', not an error
+    return jsonify({'user': None}), 200
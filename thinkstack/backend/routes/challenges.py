@@ -0,0 +1,666 @@
+# routes/challenges.py
+#
+# Challenge listing, search and detail, and the creator's create/edit/delete.
+
+import logging
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import BadRequest, Unauthorized, NotFound, Forbidden
+from sqlalchemy import or_, and_
+from db import db, Challenge
+from cache import cache
+from mailer import outbox
+from dbrouting import read_only
+from search import search_supported, build_match_query, challenge_fts, match, rank_expression, snippet_expression
+from helper import get_current_user, current_identity, login_required, encode_cursor, decode_cursor, parse_fields
+
+bp = Blueprint('challenges', __name__)
+log = logging.getLogger('thinkstack.challenges')
+
+CHALLENGE_PAGE_SIZE = 50
+CHALLENGE_MAX_PAGE_SIZE = 100
+
+# ?fields= picks from these; without it listings leave out the large text
+# columns, which then stay out of the SELECT as well
+CHALLENGE_LIST_FIELDS = (*Challenge.serializer.fields, 'solutionCount')
+CHALLENGE_LIST_DEFAULT_FIELDS = tuple(
+    name for name in CHALLENGE_LIST_FIELDS if name not in ('description', 'additionalRequirements'))
+
+# Largest amount a signed 64-bit integer column can hold, in cents
+MAX_CENTS = 2 ** 63 - 1
+
+def dollars_to_cents(value):
+    """
+    A dollar amount ('19.99', 19.99) in whole cents, rounded rather than
+    truncated. Raises ValueError for anything that isn't a finite number
+    (inf and nan included) or doesn't fit in MAX_CENTS.
+    """
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f'Invalid amount: {value!r}')
+    if not amount.is_finite():
+        raise ValueError(f'Invalid amount: {value!r}')
+    cents = round(amount * 100)
+    if abs(cents) > MAX_CENTS:
+        raise ValueError(f'Amount out of range: {value!r}')
+    return cents
+
+def apply_challenge_filters(query, args):
+    """
+    Server-side filters shared by the challenge listings. Prize bounds are in
+    dollars (like cashPrize in the JSON), deadlines are ISO dates.
+    Raises BadRequest on malformed values.
+    """
+    if args.get('category'):
+        query = query.filter(Challenge.category == args['category'])
+    if args.get('participation_type'):
+        query = query.filter(Challenge.participation_type == args['participation_type'].upper())
+    try:
+        if args.get('min_prize'):
+            query = query.filter(Challenge.cash_prize_cents >= dollars_to_cents(args['min_prize']))
+        if args.get('max_prize'):
+            query = query.filter(Challenge.cash_prize_cents <= dollars_to_cents(args['max_prize']))
+    except ValueError:
+        raise BadRequest('Invalid prize filter')
+    try:
+        if args.get('deadline_after'):
+            query = query.filter(Challenge.deadline >= datetime.fromisoformat(args['deadline_after']))
+        if args.get('deadline_before'):
+            query = query.filter(Challenge.deadline <= datetime.fromisoformat(args['deadline_before']))
+    except ValueError:
+        raise BadRequest('Invalid deadline filter')
+    return query
+
+def get_page_size(args):
+    limit = args.get('limit', CHALLENGE_PAGE_SIZE, type=int)
+    return max(1, min(limit, CHALLENGE_MAX_PAGE_SIZE))
+
+def challenge_listing_query(args, serializer):
+    """
+    The query behind one page of get_challenges: ?status (APPROVED by
+    default), the filters and the keyset ?cursor, newest first, with one row
+    more than the page size. Raises BadRequest for a bad filter or cursor.
+    """
+    query = Challenge.query
+    status = args.get('status', 'APPROVED')
+    if status:
+        query = query.filter(Challenge.status == status.upper())
+
+    query = apply_challenge_filters(query, args)
+
+    cursor = args.get('cursor')
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor, 2)
+            created_at = datetime.fromisoformat(created_at)
+            last_id = int(last_id)
+        except (TypeError, ValueError):
+            raise BadRequest('Invalid cursor')
+        query = query.filter(or_(
+            Challenge.created_at < created_at,
+            and_(Challenge.created_at == created_at, Challenge.id < last_id)
+        ))
+
+    # Only the requested columns are selected (created_at too, for the
+    # cursor); the creator's name is joined in and solution counts come
+    # from one grouped query, so the whole page costs at most two SELECTs
+    # instead of 1 + 2N lazy loads.
+    # One extra row is fetched to know whether there is a next page.
+    return query.options(*serializer.load_options(Challenge, Challenge.created_at))\
+                .order_by(Challenge.created_at.desc(), Challenge.id.desc())\
+                .limit(get_page_size(args) + 1)
+
+@bp.route('/api/challenges', methods=['GET'])
+@cache.conditional('challenges')
+@cache.cached('challenges')
+@read_only
+def get_challenges():
+    """
+    Newest-first challenge listing with keyset pagination on (created_at, id).
+    Pass the returned next_cursor back as ?cursor= to get the following page;
+    every page is a plain index range scan, no OFFSET. ?fields=title,cashPrize
+    returns (and loads) just those fields plus id; by default everything but
+    description and additionalRequirements.
+    """
+    try:
+        try:
+            fields = parse_fields(request.args.get('fields'), CHALLENGE_LIST_FIELDS, CHALLENGE_LIST_DEFAULT_FIELDS)
+        except ValueError as e:
+            raise BadRequest(str(e))
+        serializer = Challenge.serializer.only([name for name in fields if name != 'solutionCount'])
+
+        status = request.args.get('status', 'APPROVED')
+        limit = get_page_size(request.args)
+        challenges = challenge_listing_query(request.args, serializer).all()
+        next_cursor = None
+        if len(challenges) > limit:
+            challenges = challenges[:limit]
+            next_cursor = encode_cursor(challenges[-1].created_at, challenges[-1].id)
+        log.debug("Listed challenges", extra={'status': status, 'count': len(challenges), 'sample_rate': 0.01})
+        challenges_data = serializer.many(challenges)
+        if 'solutionCount' in fields:
+            solution_counts = Challenge.solution_counts([c.id for c in challenges])
+            for challenge, data in zip(challenges, challenges_data):
+                data['solutionCount'] = solution_counts.get(challenge.id, 0)
+        
+        return jsonify({
+            'challenges': challenges_data,
+            'total': len(challenges_data),
+            'next_cursor': next_cursor
+        }), 200
+        
+    except BadRequest as e:
+        return jsonify({'error': e.description}), 400
+    except Exception as e:
+        log.exception("Challenge listing failed")
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/challenges/search', methods=['GET'])
+def search_challenges():
+    """
+    Full-text search over title, description, category and requirements
+    (FTS5, BM25-ranked, best first). Accepts the same filters and cursor/limit
+    paging as /api/challenges; the cursor here is (rank, id).
+    """
+    try:
+        if not search_supported():
+            return jsonify({'error': 'Search is not available on this database'}), 501
+
+        match_query = build_match_query(request.args.get('q', ''))
+        if not match_query:
+            return jsonify({'error': 'Search query is required'}), 400
+
+        rank = rank_expression()
+        query = Challenge.query.join(challenge_fts, challenge_fts.c.rowid == Challenge.id)\
+                               .filter(match(match_query))
+        status = request.args.get('status', 'APPROVED')
+        if status:
+            query = query.filter(Challenge.status == status.upper())
+        query = apply_challenge_filters(query, request.args)
+        limit = get_page_size(request.args)
+
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                last_rank, last_id = decode_cursor(cursor, 2)
+                last_rank, last_id = float(last_rank), int(last_id)
+            except (TypeError, ValueError):
+                raise BadRequest('Invalid cursor')
+            query = query.filter(or_(rank > last_rank, and_(rank == last_rank, Challenge.id > last_id)))
+
+        rows = query.options(db.joinedload(Challenge.created_by))\
+                    .add_columns(rank.label('rank'), snippet_expression().label('snippet'))\
+                    .order_by(rank, Challenge.id)\
+                    .limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].rank, rows[-1][0].id)
+        solution_counts = Challenge.solution_counts([row[0].id for row in rows])
+
+        results = []
+        for challenge, score, snippet in rows:
+            challenge_dict = challenge.to_dict(solution_count=solution_counts.get(challenge.id, 0))
+            challenge_dict.update({'snippet': snippet, 'rank': score})
+            results.append(challenge_dict)
+
+        return jsonify({
+            'challenges': results,
+            'total': len(results),
+            'next_cursor': next_cursor
+        }), 200
+
+    except BadRequest as e:
+        return jsonify({'error': e.description}), 400
+    except Exception:
+        log.exception("Challenge search failed")
+        return jsonify({'error': 'Search failed'}), 500
+
+
+@bp.route('/api/challenges/<int:challenge_id>/status', methods=['PATCH'])
+@login_required
+def update_challenge_status(challenge_id):
+    try:
+        # 1. Authentication: a verified bearer token (or session), see login_required
+        user_id, role = current_identity()
+        
+        # 2. Get the challenge
+        challenge = Challenge.query.get(challenge_id)
+        if not challenge:
+            raise NotFound('Challenge not found')
+        
+        # 3. Validate the request data
+        data = request.get_json()
+        if not data or 'status' not in data:
+            raise BadRequest('Status is required')
+        
+        new_status = data['status'].upper()
+        valid_statuses = ['PENDING', 'APPROVED', 'REJECTED', 'ACTIVE', 'COMPLETED']
+        if new_status not in valid_statuses:
+            raise BadRequest(f'Invalid status. Must be one of: {", ".join(valid_statuses)}')
+        
+        # 4. Authorization check: only admins or the challenge creator
+        if role != 'ADMIN' and user_id != challenge.created_by_id:
+            raise Forbidden('You are not authorized to update this challenge')
+        
+        # 5. Update the challenge, and tell the creator (sent after the commit)
+        old_status = challenge.status
+        challenge.status = new_status
+        if new_status != old_status and challenge.created_by is not None:
+            outbox.enqueue(
+                challenge.created_by.email,
+                f'Your challenge "{challenge.title}" is now {new_status.lower()}',
+                f'Hi {challenge.created_by.name},\n\n'
+                f'The status of your challenge "{challenge.title}" changed from {old_status} to {new_status}.\n\n'
+                f'- The ThinkStack team'
+            )
+        db.session.commit()
+        cache.invalidate('challenges')
+        
+        # 6. Return success response (one COUNT, not every solution row)
+        solution_count = Challenge.solution_counts([challenge.id]).get(challenge.id, 0)
+        return jsonify({
+            'success': True,
+            'message': f'Challenge status updated to {new_status}',
+            'challenge': challenge.to_dict(solution_count=solution_count)
+        }), 200
+        
+    except Unauthorized as e:
+        return jsonify({'success': False, 'error': str(e)}), 401
+    except Forbidden as e:
+        return jsonify({'success': False, 'error': str(e)}), 403
+    except NotFound as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except BadRequest as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@bp.route('/api/challenges/<int:challenge_id>', methods=['GET'])
+@cache.cached('challenges')
+@read_only
+def get_challenge_by_id(challenge_id):
+    """
+    Get a single challenge by its ID - Returns format matching React expectations
+    """
+    try:
+        # Query for the specific challenge, creator joined in for createdBy
+        challenge = Challenge.query.options(db.joinedload(Challenge.created_by))\
+                                   .filter_by(id=challenge_id).first()
+        
+        if not challenge:
+            return jsonify({
+                'error': 'Challenge not found',
+                'message': f'No challenge exists with ID {challenge_id}'
+            }), 404
+        
+        # Return challenge object directly (no wrapper): the to_dict() shape
+        # plus the 'prize' / 'type' / 'created_by' names older clients read
+        return jsonify(challenge.to_detail_dict()), 200
+            
+    except Exception as e:
+        log.exception("Challenge lookup failed", extra={'challenge_id': challenge_id})
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+# Optional: Enhanced version with relationships and additional data
+@bp.route('/api/challenges/<int:challenge_id>/detailed', methods=['GET'])
+def get_challenge_detailed(challenge_id):
+    """
+    Get a single challenge with additional details (participants, submissions, etc.)
+    """
+    try:
+        # Query with relationships loaded
+        challenge = Challenge.query.options(
+            db.joinedload(Challenge.created_by),
+            db.joinedload(Challenge.participants),
+            db.joinedload(Challenge.submissions)
+        ).filter_by(id=challenge_id).first()
+        
+        if not challenge:
+            return jsonify({
+                'success': False,
+                'error': 'Challenge not found',
+                'message': f'No challenge exists with ID {challenge_id}'
+            }), 404
+        
+        try:
+            # Basic challenge info
+            challenge_dict = {
+                'id': challenge.id,
+                'title': challenge.title,
+                'description': challenge.description,
+                'category': challenge.category,
+                'status': challenge.status,
+                'cashPrize': challenge.cash_prize_cents / 100 if challenge.cash_prize_cents else 0,
+                'createdAt': challenge.created_at.isoformat() if challenge.created_at else None,
+                'deadline': challenge.deadline.isoformat() if challenge.deadline else None,
+                'createdBy': challenge.created_by.name if challenge.created_by else 'Unknown',
+                'participationType': challenge.participation_type,
+                'additionalRequirements': getattr(challenge, 'additional_requirements', None),
+                'maxParticipants': getattr(challenge, 'max_participants', None),
+                'currentParticipants': len(challenge.participants) if hasattr(challenge, 'participants') else 0
+            }
+            
+            # Add participant info if available
+            if hasattr(challenge, 'participants'):
+                participants_data = []
+                for participant in challenge.participants:
+                    participant_info = {
+                        'id': participant.id,
+                        'name': getattr(participant, 'name', 'Unknown'),
+                        'email': getattr(participant, 'email', ''),
+                        'joinedAt': getattr(participant, 'joined_at', None)
+                    }
+                    participants_data.append(participant_info)
+                challenge_dict['participants'] = participants_data
+            
+            # Add submission count if available
+            if hasattr(challenge, 'submissions'):
+                challenge_dict['submissionCount'] = len(challenge.submissions)
+            
+            return jsonify({
+                'success': True,
+                'challenge': challenge_dict
+            }), 200
+            
+        except Exception:
+            log.exception("Could not serialize challenge", extra={'challenge_id': challenge_id})
+            # Fall back to basic endpoint
+            return get_challenge_by_id(challenge_id)
+            
+    except Exception as e:
+        log.exception("Detailed challenge lookup failed", extra={'challenge_id': challenge_id})
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+# Optional: Join challenge endpoint
+@bp.route('/api/challenges/<int:challenge_id>/join', methods=['POST'])
+def join_challenge(challenge_id):
+    """
+    Join a challenge
+    """
+    try:
+        # Get current user (you'll need to implement your auth logic)
+        # current_user = get_current_user()  # Implement this based on your auth system
+        
+        data = request.get_json()
+        user_id = data.get('userId')  # Or get from current_user
+        
+        if not user_id:
+            return jsonify({
+                'success': False,
+                'error': 'Authentication required',
+                'message': 'User must be logged in to join a challenge'
+            }), 401
+        
+        # Check if challenge exists
+        challenge = Challenge.query.filter_by(id=challenge_id).first()
+        if not challenge:
+            return jsonify({
+                'success': False,
+                'error': 'Challenge not found',
+                'message': f'No challenge exists with ID {challenge_id}'
+            }), 404
+        
+        # Check if challenge is still active
+        if challenge.status != 'active':
+            return jsonify({
+                'success': False,
+                'error': 'Challenge not available',
+                'message': 'This challenge is no longer accepting participants'
+            }), 400
+        
+        # Check if user already joined (implement based on your relationship model)
+        # This assumes you have a many-to-many relationship or separate participation table
+        
+        # Add user to challenge (implement based on your model structure)
+        # Example: challenge.participants.append(user)
+        # db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Successfully joined the challenge',
+            'challengeId': challenge_id
+        }), 200
+        
+    except Exception as e:
+        log.exception("Joining challenge failed", extra={'challenge_id': challenge_id})
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+def parse_max_upload_bytes(value):
+    """Per-challenge attachment limit in bytes; None/empty means the app default."""
+    if value in (None, ''):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('maxUploadBytes must be a whole number of bytes')
+    if value <= 0:
+        raise ValueError('maxUploadBytes must be greater than 0')
+    return value
+
+@bp.route('/api/challenges/create', methods=['POST'])
+@login_required
+def create_challenge():
+    """
+    REVAMPED: This route now uses the correct column names from the DB model.
+    """
+    try:
+        current_user = get_current_user()
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+            
+        # --- VALIDATION (matches frontend validation) ---
+        required_fields = ['title', 'description', 'category', 'deadline', 'cashPrize', 'participationType']
+        if not all(field in data for field in required_fields):
+            return jsonify({'error': 'Missing required fields'}), 400
+            
+        # --- PARSE AND PREPARE DATA ---
+        try:
+            deadline = datetime.fromisoformat(data['deadline'])
+            if deadline <= datetime.now():
+                return jsonify({'error': 'Deadline must be in the future'}), 400
+        except ValueError:
+            return jsonify({'error': 'Invalid deadline format'}), 400
+            
+        try:
+            prize_cents = dollars_to_cents(data['cashPrize'])
+            if prize_cents <= 0:
+                return jsonify({'error': 'Prize amount must be greater than 0'}), 400
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid prize amount'}), 400
+
+        try:
+            max_upload_bytes = parse_max_upload_bytes(data.get('maxUploadBytes'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # --- CREATE THE CHALLENGE OBJECT WITH CORRECT KEYWORDS ---
+        new_challenge = Challenge(
+            title=data['title'].strip(),
+            description=data['description'].strip(),
+            category=data['category'],
+            # FIX #1: Use 'participation_type' to match the model
+            participation_type=data.get('participationType', 'individual').upper(),
+            # FIX #2: Use 'cash_prize_cents' to match the model
+            cash_prize_cents=prize_cents,
+            deadline=deadline,
+            # FIX #3: Use 'additional_requirements' to match the model
+            additional_requirements=data.get('additionalRequirements', '').strip(),
+            max_upload_bytes=max_upload_bytes,
+            created_by_id=current_user.id,
+            status='PENDING'
+        )
+        # Note: min/max_team_size will use the defaults from the model for now.
+        # You can add them here if you add them to the frontend form.
+        
+        # --- SAVE TO DATABASE ---
+        db.session.add(new_challenge)
+        db.session.commit()
+        cache.invalidate('challenges')
+        
+        return jsonify({
+            'message': 'Challenge created successfully and is pending approval',
+            'challenge': new_challenge.to_dict(solution_count=0)
+        }), 201
+        
+    except Exception:
+        db.session.rollback()
+        log.exception("Challenge creation failed")
+        return jsonify({'error': 'An internal error occurred while creating the challenge.'}), 500
+
+
+# Additional utility routes
+
+@bp.route('/api/challenges/categories', methods=['GET'])
+@cache.cached('challenges')
+@read_only
+def get_challenge_categories():
+    """
+    Get all available challenge categories
+    """
+    try:
+        categories = db.session.query(Challenge.category).distinct().all()
+        category_list = [cat[0] for cat in categories if cat[0]]
+        return jsonify({'categories': category_list}), 200
+    except Exception:
+        return jsonify({'error': 'Failed to fetch categories'}), 500
+
+
+def user_challenges_query(user_id):
+    return Challenge.query.filter_by(created_by_id=user_id)\
+                          .options(db.joinedload(Challenge.created_by))\
+                          .order_by(Challenge.created_at.desc())
+
+
+@bp.route('/api/user/challenges', methods=['GET'])
+@login_required
+def get_user_challenges():
+    """
+    Get challenges created by the current user
+    """
+    try:
+        current_user = get_current_user()
+        challenges = user_challenges_query(current_user.id).all()
+        solution_counts = Challenge.solution_counts([c.id for c in challenges])
+        
+        challenges_data = []
+        for challenge in challenges:
+            challenge_dict = challenge.to_dict(solution_count=solution_counts.get(challenge.id, 0))
+            # Add extra info for dashboard
+            challenge_dict.update({
+                'is_expired': challenge.deadline < datetime.utcnow(),
+                'days_remaining': (challenge.deadline - datetime.utcnow()).days if challenge.deadline > datetime.utcnow() else 0
+            })
+            challenges_data.append(challenge_dict)
+            
+        return jsonify(challenges_data), 200
+        
+    except Exception:
+        return jsonify({'error': 'Failed to fetch user challenges'}), 500
+
+
+@bp.route('/api/challenges/<int:challenge_id>', methods=['PUT'])
+@login_required
+def update_challenge(challenge_id):
+    """
+    Update a challenge (only by the creator or admin)
+    """
+    try:
+        challenge = Challenge.query.get(challenge_id)
+        user_id, role = current_identity()
+        
+        if not challenge:
+            return jsonify({'error': 'Challenge not found'}), 404
+            
+        # Check if user owns the challenge or is admin
+        if challenge.created_by_id != user_id and role != 'ADMIN':
+            return jsonify({'error': 'Unauthorized'}), 403
+            
+        # Don't allow editing if challenge is already approved and has submissions
+        solution_count = Challenge.solution_counts([challenge.id]).get(challenge.id, 0)
+        if challenge.status == 'APPROVED' and solution_count:
+            return jsonify({'error': 'Cannot edit challenge with existing submissions'}), 400
+            
+        data = request.get_json()
+        
+        # Update allowed fields
+        if 'title' in data:
+            challenge.title = data['title'].strip()
+        if 'description' in data:
+            challenge.description = data['description'].strip()
+        if 'category' in data:
+            challenge.category = data['category']
+        if 'deadline' in data:
+            new_deadline = datetime.fromisoformat(data['deadline'].replace('Z', '+00:00'))
+            if new_deadline <= datetime.utcnow():
+                return jsonify({'error': 'Deadline must be in the future'}), 400
+            challenge.deadline = new_deadline
+        if 'maxUploadBytes' in data:
+            try:
+                challenge.max_upload_bytes = parse_max_upload_bytes(data['maxUploadBytes'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+        db.session.commit()
+        cache.invalidate('challenges')
+        
+        return jsonify({
+            'message': 'Challenge updated successfully',
+            'challenge': challenge.to_dict(solution_count=solution_count)
+        }), 200
+        
+    except Exception:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to update challenge'}), 500
+
+
+@bp.route('/api/challenges/<int:challenge_id>', methods=['DELETE'])
+@login_required
+def delete_challenge(challenge_id):
+    """
+    Delete a challenge (only by creator or admin, and only if no submissions)
+    """
+    try:
+        challenge = Challenge.query.get(challenge_id)
+        user_id, role = current_identity()
+        
+        if not challenge:
+            return jsonify({'error': 'Challenge not found'}), 404
+            
+        # Check permissions
+        if challenge.created_by_id != user_id and role != 'ADMIN':
+            return jsonify({'error': 'Unauthorized'}), 403
+            
+        # Don't allow deletion if there are submissions
+        if challenge.solutions:
+            return jsonify({'error': 'Cannot delete challenge with existing submissions'}), 400
+            
+        db.session.delete(challenge)
+        db.session.commit()
+        cache.invalidate('challenges')
+        
+        return jsonify({'message': 'Challenge deleted successfully'}), 200
+        
+    except Exception:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to delete challenge'}), 500
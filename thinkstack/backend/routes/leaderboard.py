@@ -0,0 +1,82 @@
+# routes/leaderboard.py
+#
+# Global and per-category rankings.
+
+import logging
+from flask import Blueprint, request, jsonify
+from db import db, User, CategoryScore
+from leaderboard import leaderboard
+from cache import cache
+from dbrouting import read_only
+
+bp = Blueprint('leaderboard', __name__)
+log = logging.getLogger('thinkstack.leaderboard')
+
+# Served from the in-memory ranking (see leaderboard.py) instead of sorting
+# the whole LeaderboardEntry table on every request
+@bp.route('/api/leaderboard', methods=['GET'])
+@cache.conditional('leaderboard')
+@cache.cached('leaderboard')
+@read_only
+def get_leaderboard():
+    try:
+        category = request.args.get('category')
+        if category:
+            return jsonify(get_category_leaderboard(category)), 200
+        # Only users with score > 0, best first
+        return jsonify(leaderboard.top(100)), 200
+    except Exception:
+        log.exception("Leaderboard query failed")
+        return jsonify({'error': 'Could not retrieve leaderboard.'}), 500
+
+def category_leaderboard_query(category, limit=100):
+    # Reads the top of ix_category_score_ranking directly, same cost as the global board
+    return db.session.query(
+        CategoryScore.user_id,
+        User.name,
+        CategoryScore.score,
+        CategoryScore.challenges_completed
+    ).join(User, User.id == CategoryScore.user_id)\
+     .filter(CategoryScore.category == category, CategoryScore.score > 0)\
+     .order_by(CategoryScore.score.desc(), CategoryScore.challenges_completed.desc())\
+     .limit(limit)
+
+def get_category_leaderboard(category, limit=100):
+    top_solvers = category_leaderboard_query(category, limit).all()
+
+    return [
+        {
+            'rank': rank,
+            'user_id': user_id,
+            'user_name': name,
+            'category': category,
+            'score': score,
+            'challenges_completed': completed
+        }
+        for rank, (user_id, name, score, completed) in enumerate(top_solvers, start=1)
+    ]
+
+@bp.route('/api/leaderboard/rank/<int:user_id>', methods=['GET'])
+def get_leaderboard_rank(user_id):
+    try:
+        entry = leaderboard.rank(user_id)
+        if not entry:
+            return jsonify({'error': 'User is not on the leaderboard'}), 404
+        entry['total'] = len(leaderboard)
+        return jsonify(entry), 200
+    except Exception:
+        log.exception("Leaderboard rank query failed")
+        return jsonify({'error': 'Could not retrieve rank.'}), 500
+
+@bp.route('/api/leaderboard/around/<int:user_id>', methods=['GET'])
+def get_leaderboard_around(user_id):
+    """Solvers ranked within ?k= places (default 5, max 50) of user_id."""
+    try:
+        k = max(0, min(request.args.get('k', 5, type=int), 50))
+        entries = leaderboard.around(user_id, k)
+        if entries is None:
+            return jsonify({'error': 'User is not on the leaderboard'}), 404
+        rank = next(e['rank'] for e in entries if e['user_id'] == user_id)
+        return jsonify({'rank': rank, 'total': len(leaderboard), 'entries': entries}), 200
+    except Exception:
+        log.exception("Leaderboard neighbourhood query failed")
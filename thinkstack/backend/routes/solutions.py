@@ -0,0 +1,257 @@
+# routes/solutions.py
+#
+# Solution submission and judging, chunked attachment uploads (uploads.py)
+# and attachment downloads (blobs.py).
+
+import uuid
+import logging
+from flask import Blueprint, request, jsonify, current_app
+from werkzeug.utils import secure_filename
+from werkzeug.exceptions import NotFound, BadRequest, HTTPException
+from db import db, Challenge, Solution, UploadSession
+from cache import cache
+from ratelimit import limiter
+from helper import get_current_user, current_identity, login_required, score_solution
+import uploads
+import blobs
+
+bp = Blueprint('solutions', __name__)
+log = logging.getLogger('thinkstack.solutions')
+
+def existing_solution_query(challenge_id, user_id):
+    return Solution.query.filter_by(challenge_id=challenge_id, submitted_by_user_id=user_id)
+
+
+@bp.route('/api/solutions', methods=['POST'])
+@login_required
+@limiter.limit('60/minute', per='ip')
+@limiter.limit('10/minute', per='user')
+def submit_solution():
+    try:
+        user = get_current_user()
+        data = request.get_json(silent=True) or {}
+
+        challenge_id = data.get('challenge_id')
+        github_url = data.get('attachments')
+        upload_id = data.get('upload_id')  # a completed upload (see /api/uploads)
+        content = data.get('content', '') # Comments from the form
+
+        if not challenge_id or not (github_url or upload_id):
+            return jsonify({'error': 'Missing challenge ID or GitHub URL'}), 400
+        try:
+            challenge_id = int(challenge_id)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid challenge ID'}), 400
+        if not db.session.get(Challenge, challenge_id):
+            return jsonify({'error': 'Challenge not found'}), 404
+
+        if upload_id:
+            upload = UploadSession.query.get(upload_id)
+            if not upload or upload.user_id != user.id or upload.challenge_id != challenge_id:
+                return jsonify({'error': 'Upload not found'}), 404
+            if upload.status != 'COMPLETE':
+                return jsonify({'error': 'Upload is not complete yet'}), 409
+
+        # Check if the user has already submitted a solution for this challenge
+        existing_solution = existing_solution_query(challenge_id, user.id).first()
+
+        if existing_solution:
+            return jsonify({'error': 'You have already submitted a solution for this challenge.'}), 409 # 409 Conflict
+
+        # Create new solution
+        new_solution = Solution(
+            challenge_id=challenge_id,
+            submitted_by_user_id=user.id,
+            content=content,
+            attachments=github_url,
+            upload_id=upload_id,
+            status='SUBMITTED'
+        )
+
+        db.session.add(new_solution)
+        db.session.commit()
+        cache.invalidate('challenges')
+
+        return jsonify({
+            'message': 'Solution submitted successfully!',
+            'solution': new_solution.to_dict()
+        }), 201
+
+    except blobs.BlobGone:
+        # gc-blobs collected the file between the upload check and the insert
+        db.session.rollback()
+        return jsonify({'error': 'Upload has expired, please upload the file again'}), 409
+    except Exception:
+        db.session.rollback()
+        log.exception("Solution submission failed")
+        return jsonify({'error': 'An internal error occurred.'}), 500
+
+
+# --- Chunked uploads (see uploads.py) ---
+
+def upload_status_response(upload, code=200):
+    response = jsonify({'upload': upload.to_dict(), 'chunk_size': current_app.config['UPLOAD_CHUNK_SIZE']})
+    response.headers['Upload-Offset'] = str(upload.received)
+    response.headers['Upload-Length'] = str(upload.size)
+    response.headers['Cache-Control'] = 'no-store'
+    return response, code
+
+def get_own_upload(upload_id):
+    upload = UploadSession.query.get(upload_id)
+    user_id, _ = current_identity()
+    if not upload or upload.user_id != user_id:
+        raise NotFound('Upload not found')
+    return upload
+
+@bp.route('/api/uploads', methods=['POST'])
+@login_required
+@limiter.limit('30/minute', per='user')
+def create_upload():
+    """Start an upload: {challenge_id, filename, size, sha256 (optional)}."""
+    try:
+        data = request.get_json() or {}
+        user_id, _ = current_identity()
+        challenge = Challenge.query.get(data.get('challenge_id'))
+        if not challenge:
+            raise NotFound('Challenge not found')
+        filename = secure_filename(data.get('filename') or '')
+        if not filename:
+            raise BadRequest('A filename is required')
+        try:
+            size = int(data.get('size'))
+        except (TypeError, ValueError):
+            raise BadRequest('size must be the file size in bytes')
+        if size <= 0:
+            raise BadRequest('size must be the file size in bytes')
+        limit = uploads.max_upload_bytes(challenge)
+        if size > limit:
+            return jsonify({'error': f'File is too large; this challenge accepts up to {limit} bytes', 'max_bytes': limit}), 413
+
+        upload = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            challenge_id=challenge.id,
+            filename=filename,
+            size=size,
+            expected_sha256=data.get('sha256')
+        )
+        uploads.start_upload(upload)
+        db.session.add(upload)
+        db.session.commit()
+        return upload_status_response(upload, 201)
+    except HTTPException as e:
+        return jsonify({'error': e.description}), e.code
+    except Exception:
+        db.session.rollback()
+        log.exception("Upload creation failed")
+        return jsonify({'error': 'Could not start the upload'}), 500
+
+@bp.route('/api/uploads/<upload_id>', methods=['GET'])
+@login_required
+def get_upload(upload_id):
+    """Where to resume: HEAD (or GET) returns the current Upload-Offset."""
+    try:
+        return upload_status_response(get_own_upload(upload_id))
+    except HTTPException as e:
+        return jsonify({'error': e.description}), e.code
+
+@bp.route('/api/uploads/<upload_id>', methods=['PUT', 'PATCH'])
+@login_required
+def put_upload_chunk(upload_id):
+    """Append the raw request body at Upload-Offset, streaming it to disk."""
+    try:
+        offset = uploads.parse_offset(request.headers.get('Upload-Offset'))
+        upload = get_own_upload(upload_id)
+        with uploads.upload_lock(upload.id):
+            # Another chunk may have moved the offset while we waited
+            db.session.refresh(upload)
+            try:
+                uploads.write_chunk(upload, request.stream, offset)
+            finally:
+                # Record whatever reached the disk, even if the client went away
+                db.session.commit()
+        return upload_status_response(upload)
+    except HTTPException as e:
+        db.session.rollback()
+        response = jsonify({'error': e.description})
+        if e.code == 409 and 'upload' in locals():
+            response.headers['Upload-Offset'] = str(upload.received)
+        return response, e.code
+    except Exception:
+        db.session.rollback()
+        log.exception("Upload chunk failed", extra={'upload_id': upload_id})
+        return jsonify({'error': 'Could not store the chunk'}), 500
+
+@bp.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+@login_required
+def complete_upload(upload_id):
+    try:
+        upload = get_own_upload(upload_id)
+        with uploads.upload_lock(upload.id):
+            db.session.refresh(upload)
+            uploads.complete_upload(upload)
+            db.session.commit()
+        return upload_status_response(upload)
+    except HTTPException as e:
+        db.session.rollback()
+        return jsonify({'error': e.description}), e.code
+    except Exception:
+        db.session.rollback()
+        log.exception("Upload completion failed", extra={'upload_id': upload_id})
+        return jsonify({'error': 'Could not complete the upload'}), 500
+
+
+@bp.route('/api/solutions/<int:solution_id>/file', methods=['GET'])
+@login_required
+def download_solution_file(solution_id):
+    """The uploaded attachment, for its submitter, the challenge creator or an admin."""
+    try:
+        user_id, role = current_identity()
+        solution = Solution.query.get(solution_id)
+        if not solution or not solution.upload_id:
+            return jsonify({'error': 'File not found'}), 404
+        if role != 'ADMIN' and user_id not in (solution.submitted_by_user_id, solution.challenge.created_by_id):
+            return jsonify({'error': 'Unauthorized'}), 403
+        return blobs.send_blob(solution.upload.sha256, solution.upload.filename)
+    except NotFound:
+        return jsonify({'error': 'File not found'}), 404
+
+
+@bp.route('/api/solutions/<int:solution_id>/score', methods=['PATCH'])
+@login_required
+def score_solution_route(solution_id):
+    """
+    Judge a solution (admin or the challenge creator). Credits the submitter on
+    the global and per-category leaderboards; a solution is scored only once.
+    """
+    try:
+        user_id, role = current_identity()
+        solution = Solution.query.get(solution_id)
+        if not solution:
+            return jsonify({'error': 'Solution not found'}), 404
+
+        if role != 'ADMIN' and solution.challenge.created_by_id != user_id:
+            return jsonify({'error': 'Unauthorized'}), 403
+
+        if solution.status == 'SCORED':
+            return jsonify({'error': 'Solution has already been scored'}), 409
+
+        data = request.get_json() or {}
+        try:
+            points = int(data['score'])
+            if points < 0:
+                raise ValueError
+        except (KeyError, ValueError, TypeError):
+            return jsonify({'error': 'Score must be a non-negative integer'}), 400
+
+        if not score_solution(solution, points):
+            return jsonify({'error': 'Solution has already been scored'}), 409
+        return jsonify({
+            'message': 'Solution scored',
+            'solution': solution.to_dict()
+        }), 200
+
+    except Exception:
+        db.session.rollback()
+        log.exception("Scoring solution failed", extra={'solution_id': solution_id})
+        return jsonify({'error': 'An internal error occurred.'}), 500
@@ -0,0 +1,103 @@
+# search.py
+#
+# Full-text challenge search on SQLite FTS5. challenge_fts is an external
+# content index over the challenge table (it stores only the index, not a
+# second copy of the text) and is kept in sync by triggers, so every writer -
+# the API, the shell, a migration - updates it without going through the ORM.
+
+import re
+from sqlalchemy import table, column, literal_column, func, text
+from db import db
+
+challenge_fts = table('challenge_fts', column('rowid'))
+
+# Relative weight of each indexed column in the BM25 score, in column order
+BM25_WEIGHTS = (10.0, 1.0, 4.0, 0.5)
+
+SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS challenge_fts USING fts5(
+        title, description, category, additional_requirements,
+        content='challenge', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS challenge_fts_ai AFTER INSERT ON challenge BEGIN
+        INSERT INTO challenge_fts(rowid, title, description, category, additional_requirements)
+        VALUES (new.id, new.title, new.description, new.category, new.additional_requirements);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS challenge_fts_ad AFTER DELETE ON challenge BEGIN
+        INSERT INTO challenge_fts(challenge_fts, rowid, title, description, category, additional_requirements)
+        VALUES ('delete', old.id, old.title, old.description, old.category, old.additional_requirements);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS challenge_fts_au AFTER UPDATE ON challenge BEGIN
+        INSERT INTO challenge_fts(challenge_fts, rowid, title, description, category, additional_requirements)
+        VALUES ('delete', old.id, old.title, old.description, old.category, old.additional_requirements);
+        INSERT INTO challenge_fts(rowid, title, description, category, additional_requirements)
+        VALUES (new.id, new.title, new.description, new.category, new.additional_requirements);
+    END
+    """,
+]
+
+DROP_DDL = [
+    "DROP TRIGGER IF EXISTS challenge_fts_au",
+    "DROP TRIGGER IF EXISTS challenge_fts_ad",
+    "DROP TRIGGER IF EXISTS challenge_fts_ai",
+    "DROP TABLE IF EXISTS challenge_fts",
+]
+
+
+def search_supported():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def ensure_search_index(rebuild=False):
+    """
+    Create the FTS table and its triggers if they are missing. rebuild=True
+    re-reads every challenge into the index (needed once after creating it
+    over existing rows).
+    """
+    if not search_supported():
+        return False
+    with db.engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'challenge_fts'"
+        )).first()
+        for statement in SEARCH_DDL:
+            conn.execute(text(statement))
+        if rebuild or not exists:
+            conn.execute(text("INSERT INTO challenge_fts(challenge_fts) VALUES ('rebuild')"))
+    return True
+
+
+def build_match_query(q):
+    """
+    Turn free text from the search box into an FTS5 query: every word must
+    match, and the last one may be a prefix (type-ahead). Quoting each term
+    keeps FTS5 operators and punctuation in user input from being parsed.
+    Returns None when there is nothing searchable.
+    """
+    terms = re.findall(r'\w+', q or '', re.UNICODE)[:16]
+    if not terms:
+        return None
+    quoted = ['"%s"' % t for t in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def match(match_query):
+    return literal_column('challenge_fts').op('MATCH')(match_query)
+
+
+def rank_expression():
+    # Lower is better, like FTS5's own rank column
+    return func.bm25(literal_column('challenge_fts'), *BM25_WEIGHTS)
+
+
+def snippet_expression(start='<mark>', end='</mark>', tokens=16):
+    # Column -1 lets FTS5 pick whichever column matched best
+    return func.snippet(literal_column('challenge_fts'), -1, start, end, '...', tokens)
@@ -0,0 +1,135 @@
+# sqlite_tuning.py
+#
+# Production settings for the SQLite database.
+#
+# Every new connection gets SQLITE_PRAGMAS:
+#
+#   journal_mode=WAL      readers see the last committed state and never wait
+#                         for a writer; a writer never waits for readers
+#   synchronous=NORMAL    in WAL mode, fsync at checkpoints instead of on every
+#                         commit; a power cut can lose the last commits, never
+#                         corrupt the file
+#   busy_timeout=5000     how long a writer waits for another process's lock
+#                         before "database is locked"
+#   mmap_size, cache_size reads served from the page cache / memory map
+#   temp_store=MEMORY     sorts and temp indexes off the disk
+#
+# WAL still allows only one writer at a time. Rather than letting request
+# threads race for SQLite's lock (which it hands out by sleep-and-retry, so
+# under load some writers lose for seconds), writes are serialized in
+# process: a session takes WriteSerializer's lock at its first write (flush,
+# or a bulk INSERT/UPDATE/DELETE) and gives it back when its transaction
+# ends. Writers block on the lock instead of polling, reads never touch it. Across
+# processes SQLite's own lock and busy_timeout still apply.
+#
+# Everything here is skipped for other databases. SQLITE_TUNING=False turns
+# it off (the bench uses that for before/after runs).
+
+import sqlite3
+import threading
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32000,  # KiB, i.e. ~32 MB per connection
+    'temp_store': 'MEMORY',
+}
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+class WriteSerializer:
+    """One writing transaction at a time per process; `waiting` counts the queue."""
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self.waiting = 0
+        self._lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._engines = set()
+
+    def watch(self, engine):
+        if not self._engines:
+            event.listen(Session, 'before_flush', self._before_flush)
+            event.listen(Session, 'do_orm_execute', self._do_orm_execute)
+            event.listen(Session, 'after_transaction_end', self._after_transaction_end)
+        self._engines.add(engine)
+
+    def _applies(self, session):
+        bind = session.get_bind()
+        return getattr(bind, 'engine', bind) in self._engines
+
+    def acquire(self, session):
+        if session.info.get('write_lock_held') or not self._applies(session):
+            return
+        with self._counter_lock:
+            self.waiting += 1
+        try:
+            acquired = self._lock.acquire(timeout=self.timeout)
+        finally:
+            with self._counter_lock:
+                self.waiting -= 1
+        if not acquired:
+            raise OperationalError('write lock', None, sqlite3.OperationalError(
+                f'timed out after {self.timeout}s waiting for the write lock'))
+        session.info['write_lock_held'] = True
+
+    def release(self, session):
+        if session.info.pop('write_lock_held', False):
+            self._lock.release()
+
+    # --- session events ---
+
+    def _before_flush(self, session, flush_context, instances):
+        if session.new or session.dirty or session.deleted:
+            self.acquire(session)
+
+    def _do_orm_execute(self, orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            self.acquire(orm_execute_state.session)
+
+    def _after_transaction_end(self, session, transaction):
+        # Savepoints end inside the outer transaction; only the outermost releases
+        if transaction.parent is None:
+            self.release(session)
+
+
+write_serializer = WriteSerializer()
+
+
+def init_sqlite(app, db):
+    app.config.setdefault('SQLITE_TUNING', True)
+    app.config.setdefault('SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    app.config.setdefault('SQLITE_WRITE_LOCK_TIMEOUT', 30)
+
+    if not app.config['SQLITE_TUNING']:
+        return
+    with app.app_context():
+        engine = db.engine
+    pragmas = app.config['SQLITE_PRAGMAS']
+
+    def _on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+    # A stand-in SQLite replica (dbrouting.py) gets the pragmas too; it takes no writes
+    replica = app.extensions.get('db_replica')
+    for target in (engine, replica):
+        if target is not None and target.dialect.name == 'sqlite':
+            event.listen(target, 'connect', _on_connect)
+
+    if engine.dialect.name == 'sqlite':
+        write_serializer.timeout = app.config['SQLITE_WRITE_LOCK_TIMEOUT']
+        write_serializer.watch(engine)
+        app.extensions['sqlite_write_serializer'] = write_serializer
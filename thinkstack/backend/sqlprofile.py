@@ -0,0 +1,255 @@
+# sqlprofile.py
+#
+# Slow-query log and per-request SQL profiler, for finding N+1 regressions
+# in production without a debugger.
+#
+# Slow-query log: with SQL_SLOW_QUERY_MS set, any statement slower than that
+# is logged on its own, with the line of our code that issued it.
+#
+# Profiler: for a profiled request every statement is recorded with its
+# duration and call site, and when the request ends one record
+# goes to the log with the totals, the SQL_PROFILE_TOP slowest statements,
+# statements repeated with different parameters, and every lazy load
+# (an ORM relationship loaded on attribute access, e.g. `len(self.members)`
+# inside Team.to_dict) grouped by relationship and call site. Requests are
+# profiled when SQL_PROFILE is on, or when they carry
+#   X-SQL-Profile: <SQL_PROFILE_TOKEN>
+# (any value in debug mode). The response then reports the statement count
+# in X-SQL-Statements.
+#
+# Bound parameters are left out unless SQL_LOG_PARAMS is on, and even then
+# values bound to credential-like names (password_hash, token_hash, email,
+# and their where-clause variants such as email_1) are masked.
+#
+# Records go to the 'thinkstack.sql' logger with their fields as extras, so
+# they come out as JSON objects (logs.py). Each app has its own profiler
+# (app.extensions['sql_profiler'], see init_sql_profiler), listening on its
+# own engines; when none of the three settings is given no SQL events are
+# installed at all.
+
+import hmac
+import logging
+import os
+import re
+import sys
+import time
+from contextvars import ContextVar
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.local import LocalProxy
+from dbrouting import app_engines
+
+logger = logging.getLogger('thinkstack.sql')
+
+# Frames from these files are skipped when looking for the call site
+_APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+_SKIP = (os.path.abspath(__file__), os.sep + 'site-packages' + os.sep, os.sep + 'lib' + os.sep + 'python')
+
+_profile = ContextVar('sql_profile', default=None)
+
+_SENSITIVE = re.compile(r'password|secret|token|jti|email', re.IGNORECASE)
+REDACTED = '[redacted]'
+
+
+def call_site(depth=2):
+    """The innermost `depth` frames of our own code on the current stack, as 'file:line function'."""
+    sites = []
+    frame = sys._getframe(1)
+    while frame is not None and len(sites) < depth:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_ROOT) and not any(part in filename for part in _SKIP):
+            sites.append(f'{os.path.relpath(filename, _APP_ROOT)}:{frame.f_lineno} {frame.f_code.co_name}')
+        frame = frame.f_back
+    return sites
+
+
+def _short_params(parameters, names=None, limit=64):
+    """
+    Parameters as they go into the log: long values cut short, and values
+    bound to sensitive names masked. `names` are the statement's positional
+    bind names (compiled.positiontup), None for raw driver SQL.
+    """
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return {k: REDACTED if _SENSITIVE.search(k) else _short_param(v, limit) for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            # executemany: one set per row
+            return [_short_params(p, names, limit) for p in parameters]
+        if names is None:
+            masked = [False] * len(parameters)
+        elif len(names) == len(parameters):
+            masked = [bool(_SENSITIVE.search(name)) for name in names]
+        else:
+            # Expanded IN lists shift the positions: mask all when in doubt
+            masked = [any(_SENSITIVE.search(name) for name in names)] * len(parameters)
+        return [REDACTED if mask else _short_param(p, limit) for mask, p in zip(masked, parameters)]
+    return _short_param(parameters, limit)
+
+
+def _short_param(value, limit):
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    text = str(value)
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+class RequestProfile:
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.statements = []   # (ms, sql, params, call site, lazy relationship or None)
+        self.pending_lazy = None
+
+    def summary(self, status, top):
+        total_ms = (time.perf_counter() - self.started) * 1000
+        sql_ms = sum(s[0] for s in self.statements)
+
+        repeated = {}
+        lazy = {}
+        for ms, sql, params, sites, relationship in self.statements:
+            repeated[sql] = repeated.get(sql, 0) + 1
+            if relationship:
+                key = (relationship, sites[0] if sites else None)
+                lazy[key] = lazy.get(key, 0) + 1
+
+        slowest = sorted(self.statements, key=lambda s: s[0], reverse=True)[:top]
+        return {
+            'event': 'sql_profile',
+            'method': self.method,
+            'path': self.path,
+            'status': status,
+            'duration_ms': round(total_ms, 3),
+            'sql_ms': round(sql_ms, 3),
+            'statements': len(self.statements),
+            'slowest': [
+                {'ms': round(ms, 3), 'sql': sql, 'params': params, 'site': sites, 'lazy': relationship}
+                for ms, sql, params, sites, relationship in slowest
+            ],
+            'repeated': [
+                {'count': count, 'sql': sql}
+                for sql, count in sorted(repeated.items(), key=lambda item: -item[1]) if count > 1
+            ],
+            'lazy_loads': [
+                {'relationship': relationship, 'site': site, 'count': count}
+                for (relationship, site), count in sorted(lazy.items(), key=lambda item: -item[1])
+            ],
+        }
+
+
+class SQLProfiler:
+    def __init__(self):
+        self.app = None
+        self.always = False
+        self.token = None
+        self.slow_ms = None
+        self.log_params = False
+        self.top = 10
+
+    def init_app(self, app):
+        app.config.setdefault('SQL_PROFILE', False)
+        app.config.setdefault('SQL_PROFILE_TOKEN', None)
+        app.config.setdefault('SQL_PROFILE_TOP', 10)
+        app.config.setdefault('SQL_SLOW_QUERY_MS', None)
+        app.config.setdefault('SQL_LOG_PARAMS', False)
+
+        self.app = app
+        self.always = app.config['SQL_PROFILE']
+        self.token = app.config['SQL_PROFILE_TOKEN']
+        self.top = app.config['SQL_PROFILE_TOP']
+        self.slow_ms = app.config['SQL_SLOW_QUERY_MS']
+        self.log_params = app.config['SQL_LOG_PARAMS']
+        app.extensions['sql_profiler'] = self
+        if not (self.always or self.token or self.slow_ms is not None or app.debug):
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        for engine in app_engines(app):
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        if not event.contains(Session, 'do_orm_execute', _do_orm_execute):
+            event.listen(Session, 'do_orm_execute', _do_orm_execute)
+
+    def _wanted(self):
+        if self.always:
+            return True
+        supplied = request.headers.get('X-SQL-Profile')
+        if not supplied:
+            return False
+        return self.app.debug or (
+            self.token is not None and hmac.compare_digest(supplied.encode(), self.token.encode()))
+
+    # --- request hooks ---
+
+    def _before_request(self):
+        if self._wanted():
+            _profile.set(RequestProfile(request.method, request.full_path.rstrip('?')))
+
+    def _finish(self, status):
+        profile = _profile.get()
+        if profile is None:
+            return None
+        _profile.set(None)
+        logger.info("SQL profile", extra=profile.summary(status, self.top))
+        return profile
+
+    def _after_request(self, response):
+        profile = self._finish(response.status_code)
+        if profile is not None:
+            response.headers['X-SQL-Statements'] = str(len(profile.statements))
+        return response
+
+    def _teardown_request(self, exc):
+        if exc is not None:
+            self._finish(500)
+
+    # --- SQL events ---
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('sqlprofile_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('sqlprofile_started')
+        if not started:
+            return
+        ms = (time.perf_counter() - started.pop()) * 1000
+        profile = _profile.get()
+        slow = self.slow_ms is not None and ms >= self.slow_ms
+        if profile is None and not slow:
+            return
+
+        sites = call_site()
+        params = None
+        if self.log_params:
+            params = _short_params(parameters, getattr(getattr(context, 'compiled', None), 'positiontup', None))
+        if profile is not None:
+            relationship, profile.pending_lazy = profile.pending_lazy, None
+            profile.statements.append((ms, statement, params, sites, relationship))
+        if slow:
+            logger.warning("Slow query", extra={
+                'event': 'slow_query',
+                'ms': round(ms, 3),
+                'sql': statement,
+                'params': params,
+                'site': sites,
+            })
+
+
+def _do_orm_execute(orm_execute_state):
+    # Sessions are shared by every app, but the profile belongs to the request
+    profile = _profile.get()
+    if profile is not None and orm_execute_state.lazy_loaded_from is not None:
+        # The next statement on this request is the lazy load itself
+        profile.pending_lazy = str(orm_execute_state.loader_strategy_path[-1])
+
+
+def init_sql_profiler(app):
+    SQLProfiler().init_app(app)
+
+
+sql_profiler = LocalProxy(lambda: current_app.extensions['sql_profiler'])
@@ -0,0 +1,52 @@
+# tests/conftest.py
+#
+# Each test gets its own app on a fresh SQLite file (create_app, app.py), with
+# the schema built from the models, the outbox sender not started and
+# passwords hashed on the calling thread.
+
+import pytest
+from app import create_app
+from db import db
+from logs import stop_logging
+
+
+@pytest.fixture
+def app_factory(tmp_path):
+    """make_app(name, **config) builds another app on its own database file."""
+    apps = []
+
+    def make_app(name='test', **config):
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / f"{name}.db"}',
+            'UPLOAD_FOLDER': str(tmp_path / name / 'uploads'),
+            'LOG_LEVEL': 'WARNING',
+            'SECRET_KEY': 'test-secret',
+            'JWT_SECRET_KEY': 'test-jwt-secret',
+            'SESSION_COOKIE_SECURE': False,
+            'MAIL_OUTBOX_AUTOSTART': False,
+            'PASSWORD_HASH_INLINE': True,
+            'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+            **config,
+        })
+        with app.app_context():
+            db.create_all()
+        apps.append(app)
+        return app
+
+    yield make_app
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        app.extensions['password_hasher'].shutdown()
+        stop_logging(app)
+
+
+@pytest.fixture
+def app(app_factory):
+    return app_factory()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
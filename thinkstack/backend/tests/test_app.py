@@ -0,0 +1,62 @@
+# Several apps in one process (create_app, app.py)
+
+import io
+import json
+import logging
+from datetime import datetime, timedelta
+from db import db, User, Challenge, LeaderboardEntry
+from logs import stop_logging
+
+
+def test_apps_keep_their_own_state(app_factory):
+    first, second = app_factory('first'), app_factory('second')
+    with first.app_context():
+        solver = User(name='Solver', email='solver@example.com', password_hash='x')
+        db.session.add(solver)
+        db.session.flush()
+        db.session.add_all([
+            LeaderboardEntry(user_id=solver.id, score=40, challenges_completed=1),
+            Challenge(title='Mesh', description='Connect schools', category='IoT', status='APPROVED',
+                      deadline=datetime.utcnow() + timedelta(days=7), created_by_id=solver.id),
+        ])
+        db.session.commit()
+        solver_id = solver.id
+
+    first_client, second_client = first.test_client(), second.test_client()
+    rank = first_client.get(f'/api/leaderboard/rank/{solver_id}')
+    assert rank.status_code == 200 and rank.get_json()['user_name'] == 'Solver'
+    listing = first_client.get('/api/challenges')
+    assert [c['title'] for c in listing.get_json()['challenges']] == ['Mesh']
+
+    # The second app has an empty database: nothing the first one loaded or
+    # cached may leak into its answers
+    assert second_client.get(f'/api/leaderboard/rank/{solver_id}').status_code == 404
+    listing = second_client.get('/api/challenges')
+    assert listing.headers['X-Cache'] == 'MISS'
+    assert listing.get_json()['challenges'] == []
+
+    for name in ('response_cache', 'rate_limiter', 'outbox', 'leaderboard', 'user_cache', 'revocations',
+                 'metrics', 'sql_profiler', 'password_hasher', 'log_handler', 'log_listener'):
+        assert first.extensions[name] is not second.extensions[name]
+
+
+def test_apps_keep_their_own_settings_metrics_and_logs(app_factory):
+    streams = [io.StringIO(), io.StringIO()]
+    first = app_factory('first', METRICS_ENABLED=True, PASSWORD_HASH_WORKERS=1, LOG_STREAM=streams[0])
+    second = app_factory('second', METRICS_ENABLED=True, PASSWORD_HASH_WORKERS=3, LOG_STREAM=streams[1])
+    assert first.extensions['password_hasher'].workers == 1
+    assert second.extensions['password_hasher'].workers == 3
+
+    first.test_client().get('/api/challenges')
+    scrapes = [app.test_client().get('/metrics').get_data(as_text=True) for app in (first, second)]
+    assert 'thinkstack_http_requests_total{method="GET",route="/api/challenges",status="200"} 1' in scrapes[0]
+    assert 'route="/api/challenges"' not in scrapes[1]
+
+    # Each app's records go through its own queue, and both queues are drained
+    for app in (first, second):
+        with app.app_context():
+            logging.getLogger('thinkstack.test').warning("Built", extra={'app_name': app.config['UPLOAD_FOLDER']})
+        stop_logging(app)
+    for app, stream in zip((first, second), streams):
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [r['app_name'] for r in records if r['msg'] == 'Built'] == [app.config['UPLOAD_FOLDER']]
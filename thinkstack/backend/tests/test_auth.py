@@ -0,0 +1,72 @@
+# Logging in (routes/auth.py), password hashing (hashing.py) and the
+# identity cache (helper.py)
+
+from werkzeug.security import generate_password_hash
+from db import db, User
+
+
+def test_login_upgrades_a_hash_made_with_old_parameters(app):
+    with app.app_context():
+        # PASSWORD_HASH_METHOD is pbkdf2:sha256:1000 under test
+        db.session.add(User(name='Ada', email='ada@example.com',
+                            password_hash=generate_password_hash('secret1', method='pbkdf2:sha256:500')))
+        db.session.commit()
+
+    client = app.test_client()
+    response = client.post('/api/login', json={'email': 'ada@example.com', 'password': 'secret1'})
+    assert response.status_code == 200
+    with app.app_context():
+        upgraded = User.query.one().password_hash
+    assert upgraded.startswith('pbkdf2:sha256:1000$')
+
+    # The rehash revokes older tokens, but not the ones this login handed out
+    token = response.get_json()['access_token']
+    me = app.test_client().get('/api/me', headers={'Authorization': f'Bearer {token}'})
+    assert me.get_json()['user']['email'] == 'ada@example.com'
+
+    # Already current: the next login leaves it alone
+    assert client.post('/api/login', json={'email': 'ada@example.com', 'password': 'secret1'}).status_code == 200
+    with app.app_context():
+        assert User.query.one().password_hash == upgraded
+    assert client.post('/api/login', json={'email': 'ada@example.com', 'password': 'wrong'}).status_code == 401
+
+
+def test_suspending_or_revoking_a_user_evicts_them_after_commit(app):
+    with app.app_context():
+        user = User(name='Ada', email='ada@example.com')
+        user.set_password('secret1')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    users = app.extensions['user_cache']
+
+    client = app.test_client()
+    assert client.post('/api/login', json={'email': 'ada@example.com', 'password': 'secret1'}).status_code == 200
+    assert client.get('/api/me').get_json()['user']['name'] == 'Ada'
+    assert users.get(user_id)['is_suspended'] is False
+
+    # Not before the commit, and not at all for a rollback
+    with app.app_context():
+        db.session.get(User, user_id).is_suspended = True
+        db.session.flush()
+        assert users.get(user_id) is not None
+        db.session.rollback()
+    assert users.get(user_id) is not None
+
+    with app.app_context():
+        db.session.get(User, user_id).is_suspended = True
+        db.session.commit()
+    assert users.get(user_id) is None
+    assert str(user_id) in app.extensions['revocations']._users  # and their tokens are cut off
+    # The next request reads the row as it is now
+    assert client.get('/api/me').get_json()['user']['name'] == 'Ada'
+    assert users.get(user_id)['is_suspended'] is True
+
+    # A role change evicts too, and a rename refreshes what /api/me shows
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        user.role, user.name = 'CHALLENGER', 'Ada L.'
+        db.session.commit()
+    assert users.get(user_id) is None
+    me = client.get('/api/me').get_json()['user']
+    assert (me['name'], me['role']) == ('Ada L.', 'CHALLENGER')
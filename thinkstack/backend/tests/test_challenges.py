@@ -0,0 +1,209 @@
+# Challenge listing (GET /api/challenges) and its caching
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from db import db, User, Challenge, Solution
+from helper import award_points
+
+
+@contextmanager
+def count_statements(app):
+    """Collects every SQL statement sent to the database inside the block."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def challenges(app):
+    """Three approved challenges, with prizes of $19.99, $20.00 and $150.00."""
+    with app.app_context():
+        creator = User(name='Host', email='host@example.com', password_hash='x', role='CHALLENGER')
+        db.session.add(creator)
+        db.session.flush()
+        now = datetime.utcnow()
+        db.session.add_all(
+            Challenge(title=f'Challenge {cents}', description='Build it', category='IoT', status='APPROVED',
+                      cash_prize_cents=cents, deadline=now + timedelta(days=30), created_by_id=creator.id,
+                      created_at=now - timedelta(minutes=i))
+            for i, cents in enumerate((1999, 2000, 15000))
+        )
+        db.session.commit()
+
+
+@pytest.mark.parametrize('query, prizes', [
+    ('min_prize=19.99', [19.99, 20.0, 150.0]),
+    ('max_prize=19.99', [19.99]),
+    ('min_prize=20&max_prize=150.00', [20.0, 150.0]),
+])
+def test_prize_filters_are_exact_to_the_cent(client, challenges, query, prizes):
+    response = client.get(f'/api/challenges?fields=cashPrize&{query}')
+    assert response.status_code == 200
+    assert sorted(c['cashPrize'] for c in response.get_json()['challenges']) == prizes
+
+
+@pytest.mark.parametrize('value', ['inf', '-Infinity', 'nan', 'abc', '1e400'])
+def test_prize_filters_reject_non_finite_amounts(client, challenges, value):
+    response = client.get(f'/api/challenges?min_prize={value}')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid prize filter'}
+
+
+@pytest.mark.parametrize('count', [1, 25])
+def test_listing_costs_the_same_statements_for_any_page_size(app, client, count):
+    # Every challenge with its own creator and some solutions: lazy loads
+    # would show up as statements per row
+    with app.app_context():
+        now = datetime.utcnow()
+        for i in range(count):
+            creator = User(name=f'Host {i}', email=f'host{i}@example.com', password_hash='x', role='CHALLENGER')
+            db.session.add(creator)
+            db.session.flush()
+            challenge = Challenge(title=f'Challenge {i}', description='Build it', category='IoT', status='APPROVED',
+                                  cash_prize_cents=100 * i, deadline=now + timedelta(days=30),
+                                  created_by_id=creator.id, created_at=now - timedelta(minutes=i))
+            db.session.add(challenge)
+            db.session.flush()
+            db.session.add_all(Solution(challenge_id=challenge.id, submitted_by_user_id=creator.id, content='x')
+                               for _ in range(2))
+        db.session.commit()
+
+    # Default fields: the page with its creators joined in, then one grouped
+    # solution count
+    with count_statements(app) as statements:
+        response = client.get(f'/api/challenges?limit={count}')
+    assert response.status_code == 200
+    page = response.get_json()['challenges']
+    assert len(page) == count
+    assert all(c['createdBy'] and c['solutionCount'] == 2 for c in page)
+    assert len(statements) == 2
+
+    # Without solutionCount the grouped count is skipped
+    with count_statements(app) as statements:
+        response = client.get(f'/api/challenges?limit={count}&fields=title,createdBy')
+    assert response.status_code == 200
+    assert len(statements) == 1
+
+
+def test_detail_keeps_the_fields_the_detail_page_reads(app, client, challenges):
+    with app.app_context():
+        orphan = Challenge(title='Orphan', description='Nobody made it', category='IoT', status='APPROVED',
+                           deadline=datetime.utcnow() + timedelta(days=7))
+        db.session.add(orphan)
+        db.session.commit()
+        ids = {c.title: c.id for c in Challenge.query}
+
+    hosted = client.get(f"/api/challenges/{ids['Challenge 1999']}").get_json()
+    assert hosted['createdBy'] == hosted['created_by'] == 'Host'
+    assert hosted['prize'] == hosted['cashPrize'] == 19.99
+    assert hosted['maxParticipants'] is None and hosted['currentParticipants'] == 0
+
+    orphaned = client.get(f"/api/challenges/{ids['Orphan']}").get_json()
+    assert orphaned['createdBy'] == orphaned['created_by'] == 'Unknown'
+
+
+def host_client(app):
+    """A client logged in (cookie session) as the challenges fixture's host."""
+    client = app.test_client()
+    with app.app_context():
+        host_id = User.query.filter_by(email='host@example.com').one().id
+    with client.session_transaction() as session:
+        session['user_id'] = host_id
+    return client
+
+
+def test_unchanged_listing_answers_304_without_queries(app, client, challenges):
+    first = client.get('/api/challenges')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+
+    with count_statements(app) as statements:
+        again = client.get('/api/challenges', headers={'If-None-Match': etag})
+    assert (again.status_code, again.data, again.headers['ETag']) == (304, b'', etag)
+    assert statements == []
+    # Another URL is another resource
+    assert client.get('/api/challenges?limit=1', headers={'If-None-Match': etag}).status_code == 200
+
+    # A write bumps the 'challenges' version, and with it the ETag
+    with app.app_context():
+        challenge_id = Challenge.query.first().id
+    assert host_client(app).patch(f'/api/challenges/{challenge_id}/status', json={'status': 'ACTIVE'}).status_code == 200
+    changed = client.get('/api/challenges', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert client.get('/api/challenges', headers={'If-None-Match': changed.headers['ETag']}).status_code == 304
+
+
+def test_leaderboard_etag_follows_awards(app, client, challenges):
+    etag = client.get('/api/leaderboard').headers['ETag']
+    assert client.get('/api/leaderboard', headers={'If-None-Match': etag}).status_code == 304
+
+    with app.app_context():
+        award_points([(User.query.one().id, 10)])
+    changed = client.get('/api/leaderboard', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert [row['score'] for row in changed.get_json()] == [10]
+
+
+def test_creating_or_updating_a_challenge_refreshes_the_cached_pages(app, client, challenges):
+    listing = '/api/challenges?status=PENDING&fields=title,category'
+    assert client.get(listing).headers['X-Cache'] == 'MISS'
+    assert client.get(listing).headers['X-Cache'] == 'HIT'
+    assert client.get('/api/challenges/categories').get_json() == {'categories': ['IoT']}
+
+    host = host_client(app)
+    created = host.post('/api/challenges/create', json={
+        'title': 'Clean water', 'description': 'Filter it', 'category': 'Health', 'cashPrize': 50,
+        'participationType': 'individual', 'deadline': (datetime.now() + timedelta(days=10)).isoformat()})
+    assert created.status_code == 201
+    challenge_id = created.get_json()['challenge']['id']
+
+    fresh = client.get(listing)
+    assert fresh.headers['X-Cache'] == 'MISS'
+    assert [c['title'] for c in fresh.get_json()['challenges']] == ['Clean water']
+    assert sorted(client.get('/api/challenges/categories').get_json()['categories']) == ['Health', 'IoT']
+    assert client.get(f'/api/challenges/{challenge_id}').get_json()['title'] == 'Clean water'
+
+    assert host.put(f'/api/challenges/{challenge_id}', json={'title': 'Clean water for all'}).status_code == 200
+    assert [c['title'] for c in client.get(listing).get_json()['challenges']] == ['Clean water for all']
+    assert client.get(f'/api/challenges/{challenge_id}').get_json()['title'] == 'Clean water for all'
+
+
+def test_write_responses_count_solutions_without_loading_them(app, challenges):
+    host = host_client(app)
+    with app.app_context():
+        challenge = Challenge.query.filter_by(title='Challenge 1999').one()
+        challenge_id, host_id = challenge.id, challenge.created_by_id
+        db.session.add_all(Solution(challenge_id=challenge_id, submitted_by_user_id=host_id, content='x')
+                           for _ in range(3))
+        db.session.commit()
+
+    def loads_solution_rows(statements):
+        return [s for s in statements if 'FROM solution' in s and 'count(' not in s]
+
+    with count_statements(app) as statements:
+        created = host.post('/api/challenges/create', json={
+            'title': 'Clean water', 'description': 'Filter it', 'category': 'Health', 'cashPrize': 50,
+            'participationType': 'individual', 'deadline': (datetime.now() + timedelta(days=10)).isoformat()})
+        status = host.patch(f'/api/challenges/{challenge_id}/status', json={'status': 'PENDING'})
+        updated = host.put(f'/api/challenges/{challenge_id}', json={'title': 'Renamed'})
+    assert created.get_json()['challenge']['solutionCount'] == 0
+    assert status.get_json()['challenge']['solutionCount'] == 3
+    assert updated.status_code == 200 and updated.get_json()['challenge']['solutionCount'] == 3
+    assert loads_solution_rows(statements) == []
+
+    # Approved with submissions: still refused
+    assert host.patch(f'/api/challenges/{challenge_id}/status', json={'status': 'APPROVED'}).status_code == 200
+    refused = host.put(f'/api/challenges/{challenge_id}', json={'title': 'Again'})
+    assert refused.status_code == 400
+    assert refused.get_json() == {'error': 'Cannot edit challenge with existing submissions'}
@@ -0,0 +1,63 @@
+# Read-replica routing (@read_only, dbrouting.py) on a two-file SQLite pair
+
+from datetime import datetime, timedelta
+import pytest
+from flask import g
+from dbrouting import read_only, replica_engine, replica_used, sync_sqlite_replica
+from db import db, User, Challenge
+
+
+def add_challenge(category):
+    host = User.query.first()
+    if host is None:
+        host = User(name='Host', email='host@example.com', password_hash='x')
+        db.session.add(host)
+        db.session.flush()
+    challenge = Challenge(title=f'{category} challenge', description='Build it', category=category,
+                          status='APPROVED', deadline=datetime.utcnow() + timedelta(days=7),
+                          created_by_id=host.id)
+    db.session.add(challenge)
+    return challenge
+
+
+@pytest.fixture
+def app(app_factory, tmp_path):
+    """Primary and replica in sync on one challenge, then a second one on the primary only."""
+    app = app_factory(SQLALCHEMY_REPLICA_URI=f'sqlite:///{tmp_path / "replica.db"}')
+    with app.app_context():
+        add_challenge('IoT')
+        db.session.commit()
+        sync_sqlite_replica(db.engine, replica_engine())
+        add_challenge('Energy')
+        db.session.commit()
+    yield app
+    with app.app_context():
+        replica_engine().dispose()
+
+
+def test_read_only_routes_read_the_lagging_replica(client):
+    for _ in range(2):
+        response = client.get('/api/challenges/categories')
+        assert response.get_json() == {'categories': ['IoT']}
+        # Not stored: a replica read must not outlive the replica's lag
+        assert response.headers['X-Cache'] == 'MISS'
+
+    # Nor is it given an ETag
+    listing = client.get('/api/challenges?fields=title')
+    assert [c['title'] for c in listing.get_json()['challenges']] == ['IoT challenge']
+    assert listing.headers['X-Cache'] == 'MISS' and 'ETag' not in listing.headers
+
+
+def test_reads_after_a_write_go_to_the_primary(app):
+    @read_only
+    def count_after_write():
+        before = Challenge.query.count()
+        assert replica_used()
+        add_challenge('Water')
+        db.session.flush()
+        return before, Challenge.query.count()
+
+    with app.test_request_context('/'):
+        assert count_after_write() == (1, 3)
+        assert g.primary_reads
+        db.session.rollback()
@@ -0,0 +1,73 @@
+# JSON logs through the background queue (logs.py)
+
+import io
+import json
+import logging
+import threading
+from logs import stop_logging
+
+log = logging.getLogger('thinkstack.test')
+
+
+def make_app(app_factory, **config):
+    stream = io.StringIO()
+    return app_factory(LOG_STREAM=stream, **{'LOG_LEVEL': 'INFO', **config}), stream
+
+
+def records(app, stream):
+    stop_logging(app)  # writes out what is still queued
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_records_are_written_as_json_by_the_listener_thread(app_factory, monkeypatch):
+    app, stream = make_app(app_factory)
+    writers = []
+    emit = logging.StreamHandler.emit
+    monkeypatch.setattr(logging.StreamHandler, 'emit',
+                        lambda self, record: writers.append(threading.current_thread()) or emit(self, record))
+
+    with app.test_request_context(headers={'X-Request-ID': 'req-42'}):
+        app.preprocess_request()
+        log.info("Scored %s", 'mesh', extra={'solution_id': 7})
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            log.exception("Scoring failed")
+        log.debug("Not at INFO")
+
+    scored, failed = records(app, stream)
+    assert threading.current_thread() not in writers and len(writers) == 2
+    assert {key: scored[key] for key in ('level', 'logger', 'msg', 'request_id', 'solution_id')} == {
+        'level': 'INFO', 'logger': 'thinkstack.test', 'msg': 'Scored mesh', 'request_id': 'req-42', 'solution_id': 7}
+    assert scored['ts'].endswith('Z')
+    assert failed['level'] == 'ERROR' and 'ZeroDivisionError' in failed['exc']
+
+
+def test_requests_get_and_echo_an_id(app_factory):
+    app, stream = make_app(app_factory)
+    client = app.test_client()
+    assert client.get('/api/me', headers={'X-Request-ID': 'from-the-proxy'}).headers['X-Request-ID'] == 'from-the-proxy'
+    # Anything that isn't a plain token is replaced
+    generated = client.get('/api/me', headers={'X-Request-ID': 'bad id {}'}).headers['X-Request-ID']
+    assert len(generated) == 32 and generated.isalnum()
+
+
+def test_a_full_queue_drops_records_instead_of_blocking(app_factory):
+    app, stream = make_app(app_factory, LOG_QUEUE_SIZE=2)
+    app.extensions['log_listener'].stop()  # nothing drains the queue now
+    with app.app_context():
+        for i in range(5):
+            log.warning("Record %d", i)
+    handler = app.extensions['log_handler']
+    assert handler.dropped == 3
+    app.extensions['log_listener'].start()
+    assert [r['msg'] for r in records(app, stream)] == ['Record 0', 'Record 1']
+
+
+def test_debug_records_are_sampled(app_factory):
+    app, stream = make_app(app_factory, LOG_LEVEL='DEBUG', LOG_DEBUG_SAMPLE_RATE=0)
+    with app.app_context():
+        log.debug("Sampled away")
+        log.debug("Always kept", extra={'sample_rate': 1})
+        log.info("Not sampled")
+    assert [r['msg'] for r in records(app, stream)] == ['Always kept', 'Not sampled']
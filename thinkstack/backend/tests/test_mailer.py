@@ -0,0 +1,147 @@
+# Mail outbox (mailer.py) delivering to a local SMTP sink
+
+import socketserver
+import threading
+from datetime import datetime, timedelta
+import pytest
+from db import db, OutboxMessage
+from mailer import outbox
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Just enough SMTP to take mail from smtplib; `reject` makes it refuse every message."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPSession)
+        self.messages = []
+        self.reject = False
+
+
+class SMTPSession(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 sink ready')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().rstrip('\r\n')
+            command = line[:4].upper()
+            if not line or command == 'QUIT':
+                self.reply('221 bye')
+                return
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 sink')
+            elif command == 'MAIL':
+                recipients = []
+                self.reply('451 try again later' if self.server.reject else '250 ok')
+            elif command == 'RCPT':
+                recipients.append(line.split(':', 1)[1].strip(' <>'))
+                self.reply('250 ok')
+            elif command == 'DATA':
+                self.reply('354 go ahead')
+                data = []
+                while (chunk := self.rfile.readline()) not in (b'.\r\n', b''):
+                    data.append(chunk.decode())
+                self.server.messages.append((recipients, ''.join(data)))
+                self.reply('250 queued')
+            else:  # RSET, NOOP
+                self.reply('250 ok')
+
+
+@pytest.fixture
+def sink():
+    server = SMTPSink()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def app(app_factory, sink):
+    app = app_factory(MAIL_SERVER='127.0.0.1', MAIL_PORT=sink.server_address[1], MAIL_USE_TLS=False,
+                      MAIL_USERNAME=None, MAIL_PASSWORD=None, MAIL_DEFAULT_SENDER='noreply@example.com',
+                      MAIL_OUTBOX_BACKOFF=30, MAIL_OUTBOX_MAX_ATTEMPTS=3)
+    yield app
+    app.extensions['outbox'].shutdown()
+
+
+def deliver(app):
+    # What the background sender does, in the foreground until nothing is due
+    with app.app_context():
+        outbox.run(once=True)
+        db.session.remove()
+
+
+def test_committed_messages_reach_the_smtp_server(app, sink):
+    with app.app_context():
+        outbox.enqueue('ada@example.com', 'Welcome', body='Hello Ada')
+        outbox.enqueue(['bob@example.com', 'cy@example.com'], 'Approved', html='<p>Approved</p>')
+        db.session.commit()
+        outbox.enqueue('ghost@example.com', 'Never sent')
+        db.session.rollback()
+
+    deliver(app)
+    # Flask-Mail sends RCPT TO in set order
+    assert sorted(sorted(recipients) for recipients, _ in sink.messages) == [
+        ['ada@example.com'], ['bob@example.com', 'cy@example.com']]
+    assert 'Subject: Welcome' in next(data for recipients, data in sink.messages if recipients == ['ada@example.com'])
+    with app.app_context():
+        assert [(m.status, m.attempts) for m in OutboxMessage.query] == [('SENT', 1), ('SENT', 1)]
+        # Claimed rows can't be claimed again
+        assert outbox._claim() == []
+
+
+def test_failed_deliveries_back_off_then_fail(app, sink):
+    with app.app_context():
+        outbox.enqueue('ada@example.com', 'Welcome', body='Hello')
+        db.session.commit()
+        message_id = OutboxMessage.query.one().id
+
+    def due_now():
+        with app.app_context():
+            message = db.session.get(OutboxMessage, message_id)
+            delay = (message.next_attempt_at - datetime.utcnow()).total_seconds()
+            message.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+            db.session.commit()
+            return delay
+
+    sink.reject = True
+    deliver(app)
+    with app.app_context():
+        message = db.session.get(OutboxMessage, message_id)
+        assert (message.status, message.attempts) == ('PENDING', 1)
+        assert '451' in message.last_error
+    # Not due yet: another round sends nothing
+    deliver(app)
+    assert 24 <= due_now() <= 36  # MAIL_OUTBOX_BACKOFF with jitter
+
+    deliver(app)
+    assert 48 <= due_now() <= 72  # doubled
+
+    deliver(app)
+    with app.app_context():
+        message = db.session.get(OutboxMessage, message_id)
+        assert (message.status, message.attempts) == ('FAILED', 3)
+    assert sink.messages == []
+
+
+def test_a_retried_message_goes_out_once_the_server_is_back(app, sink):
+    with app.app_context():
+        outbox.enqueue('ada@example.com', 'Welcome', body='Hello')
+        db.session.commit()
+
+    sink.reject = True
+    deliver(app)
+    with app.app_context():
+        OutboxMessage.query.update({'next_attempt_at': datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+    sink.reject = False
+    deliver(app)
+    assert [recipients for recipients, _ in sink.messages] == [['ada@example.com']]
+    with app.app_context():
+        message = OutboxMessage.query.one()
+        assert (message.status, message.attempts, message.last_error) == ('SENT', 2, None)
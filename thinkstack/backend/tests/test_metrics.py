@@ -0,0 +1,57 @@
+# Prometheus metrics at /metrics (metrics.py)
+
+import re
+import pytest
+
+
+@pytest.fixture
+def app(app_factory):
+    return app_factory(METRICS_ENABLED=True, METRICS_TOKEN='scrape-token')
+
+
+def scrape(client, token='scrape-token'):
+    response = client.get('/metrics', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    return response.get_data(as_text=True)
+
+
+def sample(text, name, **labels):
+    """The value of one sample line, or None."""
+    rendered = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf'^{re.escape(name)}(?:\{{{re.escape(rendered)}\}})? (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def test_scrapes_need_the_token(client):
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer nope'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer é'}).status_code == 401
+    assert scrape(client).startswith('# HELP thinkstack_http_requests_total')
+
+
+def test_requests_are_counted_by_route_template(client):
+    for _ in range(2):
+        assert client.get('/api/challenges').status_code == 200
+    assert client.get('/api/challenges/41').status_code == 404
+    assert client.get('/api/challenges/42').status_code == 404
+
+    text = scrape(client)
+    requests = 'thinkstack_http_requests_total'
+    assert sample(text, requests, method='GET', route='/api/challenges', status='200') == 2
+    assert sample(text, requests, method='GET', route='/api/challenges/<int:challenge_id>', status='404') == 2
+    # Latency and SQL histograms, one observation per request
+    latency = 'thinkstack_http_request_duration_seconds'
+    assert sample(text, f'{latency}_count', method='GET', route='/api/challenges') == 2
+    assert sample(text, f'{latency}_bucket', method='GET', route='/api/challenges', le='+Inf') == 2
+    statements = 'thinkstack_http_request_sql_statements'
+    assert sample(text, f'{statements}_count', method='GET', route='/api/challenges') == 2
+    # One query for the first listing (no rows, so no solution counts), none for the cache hit
+    assert sample(text, f'{statements}_sum', method='GET', route='/api/challenges') == 1
+    assert sample(text, 'thinkstack_sql_statements_total') >= 4
+    assert sample(text, 'thinkstack_log_records_dropped') == 0
+
+
+def test_metrics_are_off_by_default(app_factory):
+    client = app_factory('plain').test_client()
+    assert client.get('/metrics').status_code == 404
@@ -0,0 +1,20 @@
+# Hot-path query plans (query_plans.py, `flask check-query-plans`)
+
+from db import db
+from query_plans import check_query_plans, is_full_scan
+
+
+def test_hot_queries_use_indexes(app):
+    with app.app_context():
+        results = check_query_plans()
+    assert results
+    assert [(name, plan) for name, plan, ok in results if not ok] == []
+
+
+def test_a_dropped_index_shows_up_as_a_full_scan(app):
+    with app.app_context():
+        db.session.execute(db.text('DROP INDEX ix_solution_challenge_id_user_id'))
+        db.session.commit()
+        failing = {name: plan for name, plan, ok in check_query_plans() if not ok}
+    assert list(failing) == ['solution counts']
+    assert any(is_full_scan(step) for step in failing['solution counts'])
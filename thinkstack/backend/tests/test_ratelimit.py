@@ -0,0 +1,67 @@
+# Token-bucket rate limits (ratelimit.py)
+
+import ratelimit
+from ratelimit import LocalRedis, RedisStore
+
+
+def client_as(app, user_id, ip='10.0.0.1'):
+    client = app.test_client()
+    client.environ_base['REMOTE_ADDR'] = ip
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    return client
+
+
+def submit(client):
+    # An empty submission: the limiter runs first, the view then answers 400
+    return client.post('/api/solutions', json={})
+
+
+def test_submissions_are_limited_per_user(app):
+    alice = client_as(app, 1)
+    for _ in range(10):
+        assert submit(alice).status_code == 400
+    limited = submit(alice)
+    assert limited.status_code == 429
+    assert limited.headers['Retry-After'] == '6'  # one token every 60 / 10 seconds
+    assert limited.get_json() == {'error': 'Too many requests, please slow down.'}
+
+    # Someone else on the same address still has their own bucket
+    assert submit(client_as(app, 2)).status_code == 400
+
+
+def test_submissions_are_limited_per_ip(app):
+    # Six users use up the address's 60 per minute between them
+    for user_id in range(1, 7):
+        client = client_as(app, user_id)
+        for _ in range(10):
+            assert submit(client).status_code == 400
+    assert submit(client_as(app, 7)).status_code == 429
+    assert submit(client_as(app, 7, ip='10.0.0.2')).status_code == 400
+
+
+def test_limits_can_be_switched_off(app_factory):
+    app = app_factory(RATELIMIT_ENABLED=False)
+    alice = client_as(app, 1)
+    assert all(submit(alice).status_code == 400 for _ in range(12))
+
+
+def test_shared_store_runs_the_bucket_script(app_factory, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ratelimit.time, 'time', lambda: clock[0])
+    store = RedisStore(LocalRedis())
+
+    assert [store.take('k', 2, 0.5) for _ in range(3)] == [(True, 0.0), (True, 0.0), (False, 2.0)]
+    clock[0] += 1  # half a token back
+    assert store.take('k', 2, 0.5) == (False, 1.0)
+    clock[0] += 1
+    assert store.take('k', 2, 0.5) == (True, 0.0)
+    assert store.take('other', 2, 0.5) == (True, 0.0)
+
+    # The same store behind a route, as two workers would share it
+    shared = LocalRedis()
+    apps = [app_factory(name, RATELIMIT_STORE=RedisStore(shared)) for name in ('first', 'second')]
+    for i in range(10):
+        assert submit(client_as(apps[i % 2], 1)).status_code == 400
+    assert submit(client_as(apps[0], 1)).status_code == 429
+
@@ -0,0 +1,82 @@
+# Concurrent point awards against the score_event ledger (helper.award_points)
+
+import random
+import threading
+from collections import Counter
+import pytest
+import helper
+from db import db, User, LeaderboardEntry, CategoryScore, ScoreEvent
+from helper import Award, award_points, replay_score_ledger
+from leaderboard import leaderboard
+
+THREADS = 8
+ROUNDS = 40
+CATEGORIES = ('IoT', 'Data Science', None)
+
+
+@pytest.mark.parametrize('upsert', ['native', 'row by row'])
+def test_concurrent_awards_add_up_to_the_ledger(app, monkeypatch, upsert):
+    if upsert == 'row by row':
+        # What a database without ON CONFLICT / ON DUPLICATE KEY gets
+        monkeypatch.setattr(helper, '_upsert_statement', lambda *args: None)
+    with app.app_context():
+        users = [User(name=f'Solver {i}', email=f'solver{i}@example.com', password_hash='x') for i in range(10)]
+        db.session.add_all(users)
+        db.session.commit()
+        user_ids = [user.id for user in users]
+        # Half the solvers have no leaderboard row yet, so the upserts race on inserts too
+        db.session.add_all(LeaderboardEntry(user_id=user_id, score=0, challenges_completed=0)
+                           for user_id in user_ids[:5])
+        db.session.commit()
+        leaderboard.reload()
+
+    applied, errors = [], []
+    start = threading.Barrier(THREADS)
+
+    def award_many(seed):
+        rng = random.Random(seed)
+        mine = []
+        try:
+            with app.app_context():
+                start.wait()
+                for _ in range(ROUNDS):
+                    batch = [Award(rng.choice(user_ids), rng.randint(1, 20), rng.choice(CATEGORIES))
+                             for _ in range(rng.randint(1, 3))]
+                    award_points(batch)
+                    mine.extend(batch)
+        except Exception as e:
+            errors.append(e)
+        applied.extend(mine)
+
+    threads = [threading.Thread(target=award_many, args=(seed,)) for seed in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    points, completed = Counter(), Counter()
+    category_points, category_completed = Counter(), Counter()
+    for award in applied:
+        points[award.user_id] += award.points
+        completed[award.user_id] += award.completed
+        if award.category:
+            category_points[(award.user_id, award.category)] += award.points
+            category_completed[(award.user_id, award.category)] += award.completed
+
+    with app.app_context():
+        assert ScoreEvent.query.count() == len(applied)
+        totals = {entry.user_id: (entry.score, entry.challenges_completed) for entry in LeaderboardEntry.query}
+        ranked = set(points) | set(user_ids[:5])
+        assert totals == {user_id: (points[user_id], completed[user_id]) for user_id in ranked}
+        category_totals = {(row.user_id, row.category): (row.score, row.challenges_completed)
+                           for row in CategoryScore.query}
+        assert category_totals == {key: (category_points[key], category_completed[key]) for key in category_points}
+        assert replay_score_ledger(dry_run=True) == []
+        # The replay overwrites every total through the same upsert
+        LeaderboardEntry.query.update({'score': 0})
+        db.session.commit()
+        assert replay_score_ledger()
+        assert {entry.user_id: (entry.score, entry.challenges_completed) for entry in LeaderboardEntry.query} == totals
+        for user_id in ranked:
+            assert leaderboard.rank(user_id)['score'] == points[user_id]
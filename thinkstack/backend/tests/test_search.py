@@ -0,0 +1,99 @@
+# Full-text challenge search (GET /api/challenges/search, search.py)
+
+from datetime import datetime, timedelta
+import pytest
+from db import db, User, Challenge
+from search import ensure_search_index, build_match_query
+
+
+@pytest.fixture
+def challenges(app):
+    """'solar' in the title, the category, the description and the requirements of one challenge each."""
+    with app.app_context():
+        ensure_search_index()
+        host = User(name='Host', email='host@example.com', password_hash='x', role='CHALLENGER')
+        db.session.add(host)
+        db.session.flush()
+        deadline = datetime.utcnow() + timedelta(days=30)
+        rows = [
+            ('Rural Wi-Fi', 'Connect villages', 'IoT', 'Runs on solar power'),
+            ('Water meter', 'Meters that run on solar panels', 'IoT', ''),
+            ('Solar mesh network', 'Connect schools', 'IoT', ''),
+            ('Grid planner', 'Plan the grid', 'Solar', ''),
+            ('Crop prices', 'Market data for farmers', 'Data Science', ''),
+        ]
+        db.session.add_all(
+            Challenge(title=title, description=description, category=category, additional_requirements=extra,
+                      status='APPROVED', deadline=deadline, created_by_id=host.id)
+            for title, description, category, extra in rows
+        )
+        db.session.commit()
+        return {c.title: c.id for c in Challenge.query}
+
+
+def search(client, query):
+    response = client.get(f'/api/challenges/search?{query}')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def titles(results):
+    return [c['title'] for c in results['challenges']]
+
+
+def test_results_are_ranked_by_the_column_weights(client, challenges):
+    # title (10) > category (4) > description (1) > requirements (0.5)
+    results = search(client, 'q=solar')
+    assert titles(results) == ['Solar mesh network', 'Grid planner', 'Water meter', 'Rural Wi-Fi']
+    ranks = [c['rank'] for c in results['challenges']]
+    assert ranks == sorted(ranks) and len(set(ranks)) == 4
+    # Every word must match, the last one as a prefix
+    assert titles(search(client, 'q=mesh+sol')) == ['Solar mesh network']
+    assert search(client, 'q=solar+crop')['challenges'] == []
+
+
+def test_snippets_mark_the_matching_words(client, challenges):
+    snippets = {c['title']: c['snippet'] for c in search(client, 'q=solar')['challenges']}
+    assert snippets['Solar mesh network'] == '<mark>Solar</mark> mesh network'
+    assert snippets['Water meter'] == 'Meters that run on <mark>solar</mark> panels'
+    # Porter stemming: 'panel' finds 'panels'
+    assert [c['snippet'] for c in search(client, 'q=panel')['challenges']] == \
+        ['Meters that run on solar <mark>panels</mark>']
+
+
+def test_the_cursor_pages_through_rank_then_id(client, challenges):
+    everything = titles(search(client, 'q=solar'))
+    seen, cursor = [], None
+    while True:
+        page = search(client, 'q=solar&limit=1' + (f'&cursor={cursor}' if cursor else ''))
+        seen += titles(page)
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert seen == everything
+
+    assert client.get('/api/challenges/search?q=solar&cursor=nonsense').status_code == 400
+    assert client.get('/api/challenges/search?q=%22%2A').status_code == 400
+
+
+def test_edits_reach_the_index_through_the_triggers(app, client, challenges):
+    with app.app_context():
+        db.session.get(Challenge, challenges['Crop prices']).title = 'Solar crop dryers'
+        db.session.delete(db.session.get(Challenge, challenges['Solar mesh network']))
+        db.session.commit()
+
+    assert titles(search(client, 'q=solar'))[0] == 'Solar crop dryers'
+    assert 'Solar mesh network' not in titles(search(client, 'q=solar'))
+    assert search(client, 'q=prices')['challenges'] == []
+    assert search(client, 'q=mesh')['challenges'] == []
+
+    # A raw UPDATE bypasses the ORM but not the triggers
+    with app.app_context():
+        db.session.execute(db.text("UPDATE challenge SET description = 'Sun-dried fruit' WHERE title = 'Water meter'"))
+        db.session.commit()
+    assert titles(search(client, 'q=fruit')) == ['Water meter']
+
+
+def test_user_input_is_quoted_for_fts5():
+    assert build_match_query('solar NEAR(mesh) "wifi"') == '"solar" "NEAR" "mesh" "wifi"*'
+    assert build_match_query('  *  ') is None
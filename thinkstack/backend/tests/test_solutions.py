@@ -0,0 +1,115 @@
+# Submitting (POST /api/solutions) and judging (PATCH /api/solutions/<id>/score) solutions
+
+import threading
+from datetime import datetime, timedelta
+import pytest
+from db import db, User, Challenge, Solution, LeaderboardEntry, ScoreEvent
+
+JUDGES = 8
+
+
+def test_concurrent_scoring_awards_points_once(app):
+    with app.app_context():
+        admin = User(name='Judge', email='judge@example.com', role='ADMIN')
+        admin.set_password('secret1')
+        solver = User(name='Solver', email='solver@example.com', password_hash='x')
+        db.session.add_all([admin, solver])
+        db.session.flush()
+        challenge = Challenge(title='Mesh', description='Connect schools', category='IoT',
+                              deadline=datetime.utcnow() + timedelta(days=7), created_by_id=admin.id)
+        db.session.add(challenge)
+        db.session.flush()
+        solution = Solution(challenge_id=challenge.id, submitted_by_user_id=solver.id, content='Solar Wi-Fi')
+        db.session.add_all([solution, LeaderboardEntry(user_id=solver.id, score=0, challenges_completed=0)])
+        db.session.commit()
+        solution_id, solver_id = solution.id, solver.id
+
+    clients = [app.test_client() for _ in range(JUDGES)]
+    for client in clients:
+        assert client.post('/api/login', json={'email': 'judge@example.com', 'password': 'secret1'}).status_code == 200
+
+    statuses = []
+    start = threading.Barrier(JUDGES)
+
+    def judge(client):
+        start.wait()
+        statuses.append(client.patch(f'/api/solutions/{solution_id}/score', json={'score': 40}).status_code)
+
+    threads = [threading.Thread(target=judge, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [200] + [409] * (JUDGES - 1)
+    with app.app_context():
+        assert ScoreEvent.query.filter_by(solution_id=solution_id).count() == 1
+        assert LeaderboardEntry.query.filter_by(user_id=solver_id).one().score == 40
+        assert db.session.get(Solution, solution_id).status == 'SCORED'
+
+
+@pytest.fixture
+def challenge(app):
+    """A challenge hosted by host@, with solver@ signed up (password secret1 for both)."""
+    with app.app_context():
+        host = User(name='Host', email='host@example.com', role='CHALLENGER')
+        solver = User(name='Solver', email='solver@example.com')
+        for user in (host, solver):
+            user.set_password('secret1')
+        db.session.add_all([host, solver])
+        db.session.flush()
+        challenge = Challenge(title='Mesh', description='Connect schools', category='IoT', status='APPROVED',
+                              deadline=datetime.utcnow() + timedelta(days=7), created_by_id=host.id)
+        db.session.add(challenge)
+        db.session.commit()
+        return challenge.id
+
+
+def login(app, email):
+    client = app.test_client()
+    assert client.post('/api/login', json={'email': email, 'password': 'secret1'}).status_code == 200
+    return client
+
+
+@pytest.mark.parametrize('body, status, error', [
+    ({'attachments': 'https://github.com/x/y'}, 400, 'Missing challenge ID or GitHub URL'),
+    ({'challenge_id': 'abc', 'attachments': 'https://github.com/x/y'}, 400, 'Invalid challenge ID'),
+    ({'challenge_id': [1], 'attachments': 'https://github.com/x/y'}, 400, 'Invalid challenge ID'),
+    ({'challenge_id': 999, 'attachments': 'https://github.com/x/y'}, 404, 'Challenge not found'),
+    ({'challenge_id': 'CHALLENGE', 'upload_id': 'f' * 32}, 404, 'Upload not found'),
+])
+def test_bad_submissions_are_client_errors(app, challenge, body, status, error):
+    if body.get('challenge_id') == 'CHALLENGE':
+        body = {**body, 'challenge_id': str(challenge)}
+    response = login(app, 'solver@example.com').post('/api/solutions', json=body)
+    assert (response.status_code, response.get_json()) == (status, {'error': error})
+
+
+def test_submit_then_score_a_solution(app, challenge):
+    solver = login(app, 'solver@example.com')
+    assert solver.post('/api/solutions', data='not json').status_code == 400
+    submitted = solver.post('/api/solutions', json={'challenge_id': str(challenge), 'content': 'Solar Wi-Fi',
+                                                    'attachments': 'https://github.com/solver/mesh'})
+    assert submitted.status_code == 201
+    solution = submitted.get_json()['solution']
+    again = solver.post('/api/solutions', json={'challenge_id': challenge, 'attachments': 'https://github.com/x/y'})
+    assert again.status_code == 409
+
+    # Only the host (or an admin) judges, with a non-negative whole score
+    assert solver.patch(f"/api/solutions/{solution['id']}/score", json={'score': 50}).status_code == 403
+    host = login(app, 'host@example.com')
+    assert host.patch('/api/solutions/999/score', json={'score': 50}).status_code == 404
+    for score in (-1, 'lots', None):
+        assert host.patch(f"/api/solutions/{solution['id']}/score", json={'score': score}).status_code == 400
+    scored = host.patch(f"/api/solutions/{solution['id']}/score", json={'score': 50})
+    assert scored.status_code == 200 and scored.get_json()['solution']['status'] == 'SCORED'
+    assert host.patch(f"/api/solutions/{solution['id']}/score", json={'score': 50}).status_code == 409
+
+    # The points show up on the in-memory ranking
+    with app.app_context():
+        solver_id = User.query.filter_by(email='solver@example.com').one().id
+    rank = app.test_client().get(f'/api/leaderboard/rank/{solver_id}').get_json()
+    assert (rank['rank'], rank['score'], rank['total']) == (1, 50, 1)
+    around = app.test_client().get(f'/api/leaderboard/around/{solver_id}?k=2').get_json()
+    assert [e['user_id'] for e in around['entries']] == [solver_id]
+    assert app.test_client().get('/api/leaderboard/rank/999').status_code == 404
@@ -0,0 +1,71 @@
+# WAL, pragmas and the in-process write serializer (sqlite_tuning.py)
+
+import threading
+import time
+import pytest
+from sqlalchemy.exc import OperationalError
+from db import db, User
+from sqlite_tuning import DEFAULT_PRAGMAS, WriteSerializer, write_serializer
+
+
+@pytest.fixture
+def app(app_factory):
+    # No busy timeout: a writer that finds the database locked fails at once
+    return app_factory(SQLITE_PRAGMAS={**DEFAULT_PRAGMAS, 'busy_timeout': 0})
+
+
+def two_writers(app):
+    """
+    Two threads, each in its own session, insert a user; the first holds its
+    transaction open until the second has tried to write. Returns the errors.
+    """
+    first_wrote, second_tried = threading.Event(), threading.Event()
+    errors = []
+
+    def write(name, hold):
+        try:
+            with app.app_context():
+                db.session.add(User(name=name, email=f'{name}@example.com', password_hash='x'))
+                db.session.flush()
+                if hold:
+                    first_wrote.set()
+                    second_tried.wait(2)
+                    time.sleep(0.1)
+                db.session.commit()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            if not hold:
+                second_tried.set()
+
+    first = threading.Thread(target=write, args=('first', True))
+    first.start()
+    first_wrote.wait(2)
+    second = threading.Thread(target=write, args=('second', False))
+    second.start()
+    # Once it is queued on the write lock, let the first writer commit
+    deadline = time.monotonic() + 2
+    while write_serializer.waiting == 0 and second.is_alive() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    second_tried.set()
+    first.join()
+    second.join()
+    return errors
+
+
+def test_concurrent_writers_both_commit(app):
+    with app.app_context():
+        assert db.session.execute(db.text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert app.extensions['sqlite_write_serializer'] is write_serializer
+
+    assert two_writers(app) == []
+    with app.app_context():
+        assert sorted(name for (name,) in db.session.query(User.name)) == ['first', 'second']
+    assert write_serializer.waiting == 0
+
+
+def test_without_the_serializer_the_second_writer_is_locked_out(app, monkeypatch):
+    monkeypatch.setattr(WriteSerializer, 'acquire', lambda self, session: None)
+    errors = two_writers(app)
+    assert len(errors) == 1 and isinstance(errors[0], OperationalError)
+    assert 'database is locked' in str(errors[0])
@@ -0,0 +1,58 @@
+# Slow-query log and per-request SQL profiler (sqlprofile.py)
+
+import io
+import json
+from db import db, User
+from logs import stop_logging
+
+
+def make_app(app_factory, **config):
+    stream = io.StringIO()
+    app = app_factory(LOG_STREAM=stream, LOG_LEVEL='INFO', **config)
+    with app.app_context():
+        user = User(name='Ada', email='ada@example.com')
+        user.set_password('secret1')
+        db.session.add(user)
+        db.session.commit()
+    return app, stream
+
+
+def records(app, stream):
+    stop_logging(app)  # writes out what is still queued
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_slow_queries_are_logged_with_credentials_masked(app_factory):
+    app, stream = make_app(app_factory, SQL_SLOW_QUERY_MS=0, SQL_LOG_PARAMS=True)
+    client = app.test_client()
+    assert client.post('/api/login', json={'email': 'ada@example.com', 'password': 'secret1'}).status_code == 200
+
+    slow = [r for r in records(app, stream) if r.get('event') == 'slow_query']
+    lookup = next(r for r in slow if 'WHERE user.email = ?' in r['sql'])
+    assert lookup['params'] == ['[redacted]', 1, 0]  # the email, then LIMIT 1 OFFSET 0
+    assert lookup['ms'] >= 0 and lookup['level'] == 'WARNING'
+    assert lookup['site'][0].startswith('routes/auth.py:')
+    assert 'ada@example.com' not in stream.getvalue()
+    assert 'pbkdf2:' not in stream.getvalue()
+
+
+def test_slow_queries_leave_the_parameters_out_unless_asked(app_factory):
+    app, stream = make_app(app_factory, SQL_SLOW_QUERY_MS=0)
+    app.test_client().get('/api/challenges?min_prize=5')
+    slow = [r for r in records(app, stream) if r.get('event') == 'slow_query']
+    assert slow and all(r['params'] is None for r in slow)
+
+
+def test_a_request_with_the_token_is_profiled(app_factory):
+    app, stream = make_app(app_factory, SQL_PROFILE_TOKEN='profile-me')
+    client = app.test_client()
+    assert 'X-SQL-Statements' not in client.get('/api/challenges').headers
+    assert 'X-SQL-Statements' not in client.get('/api/challenges?limit=5', headers={'X-SQL-Profile': 'guess'}).headers
+
+    profiled = client.get('/api/challenges?limit=7', headers={'X-SQL-Profile': 'profile-me'})
+    assert profiled.headers['X-SQL-Statements'] == '1'
+    profiles = [r for r in records(app, stream) if r['msg'] == 'SQL profile']
+    assert len(profiles) == 1
+    assert profiles[0]['path'] == '/api/challenges?limit=7'
+    assert profiles[0]['statements'] == 1
+    assert profiles[0]['request_id'] == profiled.headers['X-Request-ID']
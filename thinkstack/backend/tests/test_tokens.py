@@ -0,0 +1,78 @@
+# Bearer tokens and revocation (tokens.py, routes/auth.py)
+
+import pytest
+import tokens
+from app import create_app
+from db import db, User, TokenRevocation
+
+
+@pytest.fixture
+def workers(app_factory, tmp_path):
+    """Two apps on one database file, as two gunicorn workers would be."""
+    uri = f'sqlite:///{tmp_path / "shared.db"}'
+    first, second = (app_factory(name, SQLALCHEMY_DATABASE_URI=uri) for name in ('first', 'second'))
+    with first.app_context():
+        admin = User(name='Admin', email='admin@example.com', role='ADMIN')
+        admin.set_password('secret1')
+        db.session.add(admin)
+        db.session.commit()
+    return first, second
+
+
+def admin_login(app):
+    return app.test_client().post('/api/admin/login', json={'email': 'admin@example.com', 'password': 'secret1'})
+
+
+def dashboard(app, token):
+    return app.test_client().get('/api/admin/challenges', headers={'Authorization': f'Bearer {token}'})
+
+
+def test_a_token_revoked_in_one_worker_is_refused_by_the_others(workers):
+    first, second = workers
+    issued = admin_login(first).get_json()
+    access, refresh = issued['access_token'], issued['refresh_token']
+    assert dashboard(second, access).status_code == 200
+
+    revoked = first.test_client().post('/api/token/revoke', json={'refresh_token': refresh},
+                                       headers={'Authorization': f'Bearer {access}'})
+    assert revoked.status_code == 200
+    denied = dashboard(second, access)
+    assert (denied.status_code, denied.get_json()) == (401, {'error': 'Token has been revoked'})
+    assert second.test_client().post('/api/token/refresh',
+                                     headers={'Authorization': f'Bearer {refresh}'}).status_code == 401
+    with first.app_context():
+        assert TokenRevocation.query.count() == 2
+
+
+def test_suspending_a_user_ends_their_tokens_in_every_worker(workers, monkeypatch):
+    first, second = workers
+    access = admin_login(first).get_json()['access_token']
+
+    # A cut-off a few seconds on, so the token's iat falls before it
+    now = tokens.time.time()
+    monkeypatch.setattr(tokens.time, 'time', lambda: now + 5)
+    with first.app_context():
+        User.query.one().is_suspended = True
+        db.session.commit()
+    assert dashboard(second, access).status_code == 401
+
+
+def test_a_suspended_admin_cannot_log_in(workers):
+    first, _ = workers
+    with first.app_context():
+        User.query.one().is_suspended = True
+        db.session.commit()
+    response = admin_login(first)
+    assert response.status_code == 401
+    assert 'access_token' not in response.get_json()
+
+
+def test_the_signing_keys_must_come_from_the_environment(app_factory):
+    with pytest.raises(RuntimeError, match='SECRET_KEY is not set'):
+        create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'LOG_LEVEL': 'WARNING',
+                    'SECRET_KEY': None, 'JWT_SECRET_KEY': None})
+
+    # A development server makes up throwaway keys instead
+    app = app_factory(TESTING=True, SECRET_KEY=None, JWT_SECRET_KEY=None)
+    assert len(app.config['SECRET_KEY']) == 64
+    assert app.config['JWT_SECRET_KEY'] not in (None, app.config['SECRET_KEY'])
@@ -0,0 +1,130 @@
+# Resumable uploads (POST/PUT /api/uploads, uploads.py)
+
+import hashlib
+import threading
+from datetime import datetime, timedelta
+import blobs
+import uploads
+import routes.solutions
+from db import db, User, Challenge, Solution, Blob, UploadSession
+
+
+def login(app, email):
+    client = app.test_client()
+    assert client.post('/api/login', json={'email': email, 'password': 'secret1'}).status_code == 200
+    return client
+
+
+def owner_and_challenge(app):
+    """Users owner@ and other@ (password secret1) and a challenge; returns its id."""
+    with app.app_context():
+        owner = User(name='Owner', email='owner@example.com')
+        other = User(name='Other', email='other@example.com')
+        for user in (owner, other):
+            user.set_password('secret1')
+        db.session.add_all([owner, other])
+        db.session.flush()
+        challenge = Challenge(title='Mesh', description='Connect schools', category='IoT',
+                              deadline=datetime.utcnow() + timedelta(days=7), created_by_id=owner.id)
+        db.session.add(challenge)
+        db.session.commit()
+        return challenge.id
+
+
+def upload(client, challenge_id, body):
+    """Upload body in one chunk and complete it; returns the upload id."""
+    created = client.post('/api/uploads', json={'challenge_id': challenge_id, 'filename': 'mesh.txt', 'size': len(body)})
+    upload_id = created.get_json()['upload']['id']
+    assert client.put(f'/api/uploads/{upload_id}', data=body, headers={'Upload-Offset': '0'}).status_code == 200
+    assert client.post(f'/api/uploads/{upload_id}/complete').status_code == 200
+    return upload_id
+
+
+def test_upload_locks_only_exist_for_owned_uploads_in_use(app):
+    challenge_id = owner_and_challenge(app)
+    owner_client, other_client = login(app, 'owner@example.com'), login(app, 'other@example.com')
+    body = b'solar mesh' * 100
+    created = owner_client.post('/api/uploads', json={'challenge_id': challenge_id, 'filename': 'mesh.txt',
+                                                      'size': len(body), 'sha256': hashlib.sha256(body).hexdigest()})
+    assert created.status_code == 201
+    upload_id = created.get_json()['upload']['id']
+
+    # Unknown ids and other people's uploads are turned away before a lock is made
+    for client, target in [(owner_client, 'f' * 32), (other_client, upload_id)]:
+        response = client.put(f'/api/uploads/{target}', data=body, headers={'Upload-Offset': '0'})
+        assert response.status_code == 404
+    assert uploads._upload_locks == {}
+
+    chunk = owner_client.put(f'/api/uploads/{upload_id}', data=body[:500], headers={'Upload-Offset': '0'})
+    assert chunk.status_code == 200 and chunk.headers['Upload-Offset'] == '500'
+    chunk = owner_client.put(f'/api/uploads/{upload_id}', data=body[500:], headers={'Upload-Offset': '500'})
+    assert chunk.status_code == 200
+    assert owner_client.post(f'/api/uploads/{upload_id}/complete').status_code == 200
+    assert uploads._upload_locks == {}
+
+
+def test_a_blob_collected_mid_submission_is_not_attached(app, monkeypatch):
+    challenge_id = owner_and_challenge(app)
+    client = login(app, 'owner@example.com')
+    upload_id = upload(client, challenge_id, b'solar mesh' * 100)
+
+    # gc-blobs runs in another worker after the view has seen the upload COMPLETE
+    def collect_then_check(challenge_id, user_id):
+        def collect():
+            with app.app_context():
+                assert blobs.collect_garbage(grace=timedelta(0))['blobs'] == 1
+        worker = threading.Thread(target=collect)
+        worker.start()
+        worker.join()
+        return check(challenge_id, user_id)
+    check = routes.solutions.existing_solution_query
+    monkeypatch.setattr(routes.solutions, 'existing_solution_query', collect_then_check)
+
+    response = client.post('/api/solutions', json={'challenge_id': challenge_id, 'upload_id': upload_id})
+    assert response.status_code == 409
+    assert response.get_json() == {'error': 'Upload has expired, please upload the file again'}
+    with app.app_context():
+        assert (Solution.query.count(), Blob.query.count()) == (0, 0)
+
+
+def test_an_attached_blob_survives_collection(app):
+    challenge_id = owner_and_challenge(app)
+    client = login(app, 'owner@example.com')
+    upload_id = upload(client, challenge_id, b'solar mesh' * 100)
+    assert client.post('/api/solutions', json={'challenge_id': challenge_id, 'upload_id': upload_id}).status_code == 201
+
+    with app.app_context():
+        assert blobs.collect_garbage(grace=timedelta(0))['blobs'] == 0
+        assert [blob.ref_count for blob in Blob.query] == [1]
+
+
+def test_a_chunk_loses_to_another_worker_that_moved_the_offset(app, monkeypatch):
+    challenge_id = owner_and_challenge(app)
+    client = login(app, 'owner@example.com')
+    body = b'solar mesh' * 100
+    upload_id = client.post('/api/uploads', json={'challenge_id': challenge_id, 'filename': 'mesh.txt',
+                                                  'size': len(body)}).get_json()['upload']['id']
+
+    # The same chunk, retried on another worker, commits while this one streams
+    def other_worker_commits_first(upload):
+        def commit():
+            with app.app_context():
+                UploadSession.query.filter_by(id=upload_id).update({'received': 500})
+                db.session.commit()
+        worker = threading.Thread(target=commit)
+        worker.start()
+        worker.join()
+        return running_hash(upload)
+    running_hash = uploads._running_hash
+    monkeypatch.setattr(uploads, '_running_hash', other_worker_commits_first)
+
+    response = client.put(f'/api/uploads/{upload_id}', data=body[:500], headers={'Upload-Offset': '0'})
+    assert response.status_code == 409
+    assert response.headers['Upload-Offset'] == '500'
+    monkeypatch.undo()
+
+    # Not advanced twice: the client resumes where the other worker left off
+    chunk = client.put(f'/api/uploads/{upload_id}', data=body[500:], headers={'Upload-Offset': '500'})
+    assert chunk.status_code == 200 and chunk.headers['Upload-Offset'] == str(len(body))
+    assert client.post(f'/api/uploads/{upload_id}/complete').get_json()['upload']['sha256'] == \
+        hashlib.sha256(body).hexdigest()
@@ -0,0 +1,190 @@
+# tokens.py
+#
+# Signed bearer tokens (flask-jwt-extended). Access tokens are short lived
+# and carry the user's role, so login_required / admin_required can authorize
+# a request from the signature alone - no session lookup, no users query.
+# Refresh tokens live longer and are exchanged at /api/token/refresh, which is
+# the one place that goes back to the database (to pick up suspension or a
+# new role).
+#
+# Revocation is a compact deny list: revoked token ids (jti) until the token
+# would have expired anyway, plus a per-user cut-off that kills every token
+# issued before it (suspension, role or password change). Entries are pruned
+# as they expire, so the list only ever holds what is still live. Each app
+# keeps a copy in process (app.extensions['revocations'], which `revocations`
+# resolves through current_app) and writes through to a store every worker
+# shares: the token_revocation table by default (DatabaseStore), or whatever
+# JWT_REVOCATION_STORE is set to - a redis.Redis client, say (anything with
+# mget/set(ex=)).
+#
+# Tokens are signed with JWT_SECRET_KEY and the session cookie with
+# SECRET_KEY. Both come from the environment; outside debug and testing the
+# app refuses to start without them rather than sign with a key anyone with
+# the source can read.
+
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app, jsonify
+from sqlalchemy.exc import IntegrityError
+from werkzeug.local import LocalProxy
+from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token
+from db import db, TokenRevocation
+
+jwt = JWTManager()
+
+
+class DatabaseStore:
+    """
+    The part of the redis client API RevocationList uses, on the
+    token_revocation table. It talks to the primary on connections of its
+    own, so a revocation is written whatever the request's session does
+    next, and read-only routes still see it while reading from a replica.
+    """
+
+    def __init__(self):
+        self._next_prune = 0
+
+    def mget(self, keys):
+        table = TokenRevocation.__table__
+        with db.engine.connect() as conn:
+            rows = dict(conn.execute(
+                db.select(table.c.key, table.c.value)
+                  .where(table.c.key.in_(keys), table.c.expires_at > datetime.utcnow())
+            ).all())
+        return [rows.get(key) for key in keys]
+
+    def set(self, key, value, ex):
+        table = TokenRevocation.__table__
+        now = datetime.utcnow()
+        row = {'value': int(value), 'expires_at': now + timedelta(seconds=ex)}
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(table.insert().values(key=key, **row))
+        except IntegrityError:
+            with db.engine.begin() as conn:
+                conn.execute(table.update().where(table.c.key == key).values(**row))
+        if time.time() >= self._next_prune:
+            self._next_prune = time.time() + 60
+            with db.engine.begin() as conn:
+                conn.execute(table.delete().where(table.c.expires_at <= now))
+
+
+class RevocationList:
+    def __init__(self, prefix='thinkstack:revoked:'):
+        self.store = None
+        self.prefix = prefix
+        self.user_ttl = 14 * 86400  # at least the refresh token lifetime
+        self._tokens = {}  # jti -> exp
+        self._users = {}  # user id -> (cut-off, expires_at)
+        self._lock = threading.Lock()
+        self._next_prune = 0
+
+    def _prune(self, now):
+        if now < self._next_prune:
+            return
+        self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+        self._users = {uid: entry for uid, entry in self._users.items() if entry[1] > now}
+        self._next_prune = now + 60
+
+    def revoke(self, payload):
+        """Revoke one decoded token until it expires."""
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            self._tokens[payload['jti']] = payload['exp']
+        if self.store is not None:
+            self.store.set(self.prefix + payload['jti'], 1, ex=max(int(payload['exp'] - now), 1))
+
+    def revoke_user(self, user_id):
+        """Revoke every token issued to user_id up to now."""
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            self._users[str(user_id)] = (int(now), now + self.user_ttl)
+        if self.store is not None:
+            self.store.set(f'{self.prefix}user:{user_id}', int(now), ex=self.user_ttl)
+
+    def is_revoked(self, payload):
+        cutoff = self._users.get(payload['sub'], (None,))[0]
+        if payload['jti'] in self._tokens:
+            return True
+        if self.store is not None:
+            token, shared = self.store.mget([self.prefix + payload['jti'], f"{self.prefix}user:{payload['sub']}"])
+            if token is not None:
+                return True
+            if shared is not None:
+                cutoff = max(cutoff or 0, int(shared))
+        # iat has one second resolution: tokens minted in the cut-off second
+        # itself stay valid, so a login right after e.g. a rehash still works
+        return cutoff is not None and payload['iat'] < cutoff
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+
+# The current app's list
+revocations = LocalProxy(lambda: current_app.extensions['revocations'])
+
+
+def init_jwt(app):
+    for key in ('SECRET_KEY', 'JWT_SECRET_KEY'):
+        if not app.config.get(key):
+            if not (app.debug or app.testing):
+                raise RuntimeError(f'{key} is not set; export it before starting the app')
+            # Good until this process exits, which is all a dev server needs
+            app.config[key] = secrets.token_hex(32)
+    app.config.setdefault('JWT_ACCESS_TOKEN_EXPIRES', timedelta(minutes=15))
+    app.config.setdefault('JWT_REFRESH_TOKEN_EXPIRES', timedelta(days=14))
+    app.config.setdefault('JWT_TOKEN_LOCATION', ['headers'])
+    app.config.setdefault('JWT_REVOCATION_STORE', None)
+    jwt.init_app(app)
+    revoked = RevocationList()
+    revoked.store = app.config['JWT_REVOCATION_STORE'] or DatabaseStore()
+    revoked.user_ttl = int(app.config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds())
+    app.extensions['revocations'] = revoked
+
+
+def create_access_token_for(user):
+    return create_access_token(identity=str(user.id), additional_claims={'role': user.role})
+
+
+def issue_tokens(user):
+    return {
+        'access_token': create_access_token_for(user),
+        'refresh_token': create_refresh_token(identity=str(user.id)),
+    }
+
+
+@jwt.token_in_blocklist_loader
+def _is_revoked(jwt_header, jwt_payload):
+    return revocations.is_revoked(jwt_payload)
+
+
+# Same error shape as the rest of the API instead of flask-jwt-extended's {'msg': ...}
+@jwt.expired_token_loader
+def _expired(jwt_header, jwt_payload):
+    return jsonify({'error': 'Token has expired'}), 401
+
+
+@jwt.revoked_token_loader
+def _revoked(jwt_header, jwt_payload):
+    return jsonify({'error': 'Token has been revoked'}), 401
+
+
+@jwt.invalid_token_loader
+def _invalid(reason):
+    return jsonify({'error': f'Invalid token: {reason}'}), 401
+
+
+@jwt.unauthorized_loader
+def _missing(reason):
+    return jsonify({'error': 'Authentication required'}), 401
+
+
+@jwt.needs_fresh_token_loader
+def _not_fresh(jwt_header, jwt_payload):
+    return jsonify({'error': 'Fresh token required'}), 401
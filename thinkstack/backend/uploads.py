@@ -0,0 +1,197 @@
+# uploads.py
+#
+# Resumable, chunked uploads for solution attachments.
+#
+#   POST /api/uploads                  {challenge_id, filename, size, sha256?}
+#   PUT  /api/uploads/<id>             raw bytes, header Upload-Offset: <n>
+#   HEAD /api/uploads/<id>             -> Upload-Offset / Upload-Length
+#   POST /api/uploads/<id>/complete    -> sha256, ready to attach to a solution
+#
+# Each chunk is streamed from the request body to the partial file in small
+# blocks and fed to a running SHA-256 as it goes, so a worker never holds more
+# than UPLOAD_BLOCK_SIZE bytes of an upload in memory, whatever the file size.
+# Completed files go to the content-addressed store in blobs.py.
+# If the client disconnects mid-chunk the bytes that made it to disk are kept
+# and HEAD tells it where to resume. The running hash lives in this process;
+# after a restart (or on another worker) it is rebuilt by re-reading the
+# partial file once.
+#
+# upload_lock only orders chunks within one process. Across workers the
+# offset itself is the lock: a chunk moves `received` with a conditional
+# UPDATE (... WHERE id = ? AND received = <the offset it started at>), and
+# if another worker moved it first the chunk is refused with 409 and the
+# current Upload-Offset. That race is a client retrying a chunk whose first
+# attempt is still running elsewhere, so both wrote the same bytes.
+#
+# Chunks must fit in MAX_CONTENT_LENGTH; the total is capped per challenge
+# (Challenge.max_upload_bytes, falling back to UPLOAD_MAX_BYTES).
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import update
+from werkzeug.exceptions import Conflict, RequestEntityTooLarge, UnprocessableEntity, BadRequest
+from db import db, UploadSession
+import blobs
+
+UPLOAD_BLOCK_SIZE = 64 * 1024
+
+# upload id -> (offset, running sha256); bounded, a miss just means a re-read
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+_MAX_HASHERS = 256
+# One writer per upload at a time within this process:
+# upload id -> (lock, requests holding or waiting for it)
+_upload_locks = {}
+
+
+def max_upload_bytes(challenge):
+    return challenge.max_upload_bytes or current_app.config['UPLOAD_MAX_BYTES']
+
+
+def partial_path(upload):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], 'partial', upload.id)
+
+
+@contextmanager
+def upload_lock(upload_id):
+    """
+    Serialize writers to one upload. Take it only for an upload the caller
+    owns; the entry goes away again when the last request holding or waiting
+    for it is done, so nothing piles up for finished or abandoned uploads.
+    """
+    with _hashers_lock:
+        lock, users = _upload_locks.get(upload_id) or (threading.Lock(), 0)
+        _upload_locks[upload_id] = (lock, users + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _hashers_lock:
+            lock, users = _upload_locks[upload_id]
+            if users > 1:
+                _upload_locks[upload_id] = (lock, users - 1)
+            else:
+                del _upload_locks[upload_id]
+
+
+def _running_hash(upload):
+    """SHA-256 of the first upload.received bytes, from the cache or by re-reading the file."""
+    with _hashers_lock:
+        cached = _hashers.pop(upload.id, None)
+    if cached is not None and cached[0] == upload.received:
+        return cached[1]
+    digest = hashlib.sha256()
+    remaining = upload.received
+    if remaining:
+        with open(partial_path(upload), 'rb') as f:
+            while remaining:
+                block = f.read(min(UPLOAD_BLOCK_SIZE, remaining))
+                if not block:
+                    raise Conflict('Partial upload is shorter than recorded; restart the upload')
+                digest.update(block)
+                remaining -= len(block)
+    return digest
+
+
+def _remember_hash(upload, digest):
+    with _hashers_lock:
+        _hashers[upload.id] = (upload.received, digest)
+        while len(_hashers) > _MAX_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def forget(upload):
+    with _hashers_lock:
+        _hashers.pop(upload.id, None)
+
+
+def start_upload(upload):
+    os.makedirs(os.path.dirname(partial_path(upload)), exist_ok=True)
+    open(partial_path(upload), 'wb').close()
+
+
+def write_chunk(upload, stream, offset):
+    """
+    Append the request body at `offset`, which must equal upload.received.
+    Advances upload.received by what was written - also when the client goes
+    away halfway, so it can resume from there - unless another request moved
+    it meanwhile (Conflict). Returns the bytes written; the caller commits.
+    """
+    if upload.status != 'UPLOADING':
+        raise Conflict('Upload is already complete')
+    if offset != upload.received:
+        raise Conflict(f'Upload-Offset must be {upload.received}')
+
+    digest = _running_hash(upload)
+    start = upload.received
+    written = 0
+    try:
+        with open(partial_path(upload), 'r+b') as f:
+            f.seek(upload.received)
+            while True:
+                block = stream.read(UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                if upload.received + written + len(block) > upload.size:
+                    raise RequestEntityTooLarge('Chunk goes past the declared upload size')
+                f.write(block)
+                digest.update(block)
+                written += len(block)
+            # Drop anything past our offset left over from an interrupted write
+            f.truncate()
+    except RequestEntityTooLarge:
+        # Keep what fit before the overflow: rewind to the last good offset
+        with open(partial_path(upload), 'r+b') as f:
+            f.truncate(upload.received + written)
+        raise
+    finally:
+        advanced = _advance(upload, start, written)
+        if advanced:
+            _remember_hash(upload, digest)
+        else:
+            forget(upload)
+    if not advanced:
+        raise Conflict('Another request moved the upload offset; resume from Upload-Offset')
+    return written
+
+
+def _advance(upload, start, written):
+    """Move received from `start` to start + written, if it is still at `start`."""
+    result = db.session.execute(
+        update(UploadSession)
+        .where(UploadSession.id == upload.id, UploadSession.received == start)
+        .values(received=start + written, updated_at=datetime.utcnow())
+    )
+    return result.rowcount == 1
+
+
+def complete_upload(upload):
+    """Verify size and checksum and file the content in the blob store. Returns the sha256 hex."""
+    if upload.status == 'COMPLETE':
+        return upload.sha256
+    if upload.received != upload.size:
+        raise Conflict(f'Upload is incomplete: {upload.received} of {upload.size} bytes received')
+    sha256 = _running_hash(upload).hexdigest()
+    if upload.expected_sha256 and upload.expected_sha256.lower() != sha256:
+        raise UnprocessableEntity('Checksum mismatch; the file was corrupted in transit')
+    blobs.store(partial_path(upload), sha256, upload.size)
+    upload.sha256 = sha256
+    upload.status = 'COMPLETE'
+    upload.updated_at = datetime.utcnow()
+    forget(upload)
+    return sha256
+
+
+def parse_offset(value):
+    try:
+        offset = int(value)
+    except (TypeError, ValueError):
+        raise BadRequest('Upload-Offset header is required')
+    if offset < 0:
+        raise BadRequest('Upload-Offset must not be negative')
+    return offset
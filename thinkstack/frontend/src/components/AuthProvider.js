@@ -16,14 +16,58 @@ export const AuthProvider = ({ children }) => {
   const logout = async () => {
     // You should create a '/api/logout' route in Flask that clears the session
     try {
-      await axios.post('http://localhost:5000/api/logout');
+      // Sending the access token lets the server revoke it as well
+      const token = localStorage.getItem('token');
+      await axios.post('http://localhost:5000/api/logout', null, {
+        withCredentials: true,
+        headers: token ? { 'Authorization': `Bearer ${token}` } : {}
+      });
     } catch (error) {
       console.error("Logout failed", error);
     } finally {
+      localStorage.removeItem('token');
+      localStorage.removeItem('refresh_token');
       setUser(null);
     }
   };
 
+  // Access tokens expire after 15 minutes: on a 401, trade the refresh token
+  // for a new one once and retry the request with it
+  useEffect(() => {
+    let refreshing = null; // shared by requests that fail while a refresh is under way
+
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      async (error) => {
+        const original = error.config;
+        const refreshToken = localStorage.getItem('refresh_token');
+        if (error.response?.status !== 401 || !original || original._retried || !refreshToken
+            || original.url?.endsWith('/api/token/refresh')) {
+          return Promise.reject(error);
+        }
+        original._retried = true;
+        try {
+          if (!refreshing) {
+            refreshing = axios.post('http://localhost:5000/api/token/refresh', null, {
+              headers: { 'Authorization': `Bearer ${refreshToken}` }
+            }).finally(() => { refreshing = null; });
+          }
+          const response = await refreshing;
+          localStorage.setItem('token', response.data.access_token);
+        } catch (refreshError) {
+          // Refresh token expired or revoked, or the account was suspended
+          localStorage.removeItem('token');
+          localStorage.removeItem('refresh_token');
+          setUser(null);
+          return Promise.reject(error);
+        }
+        original.headers['Authorization'] = `Bearer ${localStorage.getItem('token')}`;
+        return axios(original);
+      }
+    );
+    return () => axios.interceptors.response.eject(interceptor);
+  }, []);
+
   // Check if user is already logged in on app start
   const checkSession = useCallback(async () => {
     try {
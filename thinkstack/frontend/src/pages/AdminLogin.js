@@ -21,6 +21,8 @@ const AdminLogin = ({ showAlert }) => {
       });
 
       const user = res.data.user;
+      localStorage.setItem('token', res.data.access_token);
+      localStorage.setItem('refresh_token', res.data.refresh_token);
 
       if (user.role !== 'ADMIN') {
         showAlert('You are not authorized as an admin.', 'danger');
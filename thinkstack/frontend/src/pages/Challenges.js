@@ -7,6 +7,10 @@ import axios from 'axios';
 
 const challengeCategories = ['All', 'UI/UX Design', 'Machine Learning', 'IoT', 'Software Development', 'Data Science', 'General'];
 
+// Only what the cards show; the long description and requirements stay on
+// the detail page (search results still come with a snippet)
+const cardFields = 'title,category,createdBy,createdAt,cashPrize';
+
 const Challenges = ({ setActiveTab }) => {
   const [allChallenges, setAllChallenges] = useState([]);
   const [filteredChallenges, setFilteredChallenges] = useState([]);
@@ -16,39 +20,53 @@ const Challenges = ({ setActiveTab }) => {
 
   const navigate = useNavigate();
 
-  useEffect(() => {
-    const fetchChallenges = async () => {
-      try {
-        const response = await axios.get('http://localhost:5000/api/challenges');
-        console.log(response.data, 'this is the response data.....');
-        // Fix: Access the challenges array from the response
-        setAllChallenges(response.data.challenges || []);
-        setFilteredChallenges(response.data.challenges || []);
-      } catch (err) {
-        console.error(err);
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchChallenges();
-  }, []);
-
-  useEffect(() => {
-    let result = allChallenges;
-
-    if (activeFilter !== 'All') {
-      result = result.filter(c => c.category === activeFilter);
+  const [nextCursor, setNextCursor] = useState(null);
+
+  // Category filtering, search and paging all happen on the server
+  const fetchChallenges = async (cursor = null) => {
+    try {
+      const params = { limit: 24 };
+      if (activeFilter !== 'All') params.category = activeFilter;
+      if (cursor) params.cursor = cursor;
+      const query = searchTerm.trim();
+      if (query) params.q = query;
+      else params.fields = cardFields;
+      const url = query
+        ? 'http://localhost:5000/api/challenges/search'
+        : 'http://localhost:5000/api/challenges';
+      const response = await axios.get(url, { params });
+      const page = response.data.challenges || [];
+      setAllChallenges(prev => (cursor ? [...prev, ...page] : page));
+      setNextCursor(response.data.next_cursor || null);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoading(false);
     }
+  };
 
-    if (searchTerm) {
-      result = result.filter(c => 
-        c.title?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        c.createdBy?.toLowerCase().includes(searchTerm.toLowerCase())
-      );
-    }
+  useEffect(() => {
+    // Debounce typing so we don't fire a search per keystroke
+    const timer = setTimeout(() => {
+      setLoading(true);
+      fetchChallenges();
+    }, searchTerm ? 300 : 0);
+    return () => clearTimeout(timer);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [activeFilter, searchTerm]);
 
-    setFilteredChallenges(result);
-  }, [activeFilter, searchTerm, allChallenges]);
+  useEffect(() => {
+    setFilteredChallenges(allChallenges);
+  }, [allChallenges]);
+
+  // Search results carry a snippet with <mark> around the hits. Split it into
+  // text and <mark> elements instead of injecting it as HTML.
+  const renderSnippet = (snippet) =>
+    snippet.split(/(<mark>.*?<\/mark>)/g).map((part, i) =>
+      part.startsWith('<mark>')
+        ? <mark key={i}>{part.slice(6, -7)}</mark>
+        : <React.Fragment key={i}>{part}</React.Fragment>
+    );
 
   const handleJoinChallenge = (challengeId) => {
     // Navigate to challenge details
@@ -80,7 +98,7 @@ const Challenges = ({ setActiveTab }) => {
           <input 
             type="text" 
             className="form-control" 
-            placeholder="Search by title or creator..." 
+            placeholder="Search challenges..." 
             value={searchTerm}
             onChange={e => setSearchTerm(e.target.value)}
           />
@@ -112,13 +130,15 @@ const Challenges = ({ setActiveTab }) => {
                       Created by: <strong>{challenge.createdBy}</strong>
                     </h6>
                     
-                    <p className="card-text text-muted mb-3">
-                      {challenge.description ? 
-                        (challenge.description.length > 120 ? 
-                          challenge.description.substring(0, 120) + '...' : 
-                          challenge.description
-                        ) : 'No description available'}
-                    </p>
+                    {(challenge.snippet || challenge.description) && (
+                      <p className="card-text text-muted mb-3">
+                        {challenge.snippet ? renderSnippet(challenge.snippet) :
+                          (challenge.description.length > 120 ? 
+                            challenge.description.substring(0, 120) + '...' : 
+                            challenge.description
+                          )}
+                      </p>
+                    )}
 
                     {challenge.additionalRequirements && (
                       <div className="mb-3">
@@ -163,6 +183,14 @@ const Challenges = ({ setActiveTab }) => {
           )}
         </div>
       )}
+
+      {!loading && nextCursor && (
+        <div className="text-center mb-5">
+          <button className="btn btn-outline-primary" onClick={() => fetchChallenges(nextCursor)}>
+            Load more challenges
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -35,7 +35,11 @@ const DashboardAdmin = () => {
   const fetchChallenges = async () => {
     try {
       setLoading(true);
-      const response = await axios.get('http://localhost:5000/api/admin/challenges');
+      const response = await axios.get('http://localhost:5000/api/admin/challenges', {
+        // The table's columns, description included for the excerpt under the title
+        params: { fields: 'title,description,category,cashPrize,status,createdBy' },
+        headers: { 'Authorization': `Bearer ${localStorage.getItem('token')}` }
+      });
       console.log('API response:', response);
 
       if (response.status !== 200) {
@@ -28,6 +28,8 @@ const Login = ({ showAlert }) => {
         { withCredentials: true }
       );
       const user = response.data.user;
+      localStorage.setItem('token', response.data.access_token);
+      localStorage.setItem('refresh_token', response.data.refresh_token);
       login(user); 
       showAlert('success', `Welcome back, ${user.name}!`);
 
@@ -15,12 +15,15 @@ const SolverDashboard = () => {
   useEffect(() => {
     const fetchChallenges = async () => {
       try {
-        const response = await axios.get('http://localhost:5000/api/challenges');
+        // The listing leaves the description out unless it is asked for
+        const response = await axios.get('http://localhost:5000/api/challenges', {
+          params: { fields: 'title,cashPrize,description,deadline' }
+        });
         
         // --- FIX #1: DEFENSIVE CHECK ---
         // Ensure that the response data is actually an array before setting the state.
-        if (Array.isArray(response.data)) {
-          setChallenges(response.data);
+        if (Array.isArray(response.data.challenges)) {
+          setChallenges(response.data.challenges);
         } else {
           // If the API returns something unexpected, log it and set an empty array.
           console.error("API did not return an array for challenges:", response.data);
@@ -65,7 +68,7 @@ const SolverDashboard = () => {
                     {/* Use the correct camelCase name from to_dict() */}
                     {challenge.cashPrize && <h6 className="card-subtitle mb-2 text-success">${challenge.cashPrize.toLocaleString()} Prize</h6>}
                     <p className="card-text text-muted flex-grow-1">
-                      {challenge.description.substring(0, 120)}...
+                      {challenge.description?.substring(0, 120)}...
                     </p>
                     {/* FIX #2: Use navigate() with the correct URL path */}
                     <button className="btn btn-primary mt-auto" onClick={() => navigate(`/challenges/${challenge.id}`)}>